@@ -1,9 +1,45 @@
+import gzip
+import hashlib
 import json
 import os
-from datetime import date
+import py_compile
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pythoncode'))
+from cssfrozen import module_paths, render_modules
+from cssreverse import write_reverse_index
+from csssnapshot import write_snapshot
+
+# Usage: python merge_cssdata.py [--force] [--python-module]
+#
+# One pass over the inputs produces every merged artifact:
+#   cssdata-merged.json             pretty, one object per category
+#   data/merged_raw_data.json       flat-keyed: every entry by name, same-named entries deep-merged
+#   merged-all-...-schema.json      the flat-keyed data followed by the merged schema
+#   cssdata-merged.snapshot         memory-mapped binary snapshot
+#   cssdata-reverse-index.bin       keyword/type/function -> accepting entries (cssreverse.py)
+#   pythoncode/cssdata_frozen*.py   with --python-module: importable constant tables (cssfrozen.py),
+#                                   byte-compiled so importers load them from the .pyc; once
+#                                   generated they are rebuilt with the data on every build
+#   dist/                           the JSON artifacts, a minified variant and one minified
+#                                   file per category, each with a precompressed .gz next to it
+#
+# The build is incremental: the content hash of every input file is recorded
+# in cssdata-merged.manifest.json, and the outputs are only rewritten when an
+# input (or the merge format) changed or an output is missing or modified.
+# The output itself is deterministic: categories are written in the order
+# below, entries in source order, meta carries a content hash instead of a
+# build date and the .gz files carry no timestamp, so identical inputs always
+# produce byte-identical files.
+
+# Bump when the merged layout changes so existing outputs are rebuilt
+MERGE_FORMAT = 3
+
+root_dir = os.path.dirname(os.path.abspath(__file__))
 
 # Paths to individual data files
-data_dir = os.path.join(os.path.dirname(__file__), 'data', 'individual_files')
+data_dir = os.path.join(root_dir, 'data', 'individual_files')
 files = [
     ('atRules', 'at-rules.json'),
     ('functions', 'functions.json'),
@@ -13,19 +49,201 @@ files = [
     ('types', 'types.json'),
     ('units', 'units.json'),
 ]
+schema_file = os.path.join(root_dir, 'schema', 'merged-schema.json')
+
+output_file = 'cssdata-merged.json'
+flat_file = os.path.join('data', 'merged_raw_data.json')
+flat_schema_file = 'merged-all-unit_and_types_syntaxes_selectors_properties_functions_at_rules_schema.json'
+snapshot_file = 'cssdata-merged.snapshot'
+reverse_index_file = 'cssdata-reverse-index.bin'
+dist_dir = 'dist'
+manifest_file = 'cssdata-merged.manifest.json'
+
+
+def sha256_file(path):
+    """
+    Hash a file's contents.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        str: Hex SHA-256 digest, or None if the file does not exist
+    """
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def deep_merge(base, extra):
+    """
+    Merge two entries that share a name across categories.
+
+    Objects are merged key by key, lists are concatenated and any other
+    value is replaced, which is how data/merged_raw_data.json combines e.g.
+    the `color` property, syntax and type.
+
+    Args:
+        base: Value seen first
+        extra: Value seen later
+
+    Returns:
+        The merged value
+    """
+    if isinstance(base, dict) and isinstance(extra, dict):
+        merged = dict(base)
+        for key, value in extra.items():
+            merged[key] = deep_merge(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(base, list) and isinstance(extra, list):
+        return base + extra
+    return extra
+
+
+def write_artifact(path, payload, compress=False):
+    """
+    Write one artifact (and optionally its .gz variant) and record its cost.
+
+    Args:
+        path (str): Output path relative to the repository root
+        payload (bytes | callable): File contents, or a function serializing
+            them (its time then counts towards the artifact)
+        compress (bool): Also write `path + '.gz'`
+
+    Returns:
+        list: (path, bytes, seconds) for each file written
+    """
+    written = []
+    start = time.perf_counter()
+    if callable(payload):
+        payload = payload()
+    full_path = os.path.join(root_dir, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'wb') as f:
+        f.write(payload)
+    written.append((path, len(payload), time.perf_counter() - start))
+    if compress:
+        start = time.perf_counter()
+        # mtime=0 keeps the .gz byte-identical across builds
+        compressed = gzip.compress(payload, compresslevel=9, mtime=0)
+        with open(full_path + '.gz', 'wb') as f:
+            f.write(compressed)
+        written.append((path + '.gz', len(compressed), time.perf_counter() - start))
+    return written
+
+
+def pretty(value):
+    return json.dumps(value, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def minified(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+force = '--force' in sys.argv[1:]
+frozen_paths = [os.path.relpath(path, root_dir) for path in module_paths()]
+# Existing frozen modules are kept in step with the data, so a stale one is never left importable
+python_module = ('--python-module' in sys.argv[1:]
+                 or any(os.path.exists(os.path.join(root_dir, path)) for path in frozen_paths))
+# Outputs a previous build may predate
+required_outputs = [reverse_index_file] + (frozen_paths if python_module else [])
+
+input_paths = [os.path.join(data_dir, filename) for _, filename in files] + [schema_file]
+inputs = {os.path.relpath(path, root_dir): sha256_file(path) for path in input_paths}
+content_hash = hashlib.sha256(json.dumps(
+    {"format": MERGE_FORMAT, "inputs": inputs}, sort_keys=True).encode('utf-8')).hexdigest()
+
+previous = {}
+manifest_path = os.path.join(root_dir, manifest_file)
+if os.path.exists(manifest_path):
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+
+up_to_date = (
+    not force
+    and previous.get("contentHash") == content_hash
+    and previous.get("outputs")
+    and all(sha256_file(os.path.join(root_dir, path)) == digest for path, digest in previous["outputs"].items())
+    and all(path in previous["outputs"] for path in required_outputs)
+)
+if up_to_date:
+    print(f"{output_file} is up to date ({content_hash[:12]})")
+    sys.exit(0)
+
+build_start = time.perf_counter()
 
 merged = {
     "meta": {
-        "version": "1.0.0",
-        "generated": str(date.today()),
+        "version": f"1.0.0+{content_hash[:12]}",
+        "contentHash": content_hash,
         "description": "Merged CSS data including at-rules, functions, properties, selectors, syntaxes, types, and units."
     }
 }
 
+# Parse every input exactly once; all artifacts are derived from these objects
+start = time.perf_counter()
 for key, filename in files:
     path = os.path.join(data_dir, filename)
     with open(path, 'r', encoding='utf-8') as f:
         merged[key] = json.load(f)
+with open(schema_file, 'r', encoding='utf-8') as f:
+    schema = json.load(f)
+parse_time = time.perf_counter() - start
+
+flat = {}
+for key, _ in files:
+    for name, entry in merged[key].items():
+        flat[name] = deep_merge(flat[name], entry) if name in flat else entry
+
+merged_pretty = pretty(merged)
+flat_pretty = pretty(flat)
+flat_schema_pretty = pretty({**flat, **schema})
+
+written = []
+written += write_artifact(output_file, merged_pretty)
+written += write_artifact(flat_file, flat_pretty)
+written += write_artifact(flat_schema_file, flat_schema_pretty)
+written += write_artifact(os.path.join(dist_dir, 'cssdata-merged.json'), merged_pretty, compress=True)
+written += write_artifact(os.path.join(dist_dir, 'cssdata-merged.min.json'), lambda: minified(merged), compress=True)
+written += write_artifact(os.path.join(dist_dir, 'cssdata-flat.json'), flat_pretty, compress=True)
+written += write_artifact(os.path.join(dist_dir, 'cssdata-flat.min.json'), lambda: minified(flat), compress=True)
+written += write_artifact(os.path.join(dist_dir, 'cssdata-flat-schema.json'), flat_schema_pretty, compress=True)
+for key, filename in files:
+    category_file = os.path.join(dist_dir, 'categories', filename.replace('.json', '.min.json'))
+    written += write_artifact(category_file, lambda: minified(merged[key]), compress=True)
+
+# Compact memory-mapped snapshot for tools that only look up a few entries
+start = time.perf_counter()
+size = write_snapshot(merged, os.path.join(root_dir, snapshot_file))
+written.append((snapshot_file, size, time.perf_counter() - start))
+
+# Reverse index from syntax terms to the entries accepting them
+start = time.perf_counter()
+size = write_reverse_index(merged, os.path.join(root_dir, reverse_index_file))
+written.append((reverse_index_file, size, time.perf_counter() - start))
+
+# Frozen lookup module; the light module stays small so importing it is cheap
+if python_module:
+    for path, source in zip(frozen_paths, render_modules(merged)):
+        written += write_artifact(path, source)
+        py_compile.compile(os.path.join(root_dir, path), doraise=True)
+
+changed = sorted(name for name, digest in inputs.items() if previous.get("inputs", {}).get(name) != digest)
+with open(manifest_path, 'w', encoding='utf-8') as f:
+    json.dump({
+        "format": MERGE_FORMAT,
+        "contentHash": content_hash,
+        "inputs": inputs,
+        "outputs": {path: sha256_file(os.path.join(root_dir, path)) for path, _, _ in written},
+    }, f, indent=2, sort_keys=True)
 
-with open('cssdata-merged.json', 'w', encoding='utf-8') as f:
-    json.dump(merged, f, indent=2, ensure_ascii=False)
+print(f"Built {content_hash[:12]} (changed: {', '.join(changed) if changed else 'none'}); "
+      f"parsed inputs in {parse_time * 1000:.1f} ms")
+width = max(len(path) for path, _, _ in written)
+for path, size, elapsed in written:
+    print(f"  {path:<{width}}  {size / 1024:9.1f} KiB  {elapsed * 1000:7.1f} ms")
+print(f"Total {time.perf_counter() - build_start:.2f} s")
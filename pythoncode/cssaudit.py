@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Stylesheet Audit
+------------------------
+Scans stylesheets for properties, at-rules, pseudo-classes, pseudo-elements
+and functions that are unknown to the dataset or marked `nonstandard`,
+`experimental` or `obsolete` in it.
+
+Each file is memory-mapped and tokenized in place with byte regexes that
+only stop at tokens the audit cares about, so a multi-MB bundle is never
+copied into a string. Files are fanned out over a process pool, largest
+first; the lookup tables are built once in the parent and handed to every
+worker at startup (inherited copy-on-write where processes fork).
+
+The tokenizer tracks just enough structure to tell selectors from
+declarations: blocks of rules, blocks of declarations (with CSS nesting and
+at-rule descriptors) and keyframes.
+
+Usage:
+    python cssaudit.py src/ dist/app.css [--format text|json|sarif] [--output FILE]
+                       [--jobs N] [--status experimental,obsolete,...] [--data cssdata-merged.json]
+
+Exits 1 if anything was reported.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_FILE = os.path.join(ROOT_DIR, 'cssdata-merged.json')
+
+STATUSES = ('unknown', 'nonstandard', 'experimental', 'obsolete')
+KINDS = ('property', 'at-rule', 'selector', 'function')
+SARIF_LEVELS = {'unknown': 'error', 'obsolete': 'warning', 'nonstandard': 'warning', 'experimental': 'note'}
+
+# Functions of builtin data types (<url>), which have no entry of their own
+BUILTIN_FUNCTIONS = frozenset(['url', 'src'])
+
+# At-rules whose block holds rules (or, nested in a style rule, declarations)
+GROUP_AT_RULES = frozenset(['media', 'supports', 'container', 'layer', 'document', 'scope', 'starting-style'])
+KEYFRAMES_AT_RULES = frozenset(['keyframes'])
+
+# Margin boxes of @page, which the dataset does not list as at-rules
+PAGE_MARGIN_RULES = frozenset([
+    'top-left-corner', 'top-left', 'top-center', 'top-right', 'top-right-corner',
+    'bottom-left-corner', 'bottom-left', 'bottom-center', 'bottom-right', 'bottom-right-corner',
+    'left-top', 'left-middle', 'left-bottom', 'right-top', 'right-middle', 'right-bottom',
+])
+
+# Legacy single-colon spellings of pseudo-elements
+LEGACY_PSEUDO_ELEMENTS = frozenset([':before', ':after', ':first-line', ':first-letter'])
+
+VENDOR_PREFIX = re.compile(r'^-(?:webkit|moz|ms|o)-')
+
+_COMMENT = rb'/\*.*?(?:\*/|\Z)'
+_STRING = rb'"(?:[^"\\\n]|\\.)*"?|\'(?:[^\'\\\n]|\\.)*\'?'
+_ESCAPE = rb'\\.'
+_IDENT = rb'-?-?[A-Za-z_][\w-]*'
+
+# Selector preludes: pseudo-classes/elements, with a trailing "(" for functional ones
+_SELECTOR_TOKEN = re.compile(
+    rb'(' + _COMMENT + rb'|' + _STRING + rb'|' + _ESCAPE + rb')|([{};])|(::?)(' + _IDENT + rb')(\(?)', re.S)
+# At-rule preludes and keyframe selectors: only the end of the prelude matters
+_PRELUDE_TOKEN = re.compile(rb'(' + _COMMENT + rb'|' + _STRING + rb'|' + _ESCAPE + rb')|([{};])', re.S)
+# Declaration values: function names (url() bodies are skipped, they may contain ";")
+_VALUE_TOKEN = re.compile(
+    rb'(' + _COMMENT + rb'|' + _STRING + rb'|' + _ESCAPE + rb'|url\([^)"\']*\))|([{};])|(?<![\w.\\-])(' + _IDENT + rb')\(',
+    re.S | re.I)
+# Start of a statement: skip whitespace and comments, then an at-rule or a declaration
+_SPACE = re.compile(rb'(?:\s+|' + _COMMENT + rb')*', re.S)
+_AT_KEYWORD = re.compile(rb'@(' + _IDENT + rb')')
+_DECLARATION = re.compile(rb'(' + _IDENT + rb')\s*:')
+
+# Statement states of the tokenizer
+_START, _SELECTOR, _PRELUDE, _VALUE = range(4)
+
+# Lookup tables of this (worker) process, set by `_init_worker`
+_tables = None
+
+
+def build_tables(data):
+    """
+    Build the lookup tables used by the tokenizer.
+
+    Args:
+        data (dict): The merged dataset (as written by merge_cssdata.py)
+
+    Returns:
+        dict: Kind -> {lowercase name: (status, MDN URL)}, plus "descriptor":
+            at-rule name -> {descriptor: (status, MDN URL)}
+    """
+    def entry_info(entry):
+        return entry.get('status') or 'standard', entry.get('mdn_url') or ''
+
+    tables = {
+        'property': {name.lower(): entry_info(entry) for name, entry in data.get('properties', {}).items()},
+        'at-rule': {name[1:].lower(): entry_info(entry) for name, entry in data.get('atRules', {}).items()},
+        'selector': {name.lower(): entry_info(entry) for name, entry in data.get('selectors', {}).items()
+                     if name.startswith(':')},
+        'function': {name[:-2].lower(): entry_info(entry) for name, entry in data.get('functions', {}).items()},
+        'descriptor': {
+            name[1:].lower(): {descriptor.lower(): entry_info(value)
+                               for descriptor, value in entry.get('descriptors', {}).items()}
+            for name, entry in data.get('atRules', {}).items()
+        },
+    }
+    # Functions that only occur inside other syntaxes (format(), local(), repeat(), ...)
+    for category, entries in data.items():
+        if category == 'meta' or not isinstance(entries, dict):
+            continue
+        for name in re.findall(r'([A-Za-z][\w-]*)\(', json.dumps(entries)):
+            tables['function'].setdefault(name.lower(), ('standard', ''))
+    for name in BUILTIN_FUNCTIONS:
+        tables['function'].setdefault(name, ('standard', ''))
+    return tables
+
+
+def load_tables(path=None):
+    """Build the lookup tables from the merged dataset on disk."""
+    with open(path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+        return build_tables(json.load(f))
+
+
+def _init_worker(tables):
+    global _tables
+    _tables = tables
+
+
+def _lookup(kind, name, at_rule=None):
+    """
+    Look up a name and return (status, MDN URL, note).
+
+    Vendor-prefixed names that are not in the dataset count as
+    nonstandard variants of their unprefixed name when it exists.
+    """
+    if at_rule is not None:
+        descriptor = _tables['descriptor'].get(at_rule, {}).get(name)
+        if descriptor is not None:
+            return descriptor[0], descriptor[1], ""
+    table = _tables[kind]
+    info = table.get(name)
+    if info is None and kind == 'selector' and name in LEGACY_PSEUDO_ELEMENTS:
+        info = table.get(':' + name)
+    if info is not None:
+        return info[0], info[1], ""
+    prefix = VENDOR_PREFIX.match(name.lstrip(':'))
+    if prefix:
+        base = name.replace(prefix.group(), '', 1)
+        if base in table:
+            return 'nonstandard', table[base][1], f"vendor-prefixed form of {base}"
+    return 'unknown', '', ""
+
+
+def tokenize(buf, statuses=STATUSES):
+    """
+    Scan a stylesheet and yield the names worth reporting.
+
+    Args:
+        buf (bytes | mmap.mmap): Stylesheet contents
+        statuses (iterable): Statuses to report
+
+    Yields:
+        tuple: (byte offset, kind, name, status, MDN URL, note), in no particular order
+    """
+    statuses = frozenset(statuses)
+    end = len(buf)
+    # Each block is (kind, at-rule name): kind is "rules", "decls" or "keyframes"
+    blocks = [("rules", None)]
+    state = _START
+    at_rule = None
+    statement_start = 0
+    pending = []
+    # Custom property values are arbitrary token streams, not CSS functions
+    custom = False
+    pos = 0
+
+    looked_up = {}
+
+    def report(offset, kind, name, at_rule=None):
+        key = (kind, name, at_rule)
+        info = looked_up.get(key)
+        if info is None:
+            info = looked_up[key] = _lookup(kind, name, at_rule)
+        if info[0] in statuses:
+            return [(offset, kind, name) + info]
+        return []
+
+    while pos < end:
+        block, block_at_rule = blocks[-1]
+        if state == _START:
+            pos = _SPACE.match(buf, pos).end()
+            if pos >= end:
+                break
+            statement_start = pos
+            char = buf[pos:pos + 1]
+            if char == b'}':
+                if len(blocks) > 1:
+                    blocks.pop()
+                pos += 1
+                continue
+            if char == b';':
+                pos += 1
+                continue
+            match = _AT_KEYWORD.match(buf, pos)
+            if match:
+                at_rule = match.group(1).decode('ascii').lower()
+                known = block_at_rule == 'page' and at_rule in PAGE_MARGIN_RULES
+                if not known:
+                    yield from report(pos, 'at-rule', at_rule)
+                state = _PRELUDE
+                pos = match.end()
+                continue
+            if block == "keyframes":
+                at_rule = None
+                state = _PRELUDE
+                continue
+            if block == "decls":
+                match = _DECLARATION.match(buf, pos)
+                if match:
+                    name = match.group(1).decode('ascii').lower()
+                    custom = name.startswith('--')
+                    # Held back until the statement ends with ";" or "}", not "{"
+                    pending = [] if custom else report(pos, 'property', name, block_at_rule)
+                    state = _VALUE
+                    pos = match.end()
+                    continue
+            state = _SELECTOR
+            continue
+
+        if state == _VALUE:
+            match = _VALUE_TOKEN.search(buf, pos)
+            if match is None:
+                yield from pending
+                break
+            pos = match.end()
+            if match.group(1):
+                continue
+            if match.group(3):
+                if custom:
+                    continue
+                pending += report(match.start(3), 'function', match.group(3).decode('ascii').lower())
+                continue
+            char = match.group(2)
+            if char == b'{':
+                # "a:hover {" inside a style rule is a nested rule, not a declaration
+                pending = []
+                state = _SELECTOR
+                pos = statement_start
+                continue
+            yield from pending
+            pending = []
+            state = _START
+            if char == b'}':
+                if len(blocks) > 1:
+                    blocks.pop()
+            continue
+
+        match = (_SELECTOR_TOKEN if state == _SELECTOR else _PRELUDE_TOKEN).search(buf, pos)
+        if match is None:
+            break
+        pos = match.end()
+        if match.group(1):
+            continue
+        char = match.group(2)
+        if char is None:
+            name = (match.group(3) + match.group(4) + (b'()' if match.group(5) else b'')).decode('ascii').lower()
+            status = _lookup('selector', name)[0]
+            if status == 'unknown' and match.group(5):
+                # e.g. :host and :host() are both listed, but not every functional form is
+                name = name[:-2]
+            yield from report(match.start(3), 'selector', name)
+            continue
+        if char == b'{':
+            if state == _SELECTOR or at_rule is None:
+                blocks.append(("decls", None))
+            elif at_rule in KEYFRAMES_AT_RULES or VENDOR_PREFIX.sub('', at_rule) in KEYFRAMES_AT_RULES:
+                blocks.append(("keyframes", None))
+            elif VENDOR_PREFIX.sub('', at_rule) in GROUP_AT_RULES:
+                # Nested in a style rule, a group rule holds declarations directly
+                blocks.append(("decls" if block == "decls" else "rules", None))
+            else:
+                blocks.append(("decls", at_rule))
+        elif char == b'}' and len(blocks) > 1:
+            blocks.pop()
+        state = _START
+
+
+def _line_starts(buf, offsets):
+    """Map sorted byte offsets to (line, column), counting newlines in bounded windows."""
+    positions = {}
+    line, counted, line_start = 1, 0, 0
+    for offset in offsets:
+        while counted < offset:
+            window = min(offset, counted + (1 << 20))
+            chunk = buf[counted:window]
+            newlines = chunk.count(b'\n')
+            if newlines:
+                line += newlines
+                line_start = counted + chunk.rfind(b'\n') + 1
+            counted = window
+        positions[offset] = (line, offset - line_start + 1)
+    return positions
+
+
+def audit_file(path, statuses=STATUSES):
+    """
+    Audit one stylesheet.
+
+    Args:
+        path (str): Path of the stylesheet
+        statuses (iterable): Statuses to report
+
+    Returns:
+        dict: Path, size in bytes, sorted findings and an error message if the file could not be read
+    """
+    result = {"path": path, "bytes": 0, "findings": [], "error": None}
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            result["bytes"] = size
+            if size == 0:
+                return result
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                found = sorted(tokenize(buf, statuses))
+                positions = _line_starts(buf, [finding[0] for finding in found])
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+    for offset, kind, name, status, url, note in found:
+        line, column = positions[offset]
+        result["findings"].append({"line": line, "column": column, "kind": kind, "name": name,
+                                   "status": status, "mdn_url": url, "note": note})
+    return result
+
+
+def find_stylesheets(paths, exclude=('.git', 'node_modules')):
+    """
+    Expand files and directories into the stylesheets to audit.
+
+    Args:
+        paths (iterable): Files and directories
+        exclude (iterable): Directory names not to descend into
+
+    Returns:
+        list: Paths of .css files, largest first (so the pool is not left waiting on one big bundle)
+    """
+    exclude = set(exclude)
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for directory, subdirectories, filenames in os.walk(path):
+            subdirectories[:] = sorted(name for name in subdirectories if name not in exclude)
+            found += [os.path.join(directory, name) for name in sorted(filenames) if name.endswith('.css')]
+    sizes = {path: os.path.getsize(path) if os.path.exists(path) else 0 for path in found}
+    return sorted(found, key=lambda path: -sizes[path])
+
+
+def audit(paths, tables, statuses=STATUSES, jobs=None):
+    """
+    Audit stylesheets, in parallel worker processes when `jobs` > 1.
+
+    Args:
+        paths (list): Stylesheet paths (see `find_stylesheets`)
+        tables (dict): Lookup tables from `build_tables`
+        statuses (iterable): Statuses to report
+        jobs (int, optional): Number of worker processes (default: CPU count, capped at the file count)
+
+    Returns:
+        list: One `audit_file` result per path, in the given order
+    """
+    statuses = tuple(statuses)
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    if jobs <= 1:
+        _init_worker(tables)
+        return [audit_file(path, statuses) for path in paths]
+    # Many small files per task keep the overhead down; the largest files come first and alone
+    chunksize = max(1, min(64, len(paths) // (jobs * 8)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(tables,)) as pool:
+        return list(pool.map(audit_file, paths, [statuses] * len(paths), chunksize=chunksize))
+
+
+def to_json(results, elapsed):
+    """Return the audit as a JSON-serializable report."""
+    summary = {}
+    for result in results:
+        for finding in result["findings"]:
+            key = f"{finding['status']} {finding['kind']}"
+            summary[key] = summary.get(key, 0) + 1
+    return {
+        "files": len(results),
+        "bytes": sum(result["bytes"] for result in results),
+        "seconds": round(elapsed, 3),
+        "summary": dict(sorted(summary.items())),
+        "errors": {result["path"]: result["error"] for result in results if result["error"]},
+        "results": [{"path": result["path"], "findings": result["findings"]}
+                    for result in results if result["findings"]],
+    }
+
+
+def _message(finding):
+    text = f"{finding['status'].capitalize()} {finding['kind']} '{finding['name']}'"
+    if finding["note"]:
+        text += f" ({finding['note']})"
+    return text
+
+
+def to_sarif(results):
+    """Return the audit as a SARIF 2.1.0 log."""
+    rules = [{
+        "id": f"{status}-{kind}",
+        "shortDescription": {"text": f"{status.capitalize()} CSS {kind}"},
+        "defaultConfiguration": {"level": SARIF_LEVELS[status]},
+    } for status in STATUSES for kind in KINDS]
+    sarif_results = []
+    for result in results:
+        uri = result["path"].replace(os.sep, '/')
+        for finding in result["findings"]:
+            sarif_result = {
+                "ruleId": f"{finding['status']}-{finding['kind']}",
+                "level": SARIF_LEVELS[finding["status"]],
+                "message": {"text": _message(finding)},
+                "locations": [{"physicalLocation": {
+                    "artifactLocation": {"uri": uri},
+                    "region": {"startLine": finding["line"], "startColumn": finding["column"]},
+                }}],
+            }
+            if finding["mdn_url"]:
+                sarif_result["properties"] = {"helpUri": finding["mdn_url"]}
+            sarif_results.append(sarif_result)
+    return {
+        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "version": "2.1.0",
+        "runs": [{
+            "tool": {"driver": {"name": "cssaudit", "informationUri": "https://github.com/jacobmagder/CSSDATA",
+                                "rules": rules}},
+            "results": sarif_results,
+        }],
+    }
+
+
+def to_text(results):
+    """Return the audit as one `path:line:column: message` line per finding."""
+    lines = []
+    for result in results:
+        if result["error"]:
+            lines.append(f"{result['path']}: {result['error']}")
+        for finding in result["findings"]:
+            lines.append(f"{result['path']}:{finding['line']}:{finding['column']}: {_message(finding)}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit stylesheets for unknown, nonstandard, experimental "
+                                                 "and obsolete CSS features.")
+    parser.add_argument('paths', nargs='+', help="stylesheets and directories to scan for .css files")
+    parser.add_argument('--format', choices=('text', 'json', 'sarif'), default='text')
+    parser.add_argument('--output', help="write the report to this file instead of stdout")
+    parser.add_argument('--jobs', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--status', default=','.join(STATUSES),
+                        help="statuses to report (default: %(default)s)")
+    parser.add_argument('--exclude', action='append', default=None, metavar='DIR',
+                        help="directory name to skip, repeatable (default: .git and node_modules)")
+    parser.add_argument('--data', help="merged dataset (default: cssdata-merged.json)")
+    args = parser.parse_args()
+
+    statuses = [status.strip() for status in args.status.split(',') if status.strip()]
+    unknown = [status for status in statuses if status not in STATUSES]
+    if unknown:
+        parser.error(f"unknown status {', '.join(unknown)} (expected {', '.join(STATUSES)})")
+
+    start = time.perf_counter()
+    tables = load_tables(args.data)
+    paths = find_stylesheets(args.paths, args.exclude or ('.git', 'node_modules'))
+    results = audit(paths, tables, statuses, args.jobs)
+    elapsed = time.perf_counter() - start
+
+    if args.format == 'json':
+        report = json.dumps(to_json(results, elapsed), indent=2)
+    elif args.format == 'sarif':
+        report = json.dumps(to_sarif(results), indent=2)
+    else:
+        report = to_text(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + "\n")
+    elif report:
+        print(report)
+
+    findings = sum(len(result["findings"]) for result in results)
+    total_bytes = sum(result["bytes"] for result in results)
+    print(f"Audited {len(results)} files ({total_bytes / 1e6:.1f} MB) in {elapsed:.2f} s: {findings} findings",
+          file=sys.stderr)
+    sys.exit(1 if findings else 0)
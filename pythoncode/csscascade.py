@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+CSS Cascade and Inheritance Engine
+----------------------------------
+Resolves the value of every longhand property for every element of a tree
+from the declarations matched to each element, using the `inherited` and
+`initial` fields of properties.json: the last matching declaration wins
+(`!important` ones over normal ones), otherwise an inherited property takes
+the parent's value and any other property its initial value. The CSS-wide
+keywords `inherit`, `initial`, `unset`, `revert` and `revert-layer` (the
+last two behave like `unset`, as there is no user-agent origin or layers
+here) and the `all` shorthand are handled. Shorthands are expanded with
+cssexpand.py; custom properties are inherited as specified, without var()
+substitution. Values are the cascaded and inherited ones: relative values
+are not absolutized, and `appliesto` is not enforced, since both depend on
+layout.
+
+The representation is built for trees of 100k+ elements:
+    - property names and values are interned to integers;
+    - longhands are split into style structs by their first group and by
+      whether they inherit; a struct is an `array('I')` of value ids;
+    - an element shares every struct it does not change with its parent
+      (inherited structs) or with the initial style (reset structs), and
+      identical structs are stored once;
+    - an element without declarations whose parent has only initial reset
+      structs reuses the parent's style object, and siblings with the same
+      declarations share one style.
+
+Usage:
+    python csscascade.py tree.json                 # non-initial values of every element
+    python csscascade.py --benchmark [nodes]
+
+A tree is {"tag": ..., "declarations": [[property, value], ...], "children": [...]}.
+"""
+
+import json
+import sys
+import time
+from array import array
+
+from csssyntax import CSS_WIDE_KEYWORDS, DEFAULT_DATA_FILE, Grammar
+from cssexpand import ShorthandExpander
+
+# Resolution markers in declaration patches (value ids are >= 0)
+INHERIT = -1
+INITIAL = -2
+
+# Longhands the `all` shorthand does not reset
+ALL_EXCLUDED = frozenset(['direction', 'unicode-bidi'])
+
+
+def _split_important(value):
+    """Return the value without a trailing `!important` and whether it had one."""
+    text = value.strip()
+    if text.endswith('important'):
+        head = text[:-len('important')].rstrip()
+        if head.endswith('!'):
+            return head[:-1].rstrip(), True
+    return text, False
+
+
+class ComputedStyle:
+    """
+    The resolved values of one element.
+
+    Styles are immutable and shared between elements; compare them with `is`
+    first, then with `diff`.
+    """
+
+    __slots__ = ('engine', 'structs', 'custom', 'resets_initial', '_plain_child')
+
+    def __init__(self, engine, structs, custom):
+        self.engine = engine
+        self.structs = structs
+        self.custom = custom
+        self.resets_initial = all(structs[index] is engine.initial_structs[index] for index in engine.reset_structs)
+        self._plain_child = None
+
+    def __getitem__(self, name):
+        if name.startswith('--'):
+            if not self.custom or name not in self.custom:
+                raise KeyError(name)
+            return self.custom[name]
+        struct, offset = self.engine.location[name]
+        return self.engine.values[self.structs[struct][offset]]
+
+    def get(self, name, default=None):
+        """Return the value of a longhand or custom property, or `default`."""
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """Return every longhand (and custom property) with its value."""
+        values = self.engine.values
+        result = {name: values[self.structs[struct][offset]]
+                  for name, (struct, offset) in self.engine.location.items()}
+        result.update(self.custom or {})
+        return result
+
+    def diff(self, other):
+        """
+        Compare two styles, skipping the structs they share.
+
+        Returns:
+            dict: Property name -> (value here, value in `other`) for every difference
+        """
+        engine = self.engine
+        values = engine.values
+        changes = {}
+        for index, (mine, theirs) in enumerate(zip(self.structs, other.structs)):
+            if mine is theirs or mine == theirs:
+                continue
+            names = engine.struct_names[index]
+            for offset, (a, b) in enumerate(zip(mine, theirs)):
+                if a != b:
+                    changes[names[offset]] = (values[a], values[b])
+        if self.custom is not other.custom:
+            mine, theirs = self.custom or {}, other.custom or {}
+            for name in set(mine) | set(theirs):
+                if mine.get(name) != theirs.get(name):
+                    changes[name] = (mine.get(name), theirs.get(name))
+        return changes
+
+
+class CascadeEngine:
+    """Computes the styles of element trees for the properties of the dataset."""
+
+    def __init__(self, properties, expander):
+        """
+        Intern the longhands of the dataset and build the initial style.
+
+        Args:
+            properties (dict): Property entries keyed by name (properties.json)
+            expander (ShorthandExpander): Expander used for shorthand declarations
+        """
+        self.expander = expander
+        self.shorthands = {name: self._flatten(name, expander.longhands) for name in expander.longhands}
+        longhands = sorted(name for name in properties
+                           if name not in self.shorthands and name not in ('--*', 'all'))
+        self.all_longhands = tuple(name for name in longhands if name not in ALL_EXCLUDED)
+
+        # Value interning: id -> string and string -> id
+        self.values = []
+        self.value_ids = {}
+
+        # Structs: longhands grouped by (first group, inherited)
+        groups = {}
+        for name in longhands:
+            entry = properties[name]
+            key = ((entry.get('groups') or [''])[0], bool(entry.get('inherited')))
+            groups.setdefault(key, []).append(name)
+        self.struct_names = []
+        self.struct_inherited = []
+        self.location = {}
+        initial = []
+        for (group, inherited), names in sorted(groups.items()):
+            index = len(self.struct_names)
+            self.struct_names.append(tuple(names))
+            self.struct_inherited.append(inherited)
+            for offset, name in enumerate(names):
+                self.location[name] = (index, offset)
+            initial.append(array('I', [self.intern(self._initial_value(properties[name])) for name in names]))
+        self.reset_structs = [index for index, inherited in enumerate(self.struct_inherited) if not inherited]
+        self.initial_structs = tuple(initial)
+        self._structs = {(index, struct.tobytes()): struct for index, struct in enumerate(initial)}
+        self._patches = {}
+        self.root_style = ComputedStyle(self, self.initial_structs, None)
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Build an engine from the merged dataset on disk.
+
+        Args:
+            path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            CascadeEngine: The engine
+        """
+        with open(path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        grammar = Grammar(data['properties'], data['syntaxes'], data.get('functions'))
+        return cls(data['properties'], ShorthandExpander(grammar))
+
+    @staticmethod
+    def _flatten(name, shorthands):
+        """Return the longhands of a shorthand, expanding nested shorthands (border -> border-width -> ...)."""
+        result = []
+        for longhand in shorthands[name]:
+            result.extend(CascadeEngine._flatten(longhand, shorthands) if longhand in shorthands else [longhand])
+        return tuple(result)
+
+    @staticmethod
+    def _initial_value(entry):
+        initial = entry.get('initial')
+        return initial if isinstance(initial, str) else ''
+
+    def intern(self, value):
+        """Return the id of a value string, adding it to the value table if needed."""
+        value_id = self.value_ids.get(value)
+        if value_id is None:
+            value_id = self.value_ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    # -- declarations --------------------------------------------------------
+
+    def _keyword_marker(self, name, keyword):
+        if keyword == 'inherit':
+            return INHERIT
+        if keyword == 'initial':
+            return INITIAL
+        # unset, revert and revert-layer
+        struct, _ = self.location[name]
+        return INHERIT if self.struct_inherited[struct] else INITIAL
+
+    def _resolve(self, declarations):
+        """
+        Turn a declaration list into per-struct patches, cached by the list.
+
+        Returns:
+            tuple: ((struct index, ((offset, value id or marker), ...)), ...) and
+                the custom property values set, or None
+        """
+        cached = self._patches.get(declarations)
+        if cached is not None:
+            return cached
+
+        normal, important = [], []
+        for declaration in declarations:
+            value, flagged = _split_important(declaration[1])
+            (important if flagged or (len(declaration) > 2 and declaration[2]) else normal).append(
+                (declaration[0].strip(), value))
+
+        resolved = {}
+        custom = None
+        for name, value in normal + important:
+            if name.startswith('--'):
+                custom = custom or {}
+                custom[name] = value
+                continue
+            name = name.lower()
+            keyword = value.lower()
+            if keyword in CSS_WIDE_KEYWORDS:
+                targets = self.all_longhands if name == 'all' else self.shorthands.get(name, (name,))
+                for longhand in targets:
+                    if longhand in self.location:
+                        resolved[longhand] = self._keyword_marker(longhand, keyword)
+                continue
+            if name in self.shorthands:
+                # None for invalid values and values with var(), which are dropped
+                expansion = self.expander.expand(name, value) or ()
+            else:
+                expansion = ((name, value),)
+            for longhand, longhand_value in expansion:
+                if longhand in self.location:
+                    keyword = longhand_value.lower()
+                    resolved[longhand] = (self._keyword_marker(longhand, keyword) if keyword in CSS_WIDE_KEYWORDS
+                                          else self.intern(longhand_value))
+
+        by_struct = {}
+        for name, value in resolved.items():
+            struct, offset = self.location[name]
+            by_struct.setdefault(struct, []).append((offset, value))
+        patches = (tuple((struct, tuple(items)) for struct, items in sorted(by_struct.items())), custom)
+        self._patches[declarations] = patches
+        return patches
+
+    # -- styles --------------------------------------------------------------
+
+    def _plain(self, parent):
+        """The style of a child of `parent` without declarations."""
+        if parent is None:
+            return self.root_style
+        if parent.resets_initial:
+            return parent
+        if parent._plain_child is None:
+            structs = tuple(struct if self.struct_inherited[index] else self.initial_structs[index]
+                            for index, struct in enumerate(parent.structs))
+            parent._plain_child = ComputedStyle(self, structs, parent.custom)
+        return parent._plain_child
+
+    def _share(self, index, struct):
+        """Return the stored struct equal to `struct`, storing it if it is new."""
+        key = (index, struct.tobytes())
+        shared = self._structs.get(key)
+        if shared is None:
+            shared = self._structs[key] = struct
+        return shared
+
+    def style(self, parent, declarations):
+        """
+        Compute the style of one element.
+
+        Args:
+            parent (ComputedStyle): Style of the parent element, None for a root
+            declarations (tuple): Matched declarations in cascade order, each
+                (property, value) or (property, value, important)
+
+        Returns:
+            ComputedStyle: The element's style
+        """
+        base = self._plain(parent)
+        if not declarations:
+            return base
+        if not isinstance(declarations, tuple):
+            declarations = tuple(map(tuple, declarations))
+        patches, custom = self._resolve(declarations)
+        structs = list(base.structs)
+        initial = self.initial_structs
+        for index, items in patches:
+            struct = array('I', structs[index])
+            for offset, value in items:
+                if value == INHERIT:
+                    value = (parent.structs if parent is not None else initial)[index][offset]
+                elif value == INITIAL:
+                    value = initial[index][offset]
+                struct[offset] = value
+            if struct != structs[index]:
+                structs[index] = self._share(index, struct)
+        if custom:
+            custom = dict(base.custom, **custom) if base.custom else custom
+        else:
+            custom = base.custom
+        return ComputedStyle(self, tuple(structs), custom)
+
+    def compute(self, parents, declarations):
+        """
+        Compute the styles of a tree given in document order.
+
+        Args:
+            parents (sequence): Index of each element's parent (-1 for a root); parents come first
+            declarations (sequence): Each element's matched declarations (see `style`), or None
+
+        Returns:
+            list: One ComputedStyle per element
+        """
+        styles = []
+        shared = {}
+        for parent_index, element_declarations in zip(parents, declarations):
+            parent = styles[parent_index] if parent_index >= 0 else None
+            if element_declarations and not isinstance(element_declarations, tuple):
+                element_declarations = tuple(map(tuple, element_declarations))
+            # Siblings (and cousins with an identical parent style) with the same declarations share a style
+            key = (id(parent), element_declarations)
+            style = shared.get(key)
+            if style is None:
+                style = shared[key] = self.style(parent, element_declarations)
+            styles.append(style)
+        return styles
+
+    def compute_tree(self, tree):
+        """
+        Compute the styles of a nested tree.
+
+        Args:
+            tree (dict): {"declarations": [[property, value], ...], "children": [...]}
+
+        Returns:
+            list: (element, ComputedStyle) pairs in document order
+        """
+        elements, parents = [], []
+        stack = [(tree, -1)]
+        while stack:
+            element, parent_index = stack.pop()
+            elements.append(element)
+            parents.append(parent_index)
+            index = len(elements) - 1
+            stack.extend((child, index) for child in reversed(element.get('children', [])))
+        styles = self.compute(parents, [element.get('declarations') for element in elements])
+        return list(zip(elements, styles))
+
+    def memory_usage(self, styles):
+        """
+        Estimate the bytes held by a list of styles, counting shared objects once.
+
+        Returns:
+            dict: Distinct styles and structs, total bytes and bytes per element
+        """
+        seen_styles, seen_structs, seen_custom = set(), set(), set()
+        total = sys.getsizeof(styles)
+        for style in styles:
+            if id(style) in seen_styles:
+                continue
+            seen_styles.add(id(style))
+            total += sys.getsizeof(style) + sys.getsizeof(style.structs)
+            for struct in style.structs:
+                if id(struct) not in seen_structs:
+                    seen_structs.add(id(struct))
+                    total += sys.getsizeof(struct)
+            if style.custom is not None and id(style.custom) not in seen_custom:
+                seen_custom.add(id(style.custom))
+                total += sys.getsizeof(style.custom)
+        return {
+            "distinct_styles": len(seen_styles),
+            "distinct_structs": len(seen_structs),
+            "bytes": total,
+            "bytes_per_element": total / len(styles) if styles else 0.0,
+        }
+
+
+def random_tree(nodes, seed=5, rules=300):
+    """
+    Build a random DOM-like tree with declarations drawn from a pool of rule blocks.
+
+    Returns:
+        tuple: (parents, declarations) in document order
+    """
+    import random
+
+    rng = random.Random(seed)
+    samples = [
+        ('color', ['red', '#333', 'inherit', 'rgb(0 0 0 / 50%)']), ('display', ['block', 'flex', 'none', 'grid']),
+        ('margin', ['0', '0 auto', '1em 2em', 'inherit']), ('padding', ['4px', '1rem 2rem']),
+        ('font', ['12px/1.5 Arial, sans-serif', 'bold 16px Georgia, serif']), ('font-size', ['14px', '1.2em']),
+        ('border', ['1px solid #ccc', 'none']), ('background-color', ['#fff', 'transparent', 'unset']),
+        ('line-height', ['1.4', 'normal']), ('width', ['100%', '50vw', 'auto']), ('position', ['relative', 'absolute']),
+        ('text-align', ['center', 'left']), ('all', ['unset']), ('--accent', ['#08f', 'tomato']),
+        ('visibility', ['hidden', 'initial']), ('opacity', ['0.5', '1']),
+    ]
+    pool = [tuple((name, rng.choice(values)) for name, values in rng.sample(samples, rng.randint(1, 5)))
+            for _ in range(rules)]
+    parents, declarations = [-1], [pool[0]]
+    open_elements = [0]
+    for index in range(1, nodes):
+        # Mostly siblings and children of recent elements, up to a moderate depth
+        while len(open_elements) > 1 and (len(open_elements) > 24 or rng.random() < 0.3):
+            open_elements.pop()
+        parents.append(open_elements[-1])
+        declarations.append(None if rng.random() < 0.35 else pool[int(rng.paretovariate(1.2)) % rules])
+        open_elements.append(index)
+    return parents, declarations
+
+
+def benchmark(engine=None, nodes=100000):
+    """
+    Measure cascade throughput and memory on a random tree.
+
+    Returns:
+        dict: Elements/sec, sharing statistics and bytes per element, against one full vector per element
+    """
+    engine = engine or CascadeEngine.load()
+    parents, declarations = random_tree(nodes)
+    start = time.perf_counter()
+    styles = engine.compute(parents, declarations)
+    elapsed = time.perf_counter() - start
+    memory = engine.memory_usage(styles)
+    return {
+        "elements": nodes,
+        "longhands": len(engine.location),
+        "structs": len(engine.struct_names),
+        "interned_values": len(engine.values),
+        "seconds": round(elapsed, 3),
+        "elements_per_second": round(nodes / elapsed),
+        **memory,
+        "full_vector_bytes_per_element": sys.getsizeof(array('I', bytes(4 * len(engine.location)))),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) in (2, 3) and sys.argv[1] == '--benchmark':
+        print(json.dumps(benchmark(nodes=int(sys.argv[2]) if len(sys.argv) == 3 else 100000), indent=2))
+    elif len(sys.argv) == 2:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            tree = json.load(f)
+        engine = CascadeEngine.load()
+        initial = engine.root_style
+        for index, (element, style) in enumerate(engine.compute_tree(tree)):
+            print(f"{index} {element.get('tag', '')}")
+            for name, (value, _) in sorted(style.diff(initial).items()):
+                print(f"    {name}: {value};")
+    else:
+        print("Usage: csscascade.py tree.json | --benchmark [nodes]")
+        sys.exit(2)
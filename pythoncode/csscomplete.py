@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Completion Index
+------------------------
+An editor completion index over property names, functions, at-rules,
+pseudo-classes/elements and the keyword literals found in `syntax` strings.
+
+Labels live in an array-backed trie that also holds a vendor-stripped alias
+for every `-webkit-`/`-moz-`/`-ms-`/`-o-` name, so `box-ref` finds
+`-webkit-box-reflect`. Every node stores the best-ranked completions of its
+subtree, so a prefix lookup is a walk plus one list read. Typo-tolerant
+lookups keep the set of trie nodes within two edits of the query (after its
+first character) and extend it one keystroke at a time.
+
+Usage:
+    python csscomplete.py marg
+    python csscomplete.py --benchmark [trace.txt]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+from csssyntax import Keyword, SyntaxParseError, parse_syntax
+
+# Path to the merged dataset written by merge_cssdata.py
+DEFAULT_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cssdata-merged.json')
+
+VENDOR_PREFIXES = ('-webkit-', '-moz-', '-ms-', '-o-')
+
+# Lower sorts first when two completions are otherwise tied
+KIND_PRIORITY = {'property': 0, 'keyword': 1, 'function': 2, 'at-rule': 3, 'selector': 4}
+STATUS_PRIORITY = {'standard': 0, 'experimental': 1, 'nonstandard': 2, 'obsolete': 3}
+
+Completion = namedtuple('Completion', ['label', 'kind', 'status', 'distance', 'sources'])
+
+
+def _strip_vendor(key):
+    """Strip a vendor prefix, keeping any leading `@`, `:` or `::`."""
+    lead = key[:len(key) - len(key.lstrip('@:'))]
+    rest = key[len(lead):]
+    for prefix in VENDOR_PREFIXES:
+        if rest.startswith(prefix):
+            return lead + rest[len(prefix):]
+    return key
+
+
+class CompletionIndex:
+    """A prefix, vendor-insensitive and typo-tolerant completion index."""
+
+    # Ranked completions kept per trie node; larger limits walk the subtree
+    TOP_K = 16
+    # Largest edit distance the fuzzy search tracks
+    MAX_EDITS = 2
+
+    def __init__(self, data):
+        """
+        Build the index.
+
+        Args:
+            data (dict): The merged dataset (as written by merge_cssdata.py)
+        """
+        self.items = []
+        self._by_label = {}
+
+        for name, entry in data.get('properties', {}).items():
+            if name != '--*':
+                self._add(name, 'property', entry.get('status'))
+        for name, entry in data.get('functions', {}).items():
+            self._add(name, 'function', entry.get('status'))
+        for name, entry in data.get('atRules', {}).items():
+            self._add(name, 'at-rule', entry.get('status'))
+        for name, entry in data.get('selectors', {}).items():
+            if name.startswith(':'):
+                self._add(name, 'selector', entry.get('status'))
+
+        for category in ('properties', 'syntaxes', 'functions'):
+            for name, entry in data.get(category, {}).items():
+                for keyword in self._syntax_keywords(entry.get('syntax', '')):
+                    item = self._add(keyword, 'keyword', 'standard')
+                    if category == 'properties':
+                        item['sources'].add(name)
+
+        # Static rank: kind, status, unprefixed names, length, label
+        order = sorted(range(len(self.items)), key=lambda i: (
+            KIND_PRIORITY.get(self.items[i]['kind'], 9),
+            STATUS_PRIORITY.get(self.items[i]['status'], 9),
+            _strip_vendor(self.items[i]['label']) != self.items[i]['label'],
+            len(self.items[i]['label']),
+            self.items[i]['label'],
+        ))
+        self._rank = [0] * len(self.items)
+        for rank, item_id in enumerate(order):
+            self._rank[item_id] = rank
+
+        self._build_trie()
+        self._active_cache = {}
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Build the index from the merged dataset on disk.
+
+        Args:
+            path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            CompletionIndex: The built index
+        """
+        with open(path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _add(self, label, kind, status):
+        item = self._by_label.get((label, kind))
+        if item is None:
+            item = self._by_label[(label, kind)] = {
+                "label": label, "kind": kind, "status": status, "sources": set(),
+            }
+            self.items.append(item)
+        return item
+
+    @staticmethod
+    def _syntax_keywords(text):
+        """Return the keyword literals of a syntax string."""
+        try:
+            node = parse_syntax(text)
+        except SyntaxParseError:
+            return set()
+        keywords = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Keyword):
+                if not node.name[0].isdigit() and len(node.name) > 1:
+                    keywords.add(node.name)
+            elif hasattr(node, 'terms'):
+                stack.extend(node.terms)
+            elif hasattr(node, 'term'):
+                stack.append(node.term)
+        return keywords
+
+    def _build_trie(self):
+        """
+        Build an array-backed trie over the lowercased and vendor-stripped labels.
+
+        Node 0 is the root. Each node has a child map, its depth, and the
+        TOP_K best-ranked item ids of its subtree, so a prefix lookup is a walk
+        down the trie followed by reading one precomputed list.
+        """
+        children = [{}]
+        depth = [0]
+        items_at = [[]]
+        for item_id, item in enumerate(self.items):
+            key = item['label'].lower()
+            for variant in {key, _strip_vendor(key)}:
+                node = 0
+                for char in variant:
+                    child = children[node].get(char)
+                    if child is None:
+                        child = children[node][char] = len(children)
+                        children.append({})
+                        depth.append(depth[node] + 1)
+                        items_at.append([])
+                    node = child
+                items_at[node].append(item_id)
+
+        rank = self._rank
+        top = [None] * len(children)
+        # Children are always created after their parent, so reverse order is bottom-up
+        for node in range(len(children) - 1, -1, -1):
+            candidates = set(items_at[node])
+            for child in children[node].values():
+                candidates.update(top[child])
+            top[node] = tuple(sorted(candidates, key=rank.__getitem__)[:self.TOP_K])
+
+        self._children = children
+        self._depth = depth
+        self._items_at = items_at
+        self._top = top
+
+    def _node(self, text):
+        """Return the trie node for an exact prefix, or None."""
+        node = 0
+        children = self._children
+        for char in text:
+            node = children[node].get(char)
+            if node is None:
+                return None
+        return node
+
+    def _subtree(self, node, limit):
+        """Return up to `limit` best-ranked item ids below a node."""
+        if limit <= self.TOP_K:
+            return self._top[node][:limit]
+        found = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            found.update(self._items_at[node])
+            stack.extend(self._children[node].values())
+        return sorted(found, key=self._rank.__getitem__)[:limit]
+
+    def prefix(self, text, limit=None):
+        """
+        Find items whose label, or vendor-stripped label, starts with `text`.
+
+        Items whose label starts with `text` as typed come before those only
+        matched through the vendor-stripped query, so `-webkit-box` lists
+        `-webkit-box-reflect` ahead of the unprefixed `box-*` names. A bare
+        vendor prefix such as `-webkit-` is not stripped to an empty query.
+
+        Args:
+            text (str): The typed prefix
+            limit (int, optional): Maximum number of item ids
+
+        Returns:
+            list: Matching item ids, literal matches first, each best-ranked first
+        """
+        text = text.lower()
+        limit = limit or len(self.items)
+        queries = [text]
+        stripped = _strip_vendor(text)
+        if stripped != text and stripped.lstrip('@:'):
+            queries.append(stripped)
+        found = []
+        seen = set()
+        for query in queries:
+            node = self._node(query)
+            if node is None:
+                continue
+            for item_id in sorted(self._subtree(node, limit), key=self._rank.__getitem__):
+                if item_id not in seen:
+                    seen.add(item_id)
+                    found.append(item_id)
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+    # -- typo-tolerant search ------------------------------------------------
+
+    def _initial_active(self, char):
+        """
+        Active nodes of a one-character query.
+
+        The first character is taken as typed, as editors do: it anchors the
+        search, and every node within MAX_EDITS insertions below it is active.
+        """
+        start = self._children[0].get(char)
+        if start is None:
+            return {}
+        active = {}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            active[node] = self._depth[node] - 1
+            if self._depth[node] <= self.MAX_EDITS:
+                stack.extend(self._children[node].values())
+        return active
+
+    def _extend(self, active, char):
+        """
+        Advance an active-node set by one typed character.
+
+        An active node is a trie prefix within MAX_EDITS edits of the query.
+        The typed character can be deleted, substituted for a child, or
+        matched by a descendant after inserting the characters in between.
+        """
+        limit = self.MAX_EDITS
+        children = self._children
+        extended = {}
+        for node, distance in active.items():
+            if distance < limit and extended.get(node, limit + 1) > distance + 1:
+                extended[node] = distance + 1
+            frontier = [(node, 0)]
+            while frontier:
+                parent, skipped = frontier.pop()
+                for child_char, child in children[parent].items():
+                    if child_char == char:
+                        cost = distance + skipped
+                    elif skipped == 0:
+                        cost = distance + 1
+                    else:
+                        cost = limit + 1
+                    if cost <= limit and extended.get(child, limit + 1) > cost:
+                        extended[child] = cost
+                    if distance + skipped + 1 <= limit:
+                        frontier.append((child, skipped + 1))
+        return extended
+
+    def _active(self, text):
+        """Return the active-node set of a query, extending the longest cached prefix."""
+        cache = self._active_cache
+        active = cache.get(text)
+        if active is not None:
+            return active
+        if not text:
+            return {}
+        if len(cache) > 4096:
+            cache.clear()
+        cut = len(text)
+        while cut > 1 and text[:cut] not in cache:
+            cut -= 1
+        if cut == 1 and text[:1] not in cache:
+            cache[text[:1]] = self._initial_active(text[0])
+        active = cache[text[:cut]]
+        for i in range(cut, len(text)):
+            active = self._extend(active, text[i])
+            cache[text[:i + 1]] = active
+        return active
+
+    def fuzzy(self, text, max_distance, limit=10):
+        """
+        Find items with a label prefix within `max_distance` edits of `text`.
+
+        The first character must match. Typing a query character by
+        character extends the previous query's active nodes instead of
+        searching from scratch.
+
+        Args:
+            text (str): The typed prefix
+            max_distance (int): Maximum edit distance (at most MAX_EDITS)
+            limit (int): Completions kept per active node
+
+        Returns:
+            dict: Item id -> smallest prefix edit distance
+        """
+        text = text.lower()
+        stripped = _strip_vendor(text)
+        found = {}
+        for node, distance in self._active(stripped if stripped.lstrip('@:') else text).items():
+            if distance <= max_distance:
+                for item_id in self._subtree(node, limit):
+                    if found.get(item_id, max_distance + 1) > distance:
+                        found[item_id] = distance
+        return found
+
+    def complete(self, text, limit=10, kinds=None, fuzzy=True):
+        """
+        Rank completions for a typed prefix.
+
+        Exact prefix matches come first, those matching the typed vendor
+        prefix ahead of vendor-stripped ones; typo-tolerant matches (one edit
+        for prefixes up to four characters, two beyond) fill remaining slots.
+        Ties are broken by kind, status, unprefixed names, length and label.
+
+        Args:
+            text (str): The typed prefix
+            limit (int): Maximum number of completions
+            kinds (iterable, optional): Restrict to these kinds, e.g. {'property'}
+            fuzzy (bool): Whether to add typo-tolerant matches
+
+        Returns:
+            list: Completion tuples, best first
+        """
+        if not text:
+            return []
+        kinds = set(kinds) if kinds else None
+        # Over-fetch when filtering by kind so the filter cannot starve the result
+        fetch = limit if kinds is None else max(limit * 4, self.TOP_K)
+        lowered = text.lower()
+        candidates = {item_id: 0 for item_id in self.prefix(text, fetch)}
+        if fuzzy and len(candidates) < fetch and len(text) >= 3:
+            for item_id, distance in self.fuzzy(text, 1 if len(text) <= 4 else 2, fetch).items():
+                candidates.setdefault(item_id, distance)
+
+        ranked = []
+        for item_id, distance in candidates.items():
+            item = self.items[item_id]
+            if kinds and item['kind'] not in kinds:
+                continue
+            ranked.append((distance, not item['label'].lower().startswith(lowered), self._rank[item_id], item_id))
+        ranked.sort()
+        return [
+            Completion(self.items[r[-1]]['label'], self.items[r[-1]]['kind'], self.items[r[-1]]['status'],
+                       r[0], sorted(self.items[r[-1]]['sources']))
+            for r in ranked[:limit]
+        ]
+
+
+def generate_trace(index, words=200, typo_rate=0.2, seed=7):
+    """
+    Simulate keystrokes: each word is typed one character at a time.
+
+    Some words contain a single substituted character, so the trace exercises
+    typo-tolerant lookups as well as plain prefixes.
+
+    Args:
+        index (CompletionIndex): Index whose labels are typed
+        words (int): Number of words to type
+        typo_rate (float): Fraction of words with a typo
+        seed (int): Random seed for a reproducible trace
+
+    Returns:
+        list: The successive query strings
+    """
+    rng = random.Random(seed)
+    labels = sorted(item['label'] for item in index.items)
+    trace = []
+    for _ in range(words):
+        word = rng.choice(labels)
+        if len(word) > 4 and rng.random() < typo_rate:
+            i = rng.randrange(1, len(word) - 1)
+            word = word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+        trace.extend(word[:n] for n in range(1, len(word) + 1))
+    return trace
+
+
+def benchmark(trace=None, index=None):
+    """
+    Measure per-keystroke completion latency.
+
+    Args:
+        trace (list, optional): Query strings; generated from the index if omitted
+        index (CompletionIndex, optional): Index to benchmark
+
+    Returns:
+        dict: Build time and latency percentiles in microseconds
+    """
+    start = time.perf_counter()
+    index = index or CompletionIndex.load()
+    build_time = time.perf_counter() - start
+    trace = trace or generate_trace(index)
+
+    index.complete('warm')
+    latencies = []
+    for query in trace:
+        start = time.perf_counter()
+        index.complete(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6
+
+    return {
+        "items": len(index.items),
+        "trie_nodes": len(index._children),
+        "build_ms": build_time * 1000,
+        "keystrokes": len(trace),
+        "p50_us": percentile(0.50),
+        "p90_us": percentile(0.90),
+        "p99_us": percentile(0.99),
+        "max_us": latencies[-1] * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == '--benchmark':
+        trace = None
+        if len(sys.argv) == 3:
+            with open(sys.argv[2], 'r', encoding='utf-8') as f:
+                trace = [line.rstrip('\n') for line in f if line.strip()]
+        print(json.dumps(benchmark(trace), indent=2))
+    elif len(sys.argv) == 2:
+        for completion in CompletionIndex.load().complete(sys.argv[1]):
+            print(f"{completion.label:40} {completion.kind:10} {completion.status or '':13} {completion.distance}")
+    else:
+        print("Usage: csscomplete.py <prefix> | --benchmark [trace.txt]")
+        sys.exit(2)
@@ -0,0 +1,673 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Query Daemon
+--------------------
+Loads the merged dataset once and answers lookup, query, completion and
+value-validation requests over a Unix domain socket, so editor windows, lint
+workers and doc builds share one warm copy instead of each loading its own.
+
+The daemon keeps the cssquery indexes, the csscomplete trie and the csssyntax
+grammar (with every property matcher compiled up front) in memory, caches
+encoded results in an LRU and reloads everything when cssdata-merged.json
+changes on disk. A reload that fails, e.g. on a half-written file, keeps the
+previous version serving.
+
+Protocol: one compact JSON array per line. A request is `[id, op, arg, ...]`
+and its response `[id, error, result]`, with `error` null on success.
+Requests can be pipelined: a client may send any number before reading, and
+responses come back in request order.
+
+    [1,"get","properties","margin"]                       -> [1,null,{"syntax":...}]
+    [2,"query","properties",{"status":"experimental"}]    -> [2,null,["anchor-name",...]]
+    [3,"complete","marg",5]                               -> [3,null,[{"label":"margin",...},...]]
+    [4,"validate","color","rgb(0 0 0 / 50%)"]             -> [4,null,true]
+    [5,"stats"]
+
+`Client` talks to the daemon and falls back to loading the data in-process
+when no daemon is listening, so callers never depend on it running. The
+query, completion and syntax engines are only imported when a Backend is
+built, so a client served by the daemon never loads them.
+
+Usage:
+    python cssdaemon.py serve [--socket PATH] [--cache-size N]
+    python cssdaemon.py get properties margin
+    python cssdaemon.py complete marg
+    python cssdaemon.py validate color "rgb(0 0 0)"
+    python cssdaemon.py stats
+    python cssdaemon.py --benchmark
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Path to the merged dataset written by merge_cssdata.py
+DEFAULT_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cssdata-merged.json')
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_RELOAD_INTERVAL = 1.0
+
+# Operations answered by Backend; their results are cached
+BACKEND_OPERATIONS = frozenset(('get', 'query', 'complete', 'validate'))
+
+# Requests a client sends before reading their responses, so neither side
+# blocks on a full socket buffer during a long pipeline
+PIPELINE_WINDOW = 256
+
+logger = logging.getLogger(__name__)
+
+
+def default_socket_path():
+    """Return the socket path from CSSDATA_SOCKET, or a per-user path in the temp directory."""
+    return os.environ.get('CSSDATA_SOCKET') or os.path.join(tempfile.gettempdir(), f"cssdata-{os.getuid()}.sock")
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class QueryError(Exception):
+    """A request failed; the message is the error reported for it."""
+
+
+class Backend:
+    """One loaded version of the dataset with its lookup structures built."""
+
+    def __init__(self, data):
+        """
+        Build the indexes, completion trie and grammar.
+
+        Args:
+            data (dict): The merged dataset (as written by merge_cssdata.py)
+        """
+        # Imported here so clients talking to a running daemon never load the engines
+        from csscomplete import CompletionIndex
+        from cssquery import INDEXED_FIELDS, CSSData
+        from csssyntax import Grammar, SyntaxParseError
+
+        start = time.perf_counter()
+        self.meta = data.get('meta', {})
+        self.data = CSSData(data)
+        for category, entries in self.data.categories.items():
+            if isinstance(entries, dict):
+                for field in INDEXED_FIELDS:
+                    self.data.index(category, field)
+        self.completions = CompletionIndex(data)
+        self.grammar = Grammar(data['properties'], data['syntaxes'], data.get('functions'))
+        self.unparsable = []
+        for name in self.grammar.properties:
+            try:
+                self.grammar.property_matcher(name)
+            except SyntaxParseError:
+                self.unparsable.append(name)
+        self.build_time = time.perf_counter() - start
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Load and index the merged dataset from disk.
+
+        Args:
+            path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            Backend: The loaded backend
+        """
+        with open(path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def get(self, category, name):
+        """Return an entry, or None."""
+        return self.data.get(category, name)
+
+    def query(self, category, fields=None, exclude=None):
+        """Return the sorted keys of the entries matching `fields` and none of `exclude`."""
+        query = self.data.query(category).where(**(fields or {}))
+        if exclude:
+            query = query.exclude(**exclude)
+        return query.keys()
+
+    def complete(self, text, limit=10, kinds=None, fuzzy=True):
+        """Return ranked completions as dicts."""
+        return [completion._asdict() for completion in self.completions.complete(text, limit, kinds, fuzzy)]
+
+    def validate(self, name, value):
+        """Return whether `value` is valid for the property `name`."""
+        return self.grammar.match_property(name, value)
+
+
+class Service:
+    """
+    Answers requests from the current Backend through an LRU result cache,
+    and swaps in a new Backend when the data file changes.
+    """
+
+    def __init__(self, path=None, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        Load the dataset.
+
+        Args:
+            path (str, optional): Path to cssdata-merged.json
+            cache_size (int): Number of results kept in the LRU cache (0 disables it)
+        """
+        self.path = path or DEFAULT_DATA_FILE
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.started = time.time()
+        self.requests = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.reload_error = None
+        self.signature = _signature(self.path)
+        self.backend = Backend.load(self.path)
+
+    def call(self, op, args):
+        """
+        Run one operation.
+
+        Args:
+            op (str): Operation name
+            args (list): Its arguments
+
+        Returns:
+            bytes: The result as compact JSON
+
+        Raises:
+            ValueError: For unknown operations; other exceptions come from the operation itself
+        """
+        if op not in BACKEND_OPERATIONS and op not in ('ping', 'stats'):
+            raise ValueError(f"Unknown operation: {op}")
+        with self.lock:
+            self.requests[op] = self.requests.get(op, 0) + 1
+        if op == 'ping':
+            return b'"pong"'
+        if op == 'stats':
+            return json.dumps(self.stats(), separators=(',', ':')).encode('utf-8')
+
+        key = json.dumps([op, args], sort_keys=True, separators=(',', ':'))
+        with self.lock:
+            result = self.cache.get(key)
+            if result is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+            backend = self.backend
+
+        result = json.dumps(getattr(backend, op)(*args), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        with self.lock:
+            # A result computed from a backend that was swapped out meanwhile is not cached
+            if self.cache_size and backend is self.backend:
+                self.cache[key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def respond(self, line):
+        """
+        Answer one protocol line.
+
+        Args:
+            line (bytes): A request `[id, op, arg, ...]`
+
+        Returns:
+            bytes: The response line `[id, error, result]`
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, list) or len(request) < 2 or not isinstance(request[1], str):
+                raise ValueError("A request is [id, op, arg, ...]")
+            request_id = request[0]
+            result = self.call(request[1], request[2:])
+        except Exception as e:  # Reported to the client; the connection stays usable
+            return json.dumps([request_id, f"{type(e).__name__}: {e}", None], separators=(",", ":")).encode('utf-8') + b'\n'
+        return b'[' + json.dumps(request_id).encode('utf-8') + b',null,' + result + b']\n'
+
+    def reload_if_changed(self):
+        """
+        Swap in a freshly loaded Backend if the data file changed since the last load.
+
+        Returns:
+            bool: True if the data was reloaded
+        """
+        try:
+            signature = _signature(self.path)
+        except OSError:
+            return False
+        if signature == self.signature:
+            return False
+        try:
+            backend = Backend.load(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            # Possibly still being written; the signature is kept so the next poll retries
+            if str(e) != self.reload_error:
+                logger.warning(f"Reload of {self.path} failed, still serving {self.backend.meta.get('version')}: {e}")
+            self.reload_error = str(e)
+            return False
+        with self.lock:
+            self.backend = backend
+            self.signature = signature
+            self.cache.clear()
+            self.reloads += 1
+            self.reload_error = None
+        logger.info(f"Reloaded {self.path}: {backend.meta.get('version')} in {backend.build_time * 1000:.0f} ms")
+        return True
+
+    def watch(self, interval=DEFAULT_RELOAD_INTERVAL):
+        """Poll the data file every `interval` seconds from a daemon thread."""
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reload_if_changed()
+
+        thread = threading.Thread(target=run, name="cssdaemon-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        """
+        Return the service state.
+
+        Returns:
+            dict: Data version, uptime, request counts and cache statistics
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.backend.meta.get('version'),
+                "contentHash": self.backend.meta.get('contentHash'),
+                "uptime_s": round(time.time() - self.started, 3),
+                "build_ms": round(self.backend.build_time * 1000, 3),
+                "reloads": self.reloads,
+                "reload_error": self.reload_error,
+                "requests": dict(self.requests),
+                "cache": {
+                    "size": len(self.cache),
+                    "capacity": self.cache_size,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                    "evictions": self.evictions,
+                },
+            }
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        respond = self.server.service.respond
+        pending = b''
+        while True:
+            chunk = self.request.recv(65536)
+            if not chunk:
+                return
+            # Answer every complete line of the chunk with one send
+            *lines, pending = (pending + chunk).split(b'\n')
+            responses = [respond(line) for line in lines if line.strip()]
+            if responses:
+                self.request.sendall(b''.join(responses))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(socket_path=None, data_path=None, cache_size=DEFAULT_CACHE_SIZE,
+                reload_interval=DEFAULT_RELOAD_INTERVAL):
+    """
+    Load the data and bind the daemon's socket, without serving yet.
+
+    A stale socket file left by a daemon that died is replaced; a live one
+    is an error.
+
+    Args:
+        socket_path (str, optional): Socket path (default: default_socket_path())
+        data_path (str, optional): Path to cssdata-merged.json
+        cache_size (int): LRU cache size
+        reload_interval (float): Seconds between checks of the data file (0 disables reloading)
+
+    Returns:
+        socketserver.UnixStreamServer: The bound server; `.service` is its Service
+    """
+    socket_path = socket_path or default_socket_path()
+    service = Service(data_path, cache_size)
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {socket_path}")
+        finally:
+            probe.close()
+    server = _Server(socket_path, _Handler)
+    os.chmod(socket_path, 0o600)
+    server.service = service
+    if reload_interval:
+        service.watch(reload_interval)
+    return server
+
+
+def serve(socket_path=None, **options):
+    """Run the daemon until interrupted, removing its socket on exit."""
+    socket_path = socket_path or default_socket_path()
+    server = make_server(socket_path, **options)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info(f"Serving {server.service.backend.meta.get('version')} on {socket_path} "
+                f"(built in {server.service.backend.build_time * 1000:.0f} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+class Client:
+    """
+    Sends requests to the daemon, or answers them in-process when it is not running.
+
+    Usage:
+        with Client() as client:
+            client.validate('color', 'red')
+            client.pipeline([('get', 'properties', 'margin'), ('complete', 'marg')])
+    """
+
+    def __init__(self, socket_path=None, data_path=None, fallback=True, timeout=10.0):
+        """
+        Connect to the daemon.
+
+        Args:
+            socket_path (str, optional): Socket path (default: default_socket_path())
+            data_path (str, optional): Dataset loaded by the in-process fallback
+            fallback (bool): Load the data in-process if the daemon is unreachable
+            timeout (float): Socket timeout in seconds
+
+        Raises:
+            OSError: If the daemon is unreachable and `fallback` is False
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.data_path = data_path
+        self.fallback = fallback
+        self.local = None
+        self.sock = None
+        self._next_id = 0
+        try:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(self.socket_path)
+            self._reader = self.sock.makefile('rb')
+        except OSError:
+            self.close()
+            if not fallback:
+                raise
+            self._go_local()
+
+    @property
+    def connected(self):
+        """True if requests go to the daemon."""
+        return self.sock is not None
+
+    def _go_local(self):
+        logger.info(f"No daemon on {self.socket_path}, loading the data in-process")
+        self.local = Service(self.data_path, cache_size=DEFAULT_CACHE_SIZE)
+
+    def pipeline(self, requests):
+        """
+        Send several requests before reading any response.
+
+        Args:
+            requests (iterable): (op, arg, ...) tuples
+
+        Returns:
+            list: The results, in request order
+
+        Raises:
+            QueryError: If any request failed (after all responses were read)
+        """
+        requests = list(requests)
+        if self.sock is not None:
+            try:
+                responses = self._remote(requests)
+            except OSError:
+                if not self.fallback:
+                    raise
+                self.close()
+                self._go_local()
+        if self.sock is None:
+            responses = [json.loads(self.local.respond(json.dumps([None, *request]).encode('utf-8')))
+                         for request in requests]
+
+        for _, error, _ in responses:
+            if error is not None:
+                raise QueryError(error)
+        return [result for _, _, result in responses]
+
+    def _remote(self, requests):
+        responses = []
+        for start in range(0, len(requests), PIPELINE_WINDOW):
+            window = requests[start:start + PIPELINE_WINDOW]
+            first_id = self._next_id
+            self._next_id += len(window)
+            self.sock.sendall(b''.join(
+                json.dumps([first_id + i, *request], separators=(',', ':')).encode('utf-8') + b'\n'
+                for i, request in enumerate(window)))
+            for i in range(len(window)):
+                line = self._reader.readline()
+                if not line:
+                    raise ConnectionResetError("The daemon closed the connection")
+                response = json.loads(line)
+                if response[0] != first_id + i:
+                    raise ConnectionError(f"Response {response[0]} out of order, expected {first_id + i}")
+                responses.append(response)
+        return responses
+
+    def call(self, op, *args):
+        """Run one request and return its result."""
+        return self.pipeline([(op, *args)])[0]
+
+    def get(self, category, name):
+        """Return an entry, or None."""
+        return self.call('get', category, name)
+
+    def query(self, category, fields=None, exclude=None):
+        """Return the sorted keys of the matching entries (see cssquery.Query.where)."""
+        return self.call('query', category, fields, exclude)
+
+    def complete(self, text, limit=10, kinds=None, fuzzy=True):
+        """Return ranked completions as dicts (see csscomplete.CompletionIndex.complete)."""
+        return self.call('complete', text, limit, sorted(kinds) if kinds else None, fuzzy)
+
+    def validate(self, name, value):
+        """Return whether a declaration value is valid for a property."""
+        return self.call('validate', name, value)
+
+    def stats(self):
+        """Return the daemon's (or the in-process fallback's) statistics."""
+        return self.call('stats')
+
+    def close(self):
+        """Close the connection."""
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def generate_workload(backend, requests=5000, seed=7):
+    """
+    Build a request mix resembling editor and lint traffic.
+
+    Lookups, completions of typed prefixes and validations of initial values
+    are drawn from a small pool with a skew towards common entries, so some
+    requests repeat as they do across editor windows.
+
+    Returns:
+        list: (op, arg, ...) tuples
+    """
+    import random
+
+    rng = random.Random(seed)
+    properties = sorted(name for name in backend.data.categories['properties'] if not name.startswith('--'))
+    pool = []
+    for name in properties:
+        pool.append(('get', 'properties', name))
+        pool.append(('complete', name[:rng.randint(2, max(2, min(6, len(name))))], 10, None, True))
+        initial = backend.data.get('properties', name).get('initial')
+        if isinstance(initial, str):
+            pool.append(('validate', name, initial))
+    for status in backend.data.values('properties', 'status'):
+        pool.append(('query', 'properties', {'status': status}, None))
+    rng.shuffle(pool)
+    weights = [1 / (rank + 1) for rank in range(len(pool))]
+    return rng.choices(pool, weights, k=requests)
+
+
+def benchmark(data_path=None, requests=5000):
+    """
+    Compare a daemon-backed client with loading the data in every process.
+
+    Starts a daemon in a subprocess on a temporary socket and measures a
+    fresh interpreter answering one validation through the daemon and
+    in-process, one-at-a-time round trips and a pipelined run of the
+    workload, and the cache hit rate.
+
+    Args:
+        data_path (str, optional): Path to cssdata-merged.json
+        requests (int): Number of requests in the workload
+
+    Returns:
+        dict: Timings and cache statistics
+    """
+    import subprocess
+
+    socket_dir = tempfile.mkdtemp(prefix='cssdaemon-')
+    socket_path = os.path.join(socket_dir, 'bench.sock')
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.abspath(__file__), '--socket', socket_path, 'serve']
+    if data_path:
+        command += ['--data', data_path]
+    daemon = subprocess.Popen(command, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 30
+        while not os.path.exists(socket_path):
+            if daemon.poll() is not None or time.time() > deadline:
+                raise RuntimeError("The daemon did not start")
+            time.sleep(0.01)
+
+        def process_time(fallback):
+            target = socket_path if fallback is None else os.path.join(socket_dir, 'absent.sock')
+            statement = (f"from cssdaemon import Client; "
+                         f"Client({target!r}, {data_path!r}).validate('color', 'rgb(0 0 0 / 50%)')")
+            best = None
+            for _ in range(5):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, '-c', statement], cwd=here, check=True)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            return round(best * 1000, 1)
+
+        start = time.perf_counter()
+        backend = Backend.load(data_path)
+        local_load = time.perf_counter() - start
+        workload = generate_workload(backend, requests)
+
+        with Client(socket_path, fallback=False) as client:
+            # First pass on a cold cache: repeats within the workload are the only hits
+            start = time.perf_counter()
+            client.pipeline(workload)
+            cold = time.perf_counter() - start
+            cache = client.stats()["cache"]
+            start = time.perf_counter()
+            for request in workload:
+                client.call(*request)
+            sequential = time.perf_counter() - start
+            start = time.perf_counter()
+            client.pipeline(workload)
+            pipelined = time.perf_counter() - start
+
+        return {
+            "requests": requests,
+            "in_process_load_ms": round(local_load * 1000, 1),
+            "process_via_daemon_ms": process_time(None),
+            "process_in_process_ms": process_time('fallback'),
+            "cold_pipelined_us_per_request": round(cold / requests * 1e6, 1),
+            "warm_sequential_us_per_request": round(sequential / requests * 1e6, 1),
+            "warm_pipelined_us_per_request": round(pipelined / requests * 1e6, 1),
+            "cold_cache": cache,
+        }
+    finally:
+        daemon.terminate()
+        daemon.wait()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        os.rmdir(socket_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve CSSDATA lookups over a Unix domain socket, or query the daemon.")
+    parser.add_argument('command', nargs='?', choices=('serve', 'get', 'query', 'complete', 'validate', 'stats'))
+    parser.add_argument('args', nargs='*', help="get CATEGORY NAME | query CATEGORY field=value ... | "
+                                                "complete PREFIX | validate PROPERTY VALUE")
+    parser.add_argument('--socket', help="socket path (default: $CSSDATA_SOCKET or a per-user temp path)")
+    parser.add_argument('--data', help="merged dataset (default: cssdata-merged.json)")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help="LRU result cache size")
+    parser.add_argument('--reload-interval', type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help="seconds between checks of the data file for changes (0 disables)")
+    parser.add_argument('--no-fallback', action='store_true', help="fail instead of loading the data in-process")
+    parser.add_argument('--benchmark', action='store_true', help="measure daemon and in-process lookups")
+    options = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if options.benchmark:
+        print(json.dumps(benchmark(options.data), indent=2))
+        sys.exit(0)
+    if options.command is None:
+        parser.error("a command or --benchmark is required")
+    if options.command == 'serve':
+        serve(options.socket, data_path=options.data, cache_size=options.cache_size,
+              reload_interval=options.reload_interval)
+        sys.exit(0)
+
+    arguments = options.args
+    if options.command == 'query':
+        # query [category] field=value ...  (values are parsed as JSON when possible)
+        category = arguments.pop(0) if arguments and '=' not in arguments[0] else 'properties'
+        fields = {}
+        for arg in arguments:
+            field, _, value = arg.partition('=')
+            try:
+                fields[field] = json.loads(value)
+            except ValueError:
+                fields[field] = value
+        arguments = [category, fields]
+
+    with Client(options.socket, options.data, fallback=not options.no_fallback) as client:
+        try:
+            result = client.call(options.command, *arguments)
+        except QueryError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
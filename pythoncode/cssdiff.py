@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Keyed Diff
+------------------
+Compares two versions of the merged dataset entry by entry instead of line by
+line. Every entry of every merge category is hashed once per dataset version
+and the hashes are cached by the file's content hash, so a later diff of
+the same versions compares hash tables and only reads the entries that
+changed. Identical categories are skipped by their category digest.
+
+The result is a change set: added, removed and changed keys per category,
+with field-level differences for changed entries (nested fields such as
+at-rule descriptors are addressed by dotted paths). `--affected` adds every
+syntax-graph node that references a changed node, i.e. what downstream
+artifacts have to rebuild.
+
+A version is a merged JSON file, a snapshot written by csssnapshot.py or a
+git object such as `HEAD~3:cssdata-merged.json`.
+
+Usage:
+    python cssdiff.py OLD NEW [--json changes.json] [--affected] [--no-cache]
+
+Exits 1 if the versions differ, like diff(1).
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+from csssnapshot import MAGIC, Snapshot
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(ROOT_DIR, '.cssdiff-cache')
+
+# Bump when the entry hashing changes so cached hash tables are rebuilt
+HASH_VERSION = 1
+
+
+def entry_hash(entry):
+    """
+    Hash an entry independently of its key order and formatting.
+
+    Args:
+        entry: A dataset entry
+
+    Returns:
+        str: Hex digest (64 bits, plenty for a few thousand entries)
+    """
+    text = json.dumps(entry, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _category_digest(hashes):
+    return hashlib.sha256(json.dumps(hashes, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class DatasetVersion:
+    """
+    One version of the merged dataset, read lazily.
+
+    `hashes` comes from the cache when this content was hashed before;
+    entries are only decoded (from a snapshot) or parsed (from JSON) when
+    `entry` is called, i.e. when the diff found a change.
+    """
+
+    def __init__(self, spec, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Open a dataset version.
+
+        Args:
+            spec (str): Path to a merged JSON file or snapshot, or a git object `REV:path`
+            cache_dir (str, optional): Directory of cached hash tables; None disables the cache
+
+        Raises:
+            FileNotFoundError: If `spec` is neither a file nor a git object
+        """
+        self.spec = spec
+        self.cache_dir = cache_dir
+        self._snapshot = None
+        self._data = None
+        self._cached = None
+        if os.path.exists(spec):
+            with open(spec, 'rb') as f:
+                self._blob = f.read()
+            if self._blob.startswith(MAGIC):
+                self._snapshot = Snapshot(spec)
+        else:
+            self._blob = self._git_show(spec)
+        self.file_hash = hashlib.sha256(self._blob).hexdigest()
+
+    @staticmethod
+    def _git_show(spec):
+        if ':' not in spec:
+            raise FileNotFoundError(f"No such dataset file: {spec}")
+        result = subprocess.run(['git', 'show', spec], cwd=ROOT_DIR, capture_output=True)
+        if result.returncode != 0:
+            raise FileNotFoundError(f"No such dataset file or git object: {spec}")
+        return result.stdout
+
+    def _load(self):
+        if self._data is None and self._snapshot is None:
+            self._data = json.loads(self._blob)
+        return self._data if self._snapshot is None else self._snapshot
+
+    def categories(self):
+        """Return the names of the entry categories (every dict-valued key except `meta`)."""
+        data = self._load()
+        if self._snapshot is not None:
+            return [name for name in data.categories() if name != 'meta']
+        return [name for name, entries in data.items() if isinstance(entries, dict) and name != 'meta']
+
+    def entry(self, category, key):
+        """Return one entry, or None if it does not exist."""
+        data = self._load()
+        if self._snapshot is not None:
+            return data.get(category, key)
+        return data.get(category, {}).get(key)
+
+    def _cache_path(self):
+        return os.path.join(self.cache_dir, f"{self.file_hash}.json") if self.cache_dir else None
+
+    def hashed(self):
+        """
+        Return the per-entry hashes of this version, from the cache if possible.
+
+        Returns:
+            dict: {"meta": meta, "categories": {category: {"digest": ..., "entries": {key: hash}}}}
+        """
+        if self._cached is not None:
+            return self._cached
+        path = self._cache_path()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("version") == HASH_VERSION:
+                self._cached = cached
+                return cached
+
+        data = self._load()
+        categories = {}
+        for category in self.categories():
+            entries = data[category]
+            hashes = {key: entry_hash(entries[key]) for key in entries}
+            categories[category] = {"digest": _category_digest(hashes), "entries": hashes}
+        meta = data.get('meta') if self._snapshot is None else dict(data['meta']) if 'meta' in data else None
+        self._cached = {"version": HASH_VERSION, "meta": meta, "categories": categories}
+
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(self._cached, f, separators=(',', ':'))
+            os.replace(f"{path}.tmp", path)
+        return self._cached
+
+    def label(self):
+        """Return the dataset version from `meta`, or a short content hash."""
+        meta = self.hashed().get("meta") or {}
+        return meta.get("version") or self.file_hash[:12]
+
+
+def diff_fields(old, new, path=""):
+    """
+    Compare two versions of an entry field by field.
+
+    Objects are compared key by key (nested keys are joined with dots);
+    lists and scalars are compared as whole values.
+
+    Args:
+        old (dict): Previous entry
+        new (dict): Current entry
+        path (str): Dotted path of `old` and `new` within the entry
+
+    Returns:
+        dict: Field path -> {"from": old value, "to": new value}; a field that
+            was added has no "from", a removed field has no "to"
+    """
+    changes = {}
+    for key in list(old) + [key for key in new if key not in old]:
+        field = f"{path}.{key}" if path else key
+        if key not in new:
+            changes[field] = {"from": old[key]}
+        elif key not in old:
+            changes[field] = {"to": new[key]}
+        elif old[key] != new[key]:
+            if isinstance(old[key], dict) and isinstance(new[key], dict):
+                changes.update(diff_fields(old[key], new[key], field))
+            else:
+                changes[field] = {"from": old[key], "to": new[key]}
+    return changes
+
+
+def diff_versions(old, new):
+    """
+    Diff two dataset versions by key.
+
+    Args:
+        old (DatasetVersion): Previous version
+        new (DatasetVersion): Current version
+
+    Returns:
+        dict: The change set: both versions, a summary and, per category with
+            changes, the sorted added and removed keys and the field changes
+            of each changed key
+    """
+    change_set = {
+        "from": {"version": old.label(), "fileHash": old.file_hash},
+        "to": {"version": new.label(), "fileHash": new.file_hash},
+        "summary": {"added": 0, "removed": 0, "changed": 0},
+        "categories": {},
+    }
+    if old.file_hash == new.file_hash:
+        return change_set
+
+    old_categories = old.hashed()["categories"]
+    new_categories = new.hashed()["categories"]
+    for category in list(old_categories) + [name for name in new_categories if name not in old_categories]:
+        before = old_categories.get(category, {"digest": None, "entries": {}})
+        after = new_categories.get(category, {"digest": None, "entries": {}})
+        if before["digest"] == after["digest"]:
+            continue
+        old_hashes, new_hashes = before["entries"], after["entries"]
+        added = sorted(key for key in new_hashes if key not in old_hashes)
+        removed = sorted(key for key in old_hashes if key not in new_hashes)
+        changed = {
+            key: diff_fields(old.entry(category, key), new.entry(category, key))
+            for key in sorted(key for key, digest in new_hashes.items()
+                              if key in old_hashes and old_hashes[key] != digest)
+        }
+        change_set["categories"][category] = {"added": added, "removed": removed, "changed": changed}
+        change_set["summary"]["added"] += len(added)
+        change_set["summary"]["removed"] += len(removed)
+        change_set["summary"]["changed"] += len(changed)
+    return change_set
+
+
+def graph_nodes(category, key, entry=None):
+    """
+    Map a dataset entry to its syntax-graph node ids (see cssgraph.py).
+
+    Args:
+        category (str): Merge category
+        key (str): Entry key
+        entry (dict, optional): The entry, whose at-rule descriptors are nodes too
+
+    Returns:
+        list: Node ids (empty for categories outside the graph)
+    """
+    from cssgraph import property_id, type_id
+
+    if category == 'properties':
+        return [property_id(key)]
+    if category == 'syntaxes':
+        return [type_id(key)]
+    if category == 'functions':
+        return [key]
+    if category == 'atRules':
+        return [key] + [f"{key}/{descriptor}" for descriptor in (entry or {}).get('descriptors', {})]
+    return []
+
+
+def affected_nodes(change_set, old, new):
+    """
+    Find every syntax-graph node that references a changed, added or removed node.
+
+    Args:
+        change_set (dict): Result of `diff_versions`
+        old (DatasetVersion): Previous version (for the descriptors of removed at-rules)
+        new (DatasetVersion): Current version, whose graph is searched
+
+    Returns:
+        list: Sorted node ids that have to be rebuilt, beyond the changed entries themselves
+    """
+    from cssgraph import SyntaxGraph
+
+    changed = set()
+    for category, changes in change_set["categories"].items():
+        for key in changes["removed"]:
+            changed.update(graph_nodes(category, key, old.entry(category, key)))
+        for key in changes["added"] + list(changes["changed"]):
+            changed.update(graph_nodes(category, key, new.entry(category, key)))
+    if not changed:
+        return []
+    graph = SyntaxGraph(new._load() if new._snapshot is None else {
+        category: dict(new._snapshot[category]) for category in new.categories()})
+    return sorted(graph.dependents(changed) - changed)
+
+
+def _short(value, limit=100):
+    text = json.dumps(value, ensure_ascii=False) if not isinstance(value, str) else repr(value)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def format_changelog(change_set):
+    """
+    Render a change set as a human-readable changelog.
+
+    Returns:
+        str: One section per category with added (+), removed (-) and changed (~) entries
+    """
+    summary = change_set["summary"]
+    lines = [f"{change_set['from']['version']} -> {change_set['to']['version']}: "
+             f"{summary['added']} added, {summary['removed']} removed, {summary['changed']} changed"]
+    for category, changes in change_set["categories"].items():
+        lines.append("")
+        lines.append(f"{category}: {len(changes['added'])} added, {len(changes['removed'])} removed, "
+                     f"{len(changes['changed'])} changed")
+        lines += [f"  + {key}" for key in changes["added"]]
+        lines += [f"  - {key}" for key in changes["removed"]]
+        for key, fields in changes["changed"].items():
+            lines.append(f"  ~ {key}")
+            for field, change in fields.items():
+                if "from" not in change:
+                    lines.append(f"      {field}: added {_short(change['to'])}")
+                elif "to" not in change:
+                    lines.append(f"      {field}: removed (was {_short(change['from'])})")
+                else:
+                    lines.append(f"      {field}: {_short(change['from'])} -> {_short(change['to'])}")
+    if change_set.get("affected"):
+        lines.append("")
+        lines.append(f"affected through syntax references: {len(change_set['affected'])}")
+        lines += [f"  {node_id}" for node_id in change_set["affected"]]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    json_file = None
+    if '--json' in args:
+        position = args.index('--json')
+        json_file = args[position + 1] if position + 1 < len(args) else None
+        del args[position:position + 2]
+    with_affected = '--affected' in args
+    cache_dir = None if '--no-cache' in args else DEFAULT_CACHE_DIR
+    args = [arg for arg in args if arg not in ('--affected', '--no-cache')]
+    if len(args) != 2 or ('--json' in sys.argv and json_file is None):
+        print("Usage: cssdiff.py OLD NEW [--json changes.json] [--affected] [--no-cache]")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    try:
+        old, new = (DatasetVersion(spec, cache_dir) for spec in args)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(2)
+    change_set = diff_versions(old, new)
+    if with_affected:
+        change_set["affected"] = affected_nodes(change_set, old, new)
+    elapsed = time.perf_counter() - start
+
+    if json_file:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(change_set, f, indent=2, ensure_ascii=False)
+    print(format_changelog(change_set))
+    print(f"\nDiffed in {elapsed * 1000:.1f} ms")
+    summary = change_set["summary"]
+    sys.exit(1 if summary["added"] or summary["removed"] or summary["changed"] else 0)
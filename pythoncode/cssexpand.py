@@ -0,0 +1,668 @@
+#!/usr/bin/env python3
+"""
+CSS Shorthand Expansion
+-----------------------
+Expands shorthand declarations (`margin: 1px 2px`, `border`, `font`,
+`grid-area`, `background`, ...) into their longhands.
+
+The shorthand -> longhand map is derived from properties.json, where a
+shorthand lists its longhands in its `initial` (and `computed`) arrays. Values
+are split with the compiled value grammar of csssyntax: the shorthand's syntax
+is traced over the value to find which top-level reference matched which
+tokens, and each of those spans is assigned to the longhand that accepts it.
+Longhands the value omits are reset to their initial value.
+
+Results are cached by (property, value), since real stylesheets repeat the
+same declarations endlessly.
+
+Usage:
+    python cssexpand.py margin "1px 2px"
+    python cssexpand.py --benchmark
+"""
+
+import json
+import sys
+import time
+from functools import lru_cache
+
+from csssyntax import (CSS_WIDE_KEYWORDS, DELIM, FUNCTION, IDENT, SUBSTITUTION_FUNCTIONS, Function, Grammar,
+                       Group, Keyword, Literal, Multiplier, PropertyRef, TypeRef, iter_references,
+                       tokenize_value_spans)
+
+SIDES = ('top', 'right', 'bottom', 'left')
+LOGICAL_SIDES = ('start', 'end')
+CORNERS = ('top-left', 'top-right', 'bottom-right', 'bottom-left')
+
+# Spec order where the dataset lists longhands alphabetically; it decides
+# which of several identical types (e.g. two <time> values) goes where
+LONGHAND_ORDER = {
+    'animation': ['animation-duration', 'animation-timing-function', 'animation-delay',
+                  'animation-iteration-count', 'animation-direction', 'animation-fill-mode',
+                  'animation-play-state', 'animation-name', 'animation-timeline'],
+    'transition': ['transition-property', 'transition-duration', 'transition-timing-function',
+                   'transition-delay', 'transition-behavior'],
+}
+
+# Keyword values whose expansion the grammar cannot express
+KEYWORD_EXPANSIONS = {
+    ('flex', 'none'): {'flex-grow': '0', 'flex-shrink': '0', 'flex-basis': 'auto'},
+    ('flex', 'auto'): {'flex-grow': '1', 'flex-shrink': '1', 'flex-basis': 'auto'},
+}
+
+# Alternatives that set every longhand to a user-agent value (`font: caption`
+# uses the platform's caption font), which no longhand values can spell out
+SYSTEM_VALUES = {
+    'font': '<system-family-name>',
+}
+
+# Values used for longhands omitted from a shorthand when they differ from the initial value
+OMITTED_VALUES = {
+    ('flex', 'flex-basis'): '0%',
+}
+
+
+class ShorthandExpander:
+    """Expands shorthand declarations into longhand declarations."""
+
+    def __init__(self, grammar, cache_size=65536):
+        """
+        Initialize the expander.
+
+        Args:
+            grammar (Grammar): Compiled grammar of the dataset
+            cache_size (int): Maximum number of cached (property, value) expansions
+        """
+        self.grammar = grammar
+        self.longhands = self._derive_longhands(grammar.properties)
+        self._initial_values = {}
+        self._expand_cached = lru_cache(maxsize=cache_size)(self._expand)
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Build an expander from the merged dataset on disk.
+
+        Args:
+            path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            ShorthandExpander: The expander
+        """
+        return cls(Grammar.load(path))
+
+    @staticmethod
+    def _derive_longhands(properties):
+        """
+        Build the shorthand -> longhands map from the `initial`/`computed` arrays.
+
+        Some entries name a generic longhand (`border-width`, `color`) where a
+        more specific one exists (`border-block-start-width`); those are
+        replaced by the specific property when it exists.
+        """
+        longhands = {}
+        for name, entry in properties.items():
+            listed = []
+            for field in ('initial', 'computed'):
+                if isinstance(entry.get(field), list):
+                    listed.extend(item for item in entry[field] if item not in listed)
+            if not listed:
+                continue
+            resolved = []
+            for longhand in listed:
+                specific = f"{name}-{longhand.rsplit('-', 1)[-1]}"
+                if specific in properties and specific != longhand and not longhand.startswith(name + '-'):
+                    longhand = specific
+                if longhand in properties and longhand not in resolved and longhand != name:
+                    resolved.append(longhand)
+            order = LONGHAND_ORDER.get(name) or _side_order(resolved, SIDES) or _side_order(resolved, CORNERS)
+            if order:
+                resolved.sort(key=lambda longhand: order.index(longhand) if longhand in order else len(order))
+            if resolved:
+                longhands[name] = tuple(resolved)
+        return longhands
+
+    def is_shorthand(self, name):
+        """Return True if the property is a known shorthand."""
+        return name in self.longhands
+
+    # -- public API ----------------------------------------------------------
+
+    def expand(self, name, value, deep=True):
+        """
+        Expand one declaration.
+
+        Args:
+            name (str): Property name
+            value (str): Declaration value, optionally ending in `!important`
+            deep (bool): Also expand longhands that are themselves shorthands
+
+        Returns:
+            list: (longhand, value) pairs; [(name, value)] for longhands, and
+                None if the value cannot be expanded (invalid, uses var(), or
+                names a system font)
+        """
+        result = self._expand_cached(name, value, deep)
+        return list(result) if result is not None else None
+
+    def expand_batch(self, declarations, deep=True):
+        """
+        Expand a batch of declarations.
+
+        Args:
+            declarations (iterable): (property, value) pairs
+            deep (bool): Also expand longhands that are themselves shorthands
+
+        Returns:
+            list: One expansion (see `expand`) per declaration
+        """
+        expand = self._expand_cached
+        return [expand(name, value, deep) for name, value in declarations]
+
+    def cache_info(self):
+        """Return hit/miss statistics of the expansion cache."""
+        return self._expand_cached.cache_info()
+
+    # -- expansion -----------------------------------------------------------
+
+    def _expand(self, name, value, deep):
+        important = ''
+        text = value.strip()
+        if text.lower().endswith('!important'):
+            text = text[:-len('!important')].rstrip()
+            important = ' !important'
+
+        if name not in self.longhands:
+            return ((name, value),)
+
+        tokens, spans = tokenize_value_spans(text)
+        if not tokens:
+            return None
+        for token in tokens:
+            if token[0] == FUNCTION and token[1] in SUBSTITUTION_FUNCTIONS:
+                return None
+
+        if len(tokens) == 1 and tokens[0][0] == IDENT and tokens[0][1] in CSS_WIDE_KEYWORDS:
+            values = {longhand: tokens[0][1] for longhand in self.longhands[name]}
+        elif len(tokens) == 1 and tokens[0][0] == IDENT and (name, tokens[0][1]) in KEYWORD_EXPANSIONS:
+            values = KEYWORD_EXPANSIONS[(name, tokens[0][1])]
+        else:
+            if not self.grammar.match_property(name, text):
+                return None
+            if name in SYSTEM_VALUES and self.grammar.match(self.grammar.compile(SYSTEM_VALUES[name]), text):
+                return None
+            values = self._assign(name, self.grammar.parse(self.grammar.properties[name]['syntax']),
+                                  tokens, spans, text)
+            if values is None:
+                return None
+
+        result = []
+        for longhand in self.longhands[name]:
+            longhand_value = values.get(longhand)
+            if longhand_value is None:
+                longhand_value = self._omitted_value(name, longhand)
+            if deep and longhand in self.longhands:
+                nested = self._expand_cached(longhand, longhand_value, True)
+                if nested is None:
+                    return None
+                result.extend((n, v + important) for n, v in nested)
+            else:
+                result.append((longhand, longhand_value + important))
+        return tuple(result)
+
+    def _omitted_value(self, shorthand, longhand):
+        """The value a longhand takes when its shorthand omits it."""
+        override = OMITTED_VALUES.get((shorthand, longhand))
+        if override is not None:
+            return override
+        initial = self._initial_values.get(longhand)
+        if initial is None:
+            entry_initial = self.grammar.properties[longhand].get('initial')
+            # Prose initial values ("dependsOnUserAgent") fall back to the keyword
+            if isinstance(entry_initial, str) and self.grammar.match_property(longhand, entry_initial):
+                initial = entry_initial
+            elif longhand in self.longhands:
+                # A nested shorthand (border-width) resets to its longhands' shared initial value
+                nested = {self._omitted_value(longhand, nested) for nested in self.longhands[longhand]}
+                initial = nested.pop() if len(nested) == 1 else 'initial'
+                if not self.grammar.match_property(longhand, initial):
+                    initial = 'initial'
+            else:
+                initial = 'initial'
+            self._initial_values[longhand] = initial
+        return initial
+
+    def _assign(self, name, tree, tokens, spans, text):
+        """Map the spans matched by the shorthand grammar onto its longhands."""
+        longhands = self.longhands[name]
+
+        layers = self._layer_syntaxes(tree)
+        if layers is not None:
+            return self._assign_layers(name, layers, tokens, spans, text)
+
+        captures = self._trace_all(tree, tokens)
+        if captures is None:
+            return None
+
+        def source(start, end):
+            return text[spans[start][0]:spans[end - 1][1]]
+
+        if isinstance(tree, Multiplier) and not tree.comma and tree.max in (2, 4):
+            return self._assign_box(longhands, [source(s, e) for _, s, e in captures])
+        if _is_slash_box(tree):
+            return self._assign_slash_box(longhands, tokens, captures, source)
+        if _is_slash_list(tree):
+            return self._assign_grid_lines(longhands, [(tokens[s:e], source(s, e)) for _, s, e in captures])
+
+        values = self._assign_spans(longhands, captures, tokens, source)
+        if values is None:
+            return None
+
+        # `<'a'> <'b'>?`: an omitted second value copies the first (gap, place-*)
+        if (isinstance(tree, Group) and tree.combinator == ' ' and len(tree.terms) == 2
+                and isinstance(tree.terms[0], PropertyRef) and isinstance(tree.terms[1], Multiplier)
+                and isinstance(tree.terms[1].term, PropertyRef) and tree.terms[1].min == 0
+                and tree.terms[1].term.name in longhands and tree.terms[1].term.name not in values):
+            values[tree.terms[1].term.name] = values.get(tree.terms[0].name)
+
+        # A single value every longhand accepts applies to all of them (marker: none)
+        if (len(values) == 1 and len(longhands) > 1 and not any(isinstance(ref, PropertyRef)
+                                                                  for ref in iter_references(tree))):
+            (only,) = values.values()
+            if all(self.grammar.match_property(longhand, only) for longhand in longhands):
+                values = {longhand: only for longhand in longhands}
+        return values
+
+    def _assign_spans(self, longhands, captures, tokens, source):
+        """Give each captured span to the best unassigned longhand that accepts it."""
+        values = {}
+        for node, start, end in captures:
+            segment = source(start, end)
+            target = None
+            if isinstance(node, PropertyRef) and node.name in longhands:
+                target = node.name
+            elif (isinstance(node, TypeRef) and node.name.endswith('position')
+                  and any(lh.endswith('-position-x') and lh not in values for lh in longhands)):
+                # A <position> sets both axes (background-position-x/-y)
+                target = next(lh for lh in longhands if lh.endswith('-position-x') and lh not in values)
+                axes = _split_position(tokens[start:end], source, start)
+                if axes is None:
+                    return None
+                values[target], values[target[:-2] + '-y'] = axes
+                continue
+            else:
+                hint = node.name if isinstance(node, (PropertyRef, TypeRef, Keyword)) else ''
+                for longhand in sorted(longhands, key=lambda lh: -_common_suffix(lh, hint)):
+                    if longhand not in values and self.grammar.match_property(longhand, segment):
+                        target = longhand
+                        break
+            if target is None:
+                return None
+            values[target] = f"{values[target]} {segment}" if target in values else segment
+        return values
+
+    def _assign_box(self, longhands, parts):
+        """Positional 1-4 (or 1-2) value shorthands such as margin or margin-block."""
+        order = _side_order(longhands, SIDES) or _side_order(longhands, LOGICAL_SIDES) or list(longhands)
+        if len(order) == 4:
+            expanded = {1: [0, 0, 0, 0], 2: [0, 1, 0, 1], 3: [0, 1, 2, 1], 4: [0, 1, 2, 3]}[len(parts)]
+        else:
+            expanded = {1: [0, 0], 2: [0, 1]}[len(parts)]
+        return {longhand: parts[i] for longhand, i in zip(order, expanded)}
+
+    def _assign_slash_box(self, longhands, tokens, captures, source):
+        """Corner shorthands with optional vertical radii after `/` (border-radius)."""
+        order = _side_order(longhands, CORNERS) or _side_order(
+            longhands, tuple(c.replace('-', '') for c in CORNERS)) or list(longhands)
+        horizontal = []
+        vertical = []
+        for _, start, end in captures:
+            slash_before = any(t[0] == DELIM and t[1] == '/' for t in tokens[:start])
+            (vertical if slash_before else horizontal).append(source(start, end))
+        if not 1 <= len(horizontal) <= 4 or len(vertical) > 4:
+            return None
+        h = self._assign_box(order, horizontal)
+        if not vertical:
+            return h
+        v = self._assign_box(order, vertical)
+        return {longhand: f"{h[longhand]} {v[longhand]}" for longhand in order}
+
+    def _assign_grid_lines(self, longhands, parts):
+        """`/`-separated grid line shorthands; omitted lines copy custom-idents or become auto."""
+        values = [text for _, text in parts]
+        idents = [len(tokens) == 1 and tokens[0][0] == IDENT and tokens[0][1] != 'auto' for tokens, _ in parts]
+        while len(values) < len(longhands):
+            # A missing end line copies its start line, a missing column-start the row-start
+            source = len(values) - 2 if len(values) >= 2 else 0
+            values.append(values[source] if idents[source] else 'auto')
+            idents.append(idents[source])
+        return dict(zip(longhands, values))
+
+    def _layer_syntaxes(self, tree):
+        """
+        Recognize multi-layer shorthands and return (layer syntax, final layer syntax).
+
+        Handles `<layer>#` and `[ <layer> , ]* <final-layer>` (background).
+        """
+        def resolve(node):
+            # Only layers made of components (`a || b || c`) are split further
+            if isinstance(node, TypeRef) and node.name in self.grammar.syntaxes:
+                layer = self.grammar.parse(self.grammar.syntaxes[node.name]['syntax'])
+                if isinstance(layer, Group) and layer.combinator in ('||', '&&'):
+                    return layer
+            return node
+
+        if isinstance(tree, Multiplier) and tree.comma and tree.max is None:
+            layer = resolve(tree.term)
+            return layer, layer
+        if (isinstance(tree, Group) and tree.combinator == ' ' and len(tree.terms) == 2
+                and isinstance(tree.terms[0], Multiplier) and tree.terms[0].min == 0
+                and isinstance(tree.terms[0].term, Group) and len(tree.terms[0].term.terms) == 2
+                and tree.terms[0].term.terms[1] == Literal(',')):
+            return resolve(tree.terms[0].term.terms[0]), resolve(tree.terms[1])
+        return None
+
+    def _assign_layers(self, name, layers, tokens, spans, text):
+        """Expand each comma-separated layer, then join the per-layer longhand values."""
+        layer_tree, final_tree = layers
+        longhands = self.longhands[name]
+        # Longhands only the final layer can set (background-color) are not lists
+        final_only = {ref.name for ref in iter_references(final_tree) if isinstance(ref, PropertyRef)} - {
+            ref.name for ref in iter_references(layer_tree) if isinstance(ref, PropertyRef)}
+
+        bounds = _split_top_level_commas(tokens)
+        per_layer = []
+        for i, (start, end) in enumerate(bounds):
+            tree = final_tree if i == len(bounds) - 1 else layer_tree
+            layer_tokens = tokens[start:end]
+
+            def source(s, e, start=start):
+                return text[spans[start + s][0]:spans[start + e - 1][1]]
+
+            captures = self._trace_all(tree, layer_tokens)
+            if captures is None:
+                return None
+            values = self._assign_spans(longhands, captures, layer_tokens, source)
+            if values is None:
+                return None
+            per_layer.append(values)
+
+        values = {}
+        for longhand in longhands:
+            if longhand in final_only:
+                if longhand in per_layer[-1]:
+                    values[longhand] = per_layer[-1][longhand]
+                continue
+            if any(longhand in layer for layer in per_layer):
+                values[longhand] = ', '.join(
+                    layer.get(longhand) or self._omitted_value(name, longhand) for layer in per_layer)
+        return values
+
+    # -- grammar tracing -----------------------------------------------------
+
+    def _trace_all(self, tree, tokens):
+        """Return the captures of one complete parse of `tokens`, or None."""
+        traced = self._trace(tree, tokens, 0, {}, {})
+        return traced.get(len(tokens))
+
+    def _trace(self, node, tokens, pos, memo, match_memo):
+        """
+        Match an AST node at `pos`, recording which top-level references matched what.
+
+        Returns:
+            dict: end position -> tuple of (node, start, end) captures
+        """
+        key = (id(node), pos)
+        cached = memo.get(key)
+        if cached is not None:
+            return cached
+        memo[key] = {}
+        result = self._trace_node(node, tokens, pos, memo, match_memo)
+        memo[key] = result
+        return result
+
+    def _trace_node(self, node, tokens, pos, memo, match_memo):
+        grammar = self.grammar
+        if isinstance(node, (TypeRef, PropertyRef, Keyword)):
+            return {end: ((node, pos, end),) for end in grammar.compile_node(node).match(tokens, pos, match_memo)}
+        if isinstance(node, (Literal, Function)):
+            return {end: () for end in grammar.compile_node(node).match(tokens, pos, match_memo)}
+
+        if isinstance(node, Multiplier):
+            if node.comma and isinstance(node.term, (TypeRef, PropertyRef)):
+                # A comma-separated list of one reference is a single value (font-family)
+                return {end: ((node.term, pos, end),) if end > pos else ()
+                        for end in grammar.compile_node(node).match(tokens, pos, match_memo)}
+            results = {pos: ()} if node.min == 0 else {}
+            current = {pos: ()}
+            seen = set()
+            count = 0
+            while current and (node.max is None or count < node.max):
+                following = {}
+                for p, captures in current.items():
+                    start = p
+                    if node.comma and count:
+                        if start < len(tokens) and tokens[start][0] == DELIM and tokens[start][1] == ',':
+                            start += 1
+                        else:
+                            continue
+                    for end, more in self._trace(node.term, tokens, start, memo, match_memo).items():
+                        if end > p and end not in following:
+                            following[end] = captures + more
+                count += 1
+                if count >= node.min:
+                    for end, captures in following.items():
+                        results.setdefault(end, captures)
+                    following = {end: c for end, c in following.items() if end not in seen}
+                    seen.update(following)
+                current = following
+            return results
+
+        if node.combinator == ' ':
+            states = {pos: ()}
+            for term in node.terms:
+                following = {}
+                for p, captures in states.items():
+                    for end, more in self._trace(term, tokens, p, memo, match_memo).items():
+                        following.setdefault(end, captures + more)
+                states = following
+                if not states:
+                    break
+            result = states
+        elif node.combinator == '|':
+            result = {}
+            for term in node.terms:
+                for end, captures in self._trace(term, tokens, pos, memo, match_memo).items():
+                    result.setdefault(end, captures)
+        else:
+            require_all = node.combinator == '&&'
+            full = (1 << len(node.terms)) - 1
+            result = {}
+            states = {(pos, 0): ()}
+            stack = [(pos, 0)]
+            while stack:
+                p, mask = stack.pop()
+                captures = states[(p, mask)]
+                if mask and (mask == full or not require_all):
+                    result.setdefault(p, captures)
+                # Pushed last-first so the earliest term is explored first: an ambiguous
+                # value (two <time>s) goes to the first term that accepts it
+                for i in reversed(range(len(node.terms))):
+                    term = node.terms[i]
+                    if mask & (1 << i):
+                        continue
+                    for end, more in self._trace(term, tokens, p, memo, match_memo).items():
+                        if end == p and not require_all:
+                            continue
+                        state = (end, mask | (1 << i))
+                        if state not in states:
+                            states[state] = captures + more
+                            stack.append(state)
+        if node.nonempty:
+            result = {end: captures for end, captures in result.items() if end != pos}
+        return result
+
+
+def _common_suffix(a, b):
+    """Number of trailing dash-separated words two names share."""
+    a_parts = a.split('-')
+    b_parts = b.split('-')
+    count = 0
+    while count < min(len(a_parts), len(b_parts)) and a_parts[-1 - count] == b_parts[-1 - count]:
+        count += 1
+    return count
+
+
+def _side_order(longhands, sides):
+    """Order longhands by the side (or corner) named in them, or None if any side is missing."""
+    order = []
+    for side in sides:
+        matches = [lh for lh in longhands if f"-{side}-" in f"-{lh}-"]
+        if len(matches) != 1:
+            return None
+        order.append(matches[0])
+    return order if len(order) == len(longhands) else None
+
+
+def _split_position(tokens, source, offset):
+    """
+    Split a <position> into its horizontal and vertical components.
+
+    Args:
+        tokens (list): Tokens of the position
+        source (callable): Maps a (start, end) token range to source text
+        offset (int): Position of the first token in the range `source` expects
+
+    Returns:
+        tuple: (x, y) source texts, or None for a malformed position
+    """
+    keywords = [token[1] if token[0] == IDENT else None for token in tokens]
+    if len(tokens) == 1:
+        if keywords[0] in ('top', 'bottom'):
+            return 'center', source(offset, offset + 1)
+        return source(offset, offset + 1), 'center'
+    if len(tokens) == 2:
+        if keywords[0] in ('top', 'bottom') or keywords[1] in ('left', 'right'):
+            return source(offset + 1, offset + 2), source(offset, offset + 1)
+        return source(offset, offset + 1), source(offset + 1, offset + 2)
+    # Three or four values: each edge keyword takes the offset that follows it
+    groups = []
+    for i, keyword in enumerate(keywords):
+        if keyword is not None:
+            groups.append([keyword, i, i + 1])
+        elif groups:
+            groups[-1][2] = i + 1
+        else:
+            return None
+    x = y = 'center'
+    for keyword, start, end in groups:
+        text = source(offset + start, offset + end)
+        if keyword in ('top', 'bottom'):
+            y = text
+        elif keyword in ('left', 'right'):
+            x = text
+    return x, y
+
+
+def _is_slash_box(tree):
+    """`X{1,4} [ / X{1,4} ]?`"""
+    return (isinstance(tree, Group) and tree.combinator == ' ' and len(tree.terms) == 2
+            and isinstance(tree.terms[0], Multiplier) and tree.terms[0].max == 4
+            and isinstance(tree.terms[1], Multiplier) and tree.terms[1].max == 1
+            and isinstance(tree.terms[1].term, Group) and tree.terms[1].term.terms[0] == Literal('/'))
+
+
+def _is_slash_list(tree):
+    """`X [ / X ]{0,n}` (grid-area, grid-row, grid-column)."""
+    return (isinstance(tree, Group) and tree.combinator == ' ' and len(tree.terms) == 2
+            and isinstance(tree.terms[0], TypeRef) and isinstance(tree.terms[1], Multiplier)
+            and tree.terms[1].min == 0 and isinstance(tree.terms[1].term, Group)
+            and tree.terms[1].term.terms == [Literal('/'), tree.terms[0]])
+
+
+def _split_top_level_commas(tokens):
+    """Return (start, end) token ranges between commas outside parentheses."""
+    bounds = []
+    depth = 0
+    start = 0
+    for i, token in enumerate(tokens):
+        if token[0] == FUNCTION or (token[0] == DELIM and token[1] in '(['):
+            depth += 1
+        elif token[0] == DELIM and token[1] in ')]':
+            depth -= 1
+        elif token[0] == DELIM and token[1] == ',' and depth == 0:
+            bounds.append((start, i))
+            start = i + 1
+    bounds.append((start, len(tokens)))
+    return bounds
+
+
+def benchmark(expander=None, declarations=20000, distinct=400, seed=11):
+    """
+    Measure batch expansion throughput with and without the (property, value) cache.
+
+    The batch draws `declarations` items from `distinct` unique shorthand
+    declarations, mimicking the repetition of real stylesheets.
+
+    Args:
+        expander (ShorthandExpander, optional): Expander to benchmark
+        declarations (int): Batch size
+        distinct (int): Number of distinct declarations in the batch
+        seed (int): Random seed
+
+    Returns:
+        dict: Throughput statistics
+    """
+    import random
+
+    expander = expander or ShorthandExpander.load()
+    rng = random.Random(seed)
+    lengths = ['0', '1px', '2px', '4px', '8px', '1em', '50%', 'auto']
+    colors = ['red', '#fff', '#000', 'rgb(0 0 0 / 50%)', 'transparent', 'currentcolor']
+    templates = [
+        lambda: ('margin', ' '.join(rng.choice(lengths) for _ in range(rng.randint(1, 4)))),
+        lambda: ('padding', ' '.join(rng.choice(lengths[:-1]) for _ in range(rng.randint(1, 4)))),
+        lambda: ('border', f"{rng.choice(lengths[:-2])} {rng.choice(['solid', 'dashed', 'none'])} {rng.choice(colors)}"),
+        lambda: ('font', f"{rng.choice(['', 'italic ', 'bold '])}{rng.randint(10, 20)}px/{rng.choice(['1', '1.5', 'normal'])} "
+                         f"{rng.choice(['Arial, sans-serif', 'Georgia, serif', 'monospace'])}"),
+        lambda: ('grid-area', ' / '.join(str(rng.randint(1, 5)) for _ in range(rng.randint(1, 4)))),
+        lambda: ('background', f"{rng.choice(colors)} url(a{rng.randint(1, 9)}.png) no-repeat center"),
+        lambda: ('transition', f"{rng.choice(['opacity', 'transform', 'all'])} {rng.choice(['.2s', '1s'])} ease"),
+        lambda: ('flex', rng.choice(['1', '1 1 auto', 'none', '0 0 200px'])),
+        lambda: ('border-radius', ' '.join(rng.choice(lengths[:-1]) for _ in range(rng.randint(1, 4)))),
+    ]
+    pool = [rng.choice(templates)() for _ in range(distinct)]
+    batch = [rng.choice(pool) for _ in range(declarations)]
+
+    start = time.perf_counter()
+    uncached = [expander._expand(name, value, True) for name, value in batch[:2000]]
+    uncached_rate = len(uncached) / (time.perf_counter() - start)
+
+    expander._expand_cached.cache_clear()
+    start = time.perf_counter()
+    results = expander.expand_batch(batch)
+    cached_rate = len(batch) / (time.perf_counter() - start)
+
+    return {
+        "shorthands": len(expander.longhands),
+        "declarations": len(batch),
+        "distinct": len(set(batch)),
+        "expanded": sum(r is not None for r in results),
+        "uncached_declarations_per_second": uncached_rate,
+        "cached_declarations_per_second": cached_rate,
+        "cache": expander.cache_info()._asdict(),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == '--benchmark':
+        print(json.dumps(benchmark(), indent=2))
+    elif len(sys.argv) == 3:
+        expansion = ShorthandExpander.load().expand(sys.argv[1], sys.argv[2])
+        if expansion is None:
+            print(f"Cannot expand {sys.argv[1]}: {sys.argv[2]}")
+            sys.exit(1)
+        for longhand, value in expansion:
+            print(f"{longhand}: {value};")
+    else:
+        print("Usage: cssexpand.py <property> <value> | --benchmark")
+        sys.exit(2)
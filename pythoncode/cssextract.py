@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+MDN Page Extraction
+-------------------
+Single-pass extraction of MDN CSS documentation pages for cssget.py.
+
+The scraper's BeautifulSoup extractors scan the whole parsed document once
+per field (title, description, syntax, values, ...) and once more for the
+child links. `extract_page` parses with lxml instead and collects every
+field in one walk over the document: headings are classified as they are
+passed, the first table after a heading is picked up when the walk reaches
+it, and only the short runs of siblings under the matched headings are
+visited again. It produces the same content as the BeautifulSoup extractors.
+
+`extract_page` is a plain function of (url, html, base URL), so the scraper
+can hand pages to a process pool and keep CPU-bound parsing out of the
+fetch threads (see `--extract-workers` in cssget.py).
+
+Usage:
+    python cssextract.py page.html [...]
+    python cssextract.py --benchmark [--workers N] fixtures/ [mdn_css_cache.sqlite ...]
+
+The benchmark reads saved pages (.html files, directories of them, or a
+cssget.py response cache) and reports pages/sec for the BeautifulSoup
+extractors, the single-pass extractor and the single-pass extractor in a
+process pool, plus any page whose extraction differs.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse, urlunparse
+
+try:
+    from lxml import etree
+except ImportError:  # Only needed for extract_page; the URL helpers work without it
+    etree = None
+
+# MDN locale prefixes such as `fr`, `ja`, `zh-CN` or a lower-cased `en-us`
+LOCALE_PATTERN = re.compile(r'^[a-zA-Z]{2,3}(-[a-zA-Z]{2,4})?$')
+
+# Path fragments of pages under /docs/Web/CSS that are not documentation
+EXCLUDED_PATTERNS = ['index.html', 'contributors.txt', '/tag/', '/docs/MDN/']
+
+# Headings whose section needs the first table that follows them
+TABLE_SECTIONS = ('formal_definition', 'browser_compatibility', 'specifications')
+
+
+def canonicalize_url(url, base=None):
+    """
+    Reduce a documentation URL to the one form the crawler fetches.
+
+    The URL is made absolute, the scheme and host are lower-cased, default
+    ports, fragments, query strings and trailing slashes are dropped, and any
+    locale prefix before `/docs/` becomes `en-US`.
+
+    Args:
+        url (str): URL or path
+        base (str, optional): Base URL for relative URLs
+
+    Returns:
+        str: The canonical URL
+    """
+    if base:
+        url = urljoin(base, url)
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port and (scheme, parsed.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parsed.port}"
+    parts = parsed.path.split('/')
+    if len(parts) > 2 and parts[2] == 'docs' and LOCALE_PATTERN.match(parts[1]):
+        parts[1] = 'en-US'
+    path = '/'.join(parts).rstrip('/') or '/'
+    return urlunparse((scheme, host, path, '', '', ''))
+
+
+def is_css_doc_page(url):
+    """Check if the URL is a CSS documentation page."""
+    path = urlparse(url).path
+    if '/docs/Web/CSS' not in path:
+        return False
+    return not any(pattern in path for pattern in EXCLUDED_PATTERNS)
+
+
+@lru_cache(maxsize=65536)
+def _child_link(href, base_url):
+    """
+    The canonical URL of a link to a CSS documentation page, or None.
+
+    Cached because every page repeats the same few hundred sidebar and
+    navigation links.
+    """
+    if '/docs/Web/CSS/' not in href:
+        return None
+    abs_url = canonicalize_url(href, base_url)
+    return abs_url if is_css_doc_page(abs_url) else None
+
+
+def _text(element):
+    """Stripped text of an element and its descendants (BeautifulSoup's `.text`)."""
+    return ''.join(element.itertext()).strip()
+
+
+def _string(element):
+    """
+    The element's only string, like BeautifulSoup's `.string`: its text if
+    that is its only child, the only string of its only child element, or
+    None if it has several children.
+    """
+    while True:
+        children = len(element)
+        if not children:
+            return element.text
+        if children > 1 or element.text or element[0].tail:
+            return None
+        element = element[0]
+
+
+def _elements_after(heading):
+    """Yield the sibling elements after a heading, up to the next h2."""
+    for sibling in heading.itersiblings():
+        if not isinstance(sibling.tag, str):  # Comments and processing instructions
+            continue
+        if sibling.tag == 'h2':
+            return
+        yield sibling
+
+
+def _classify_heading(tag, element, sections):
+    """
+    Record which content sections a heading opens.
+
+    Each section belongs to the first heading that matches it, as with
+    `soup.find`.
+
+    Returns:
+        list: Names of the sections newly opened by this heading
+    """
+    opened = []
+    text = _string(element)
+    matches = {}
+    if text:
+        matches['values'] = 'Values' in text or 'Parameters' in text
+        matches['formal_definition'] = 'Formal' in text and 'definition' in text.lower()
+        matches['examples'] = 'Example' in text
+        if tag == 'h2':
+            matches['syntax'] = 'Syntax' in text
+            matches['see_also'] = 'See also' in text
+            matches['specifications'] = 'Specification' in text
+    if tag == 'h2':
+        matches['browser_compatibility'] = 'browser_compatibility' in (element.get('id') or '')
+    for name, matched in matches.items():
+        if matched and name not in sections:
+            sections[name] = element
+            opened.append(name)
+    return opened
+
+
+def _syntax(heading):
+    return [_text(element) for element in _elements_after(heading) if element.tag == 'pre']
+
+
+def _values(heading):
+    values = []
+    for element in _elements_after(heading):
+        if element.tag == 'dl':
+            for dt, dd in zip(element.iter('dt'), element.iter('dd')):
+                values.append({"name": _text(dt), "description": _text(dd)})
+    return values
+
+
+def _formal_definition(table):
+    definition = {}
+    for row in table.iter('tr'):
+        cells = list(row.iter('th', 'td'))
+        if len(cells) >= 2:
+            definition[_text(cells[0])] = _text(cells[1])
+    return definition
+
+
+def _examples(heading):
+    examples = []
+    current = {"title": "", "description": "", "code": ""}
+    for element in _elements_after(heading):
+        if element.tag == 'h3':
+            if current["code"] or current["description"]:
+                examples.append(current)
+            current = {"title": _text(element), "description": "", "code": ""}
+        elif element.tag == 'pre':
+            current["code"] += _text(element) + "\n"
+        elif element.tag in ('p', 'ul', 'ol'):
+            current["description"] += _text(element) + "\n"
+    if current["code"] or current["description"]:
+        examples.append(current)
+    return examples
+
+
+def _browser_compatibility(table):
+    compatibility = {}
+    browsers = [text for text in map(_text, table.iter('th')) if text and text != "Feature"]
+    for row in list(table.iter('tr'))[1:]:  # Skip header row
+        cells = list(row.iter('th', 'td'))
+        if cells:
+            compatibility[_text(cells[0])] = {browser: _text(cells[i + 1])
+                                              for i, browser in enumerate(browsers) if i + 1 < len(cells)}
+    return compatibility
+
+
+def _see_also(heading, base_url):
+    see_also = []
+    links_section = next(heading.itersiblings(), None)
+    while links_section is not None and not isinstance(links_section.tag, str):
+        links_section = links_section.getnext()
+    if links_section is None or links_section.tag != 'ul':
+        return see_also
+    for li in links_section.iter('li'):
+        link = li.find('.//a')
+        if link is not None and link.get('href'):
+            href = link.get('href')
+            if not href.startswith(('http://', 'https://')):
+                href = urljoin(base_url, href)
+            see_also.append({"text": _text(link), "url": href})
+    return see_also
+
+
+def _specifications(table, base_url):
+    specs = []
+    for row in list(table.iter('tr'))[1:]:  # Skip header
+        cells = list(row.iter('td', 'th'))
+        if len(cells) >= 2:
+            spec_link = cells[0].find('.//a')
+            if spec_link is not None:
+                specs.append({
+                    "name": _text(spec_link),
+                    "url": urljoin(base_url, spec_link.get('href')) if spec_link.get('href') else "",
+                    "status": _text(cells[1])
+                })
+    return specs
+
+
+def extract_page(url, html, base_url):
+    """
+    Extract the structured content and child links of an MDN page in one pass.
+
+    Args:
+        url (str): URL of the page
+        html (str | bytes): The page source
+        base_url (str): Site root that relative links are resolved against
+
+    Returns:
+        dict: {"content": {...}, "child_links": [...]} in the shape of
+            `MDNCSScraper._page_from_soup`
+    """
+    if etree is None:
+        raise ImportError("The single-pass extractor needs lxml (pip install lxml)")
+
+    title = None
+    paragraphs = []
+    sections = {}
+    tables = {}
+    waiting_for_table = []
+    child_links = {}
+    article = None
+    in_article = False
+
+    try:
+        # Plain etree elements; lxml.html's element classes add a lookup per node.
+        # Text is parsed as UTF-8 bytes, which lxml accepts even with an encoding declaration
+        if isinstance(html, str):
+            root = etree.fromstring(html.encode('utf-8'), etree.HTMLParser(encoding='utf-8'))
+        else:
+            root = etree.fromstring(html, etree.HTMLParser())
+    except (etree.ParserError, ValueError):  # Undecodable document
+        root = None
+
+    walk = etree.iterwalk(root, events=('start', 'end')) if root is not None else ()
+    for event, element in walk:
+        tag = element.tag
+        if event == 'end':
+            if in_article and element is article:
+                in_article = False
+            continue
+        if not isinstance(tag, str):
+            continue
+        if tag == 'a':
+            href = element.get('href')
+            if href is not None:
+                abs_url = _child_link(href, base_url)
+                if abs_url:
+                    child_links[abs_url] = None
+        elif tag == 'p':
+            if in_article and len(paragraphs) < 3:
+                text = _text(element)
+                if text:
+                    paragraphs.append(text)
+        elif tag == 'h2' or tag == 'h3':
+            opened = _classify_heading(tag, element, sections)
+            waiting_for_table.extend(name for name in opened if name in TABLE_SECTIONS)
+        elif tag == 'table':
+            for name in waiting_for_table:
+                tables[name] = element
+            waiting_for_table = []
+        elif tag == 'h1':
+            if title is None:
+                title = _text(element)
+        elif tag == 'article' and article is None:
+            article = element
+            in_article = True
+
+    content = {
+        "url": url,
+        "title": title or "",
+        "description": "\n\n".join(paragraphs),
+        "syntax": _syntax(sections['syntax']) if 'syntax' in sections else [],
+        "values": _values(sections['values']) if 'values' in sections else [],
+        "formal_definition": _formal_definition(tables['formal_definition']) if 'formal_definition' in tables else {},
+        "examples": _examples(sections['examples']) if 'examples' in sections else [],
+        "browser_compatibility": (_browser_compatibility(tables['browser_compatibility'])
+                                  if 'browser_compatibility' in tables else {}),
+        "see_also": _see_also(sections['see_also'], base_url) if 'see_also' in sections else [],
+        "specifications": (_specifications(tables['specifications'], base_url)
+                           if 'specifications' in tables else []),
+        "children": []
+    }
+    return {"content": content, "child_links": list(child_links)}
+
+
+def load_fixtures(paths):
+    """
+    Load saved pages for the benchmark.
+
+    Args:
+        paths (list): .html files, directories searched for .html files, or
+            cssget.py response caches (.sqlite)
+
+    Returns:
+        list: (url, html) pairs
+    """
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, filenames in sorted(os.walk(path)):
+                pages += load_fixtures([os.path.join(directory, name)
+                                        for name in sorted(filenames) if name.endswith('.html')])
+        elif path.endswith(('.sqlite', '.db')):
+            db = sqlite3.connect(path)
+            for url, body in db.execute("SELECT url, body FROM responses ORDER BY url"):
+                pages.append((url, zlib.decompress(body).decode('utf-8')))
+            db.close()
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                pages.append(("https://developer.mozilla.org/en-US/docs/Web/CSS/" +
+                              os.path.splitext(os.path.basename(path))[0], f.read()))
+    return pages
+
+
+def benchmark(paths, workers=None, rounds=3):
+    """
+    Compare pages/sec of the BeautifulSoup extractors and `extract_page`.
+
+    Args:
+        paths (list): Fixture paths, see `load_fixtures`
+        workers (int, optional): Size of the process pool (default: CPU count)
+        rounds (int): Passes over the fixtures per measurement
+    """
+    from cssget import MDNCSScraper
+
+    pages = load_fixtures(paths)
+    if not pages:
+        print("No pages found")
+        return
+    base_url = "https://developer.mozilla.org"
+    workers = workers or os.cpu_count()
+    scraper = MDNCSScraper(state_file=':memory:')
+
+    def measure(label, run):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            results = run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<36} {len(pages) * rounds / elapsed:9.1f} pages/s")
+        return results
+
+    size = sum(len(html) for _, html in pages)
+    print(f"{len(pages)} pages, {size / 1024 / 1024:.1f} MiB of HTML, {rounds} rounds")
+    baseline = measure("BeautifulSoup html.parser, 10 scans",
+                       lambda: [scraper._parse_page(url, html) for url, html in pages])
+    fast = measure("lxml single pass",
+                   lambda: [extract_page(url, html, base_url) for url, html in pages])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(extract_page, *zip(*pages[:workers]), [base_url] * workers))  # Warm up the workers
+        measure(f"lxml single pass, {workers} processes",
+                lambda: list(pool.map(extract_page, *zip(*pages), [base_url] * len(pages),
+                                      chunksize=max(1, len(pages) // (workers * 4)))))
+
+    mismatches = [url for (url, _), old, new in zip(pages, baseline, fast)
+                  if old["content"] != new["content"] or set(old["child_links"]) != set(new["child_links"])]
+    print(f"{len(mismatches)} of {len(pages)} pages extract differently" + (":" if mismatches else ""))
+    for url in mismatches[:10]:
+        print(f"  {url}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+
+    if args[0] == '--benchmark':
+        args = args[1:]
+        workers = None
+        if args[:1] == ['--workers']:
+            workers, args = int(args[1]), args[2:]
+        benchmark(args, workers)
+    else:
+        for url, html in load_fixtures(args):
+            print(json.dumps(extract_page(url, html, "https://developer.mozilla.org"), indent=2))
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Frozen Lookup Module Generator
+--------------------------------------
+Generates an importable Python module with the dataset as constant tables,
+for short-lived processes (pre-commit hooks) where parsing the JSON at
+startup dominates their run time.
+
+The generated `cssdata_frozen.py` holds, per category, the sorted entry
+names as one tuple constant, looked up by binary search, and the light
+fields as compact constants: `status` as one byte per entry and, for
+properties, `inherited` as one byte and `initial` as a tuple. Everything is
+a literal that the compiler folds into the module's code object, so once
+the module is cached as `.pyc` an import only unmarshals a few constants and
+builds nothing else. Heavy fields (`syntax`, `mdn_url` and the full
+entries) live in `cssdata_frozen_heavy.py`, which is imported on first
+access.
+
+merge_cssdata.py writes both modules with `--python-module`.
+
+Usage:
+    python cssfrozen.py [merged.json [output_dir]]
+    python cssfrozen.py --benchmark          # compares `python -X importtime` with loading the JSON
+"""
+
+import json
+import os
+import py_compile
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_FILE = os.path.join(ROOT_DIR, 'cssdata-merged.json')
+DEFAULT_OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULE_NAME = 'cssdata_frozen'
+
+# Status byte of entries without a `status`
+NO_STATUS = 255
+
+_LIGHT_TEMPLATE = '''"""
+Frozen CSSDATA lookup tables for dataset {version}.
+
+Generated by merge_cssdata.py --python-module (pythoncode/cssfrozen.py); do not edit.
+
+    import {module}
+    {module}.status('properties', 'zoom')        # 'standard'
+    {module}.inherited('color')                  # True
+    {module}.syntax('properties', 'margin')      # loads {module}_heavy on first use
+"""
+
+from bisect import bisect_left
+
+VERSION = {version!r}
+CONTENT_HASH = {content_hash!r}
+CATEGORIES = {categories!r}
+STATUSES = {statuses!r}
+
+# Sorted entry names per category
+_NAMES = {{
+{names}
+}}
+# One byte per entry: index into STATUSES, {no_status} if the entry has no status
+_STATUS = {{
+{status}
+}}
+# Properties only, aligned with _NAMES['properties']
+_INHERITED = {inherited!r}
+_INITIAL = {initial!r}
+
+_heavy = None
+
+
+def index(category, name):
+    """Return the position of an entry in `names(category)`, or -1."""
+    names = _NAMES[category]
+    position = bisect_left(names, name)
+    return position if position < len(names) and names[position] == name else -1
+
+
+def is_known(category, name):
+    """Return True if the category has an entry with this name."""
+    return index(category, name) >= 0
+
+
+def names(category):
+    """Return the sorted entry names of a category."""
+    return _NAMES[category]
+
+
+def status(category, name):
+    """Return the `status` of an entry, or None if it has none or does not exist."""
+    position = index(category, name)
+    if position < 0:
+        return None
+    value = _STATUS[category][position]
+    return None if value == {no_status} else STATUSES[value]
+
+
+def inherited(name):
+    """Return whether a property is inherited, or None for an unknown property."""
+    position = index('properties', name)
+    return bool(_INHERITED[position]) if position >= 0 else None
+
+
+def initial(name):
+    """Return the `initial` value of a property (a tuple of longhands for shorthands), or None."""
+    position = index('properties', name)
+    return _INITIAL[position] if position >= 0 else None
+
+
+def _heavy_tables():
+    global _heavy
+    if _heavy is None:
+        import importlib
+        _heavy = importlib.import_module(__name__ + '_heavy')
+    return _heavy
+
+
+def syntax(category, name):
+    """Return the `syntax` of an entry, or None."""
+    position = index(category, name)
+    return _heavy_tables().SYNTAX[category][position] if position >= 0 else None
+
+
+def mdn_url(category, name):
+    """Return the `mdn_url` of an entry, or None."""
+    position = index(category, name)
+    return _heavy_tables().MDN_URL[category][position] if position >= 0 else None
+
+
+def entry(category, name):
+    """Return the full entry as a new dict, or None."""
+    position = index(category, name)
+    if position < 0:
+        return None
+    import json
+    return json.loads(_heavy_tables().ENTRIES[category][position])
+'''
+
+_HEAVY_TEMPLATE = '''"""
+Heavy fields of {module} for dataset {version}, imported on first access.
+
+Generated by merge_cssdata.py --python-module (pythoncode/cssfrozen.py); do not edit.
+"""
+
+# Aligned with {module}.names(category)
+SYNTAX = {{
+{syntax}
+}}
+MDN_URL = {{
+{mdn_url}
+}}
+# Full entries as JSON text, decoded by {module}.entry()
+ENTRIES = {{
+{entries}
+}}
+'''
+
+
+def _table(rows):
+    return "\n".join(f"    {category!r}: {value!r}," for category, value in rows)
+
+
+def render_modules(merged, module=MODULE_NAME):
+    """
+    Render the frozen lookup modules for a merged dataset.
+
+    Args:
+        merged (dict): The merged dataset (as written to cssdata-merged.json)
+        module (str): Name of the light module; the heavy one is `module + '_heavy'`
+
+    Returns:
+        tuple: (light module source, heavy module source) as UTF-8 bytes
+    """
+    meta = merged.get('meta', {})
+    categories = tuple(name for name, entries in merged.items() if isinstance(entries, dict) and name != 'meta')
+    names = {category: tuple(sorted(merged[category])) for category in categories}
+    found = {entry.get('status') for category in categories for entry in merged[category].values()} - {None}
+    statuses = tuple(sorted(found, key=lambda status: (status != 'standard', status)))
+    status_index = {status: position for position, status in enumerate(statuses)}
+
+    status_bytes = {
+        category: bytes(status_index.get(merged[category][name].get('status'), NO_STATUS) for name in names[category])
+        for category in categories
+    }
+    properties = merged.get('properties', {})
+    property_names = names.get('properties', ())
+    inherited = bytes(bool(properties[name].get('inherited')) for name in property_names)
+    initial = tuple(tuple(value) if isinstance(value, list) else value
+                    for value in (properties[name].get('initial') for name in property_names))
+
+    light = _LIGHT_TEMPLATE.format(
+        module=module,
+        version=meta.get('version', ''),
+        content_hash=meta.get('contentHash', ''),
+        categories=categories,
+        statuses=statuses,
+        no_status=NO_STATUS,
+        names=_table((category, names[category]) for category in categories),
+        status=_table((category, status_bytes[category]) for category in categories),
+        inherited=inherited,
+        initial=initial,
+    )
+    heavy = _HEAVY_TEMPLATE.format(
+        module=module,
+        version=meta.get('version', ''),
+        syntax=_table((category, tuple(merged[category][name].get('syntax') for name in names[category]))
+                      for category in categories),
+        mdn_url=_table((category, tuple(merged[category][name].get('mdn_url') for name in names[category]))
+                       for category in categories),
+        entries=_table((category, tuple(json.dumps(merged[category][name], ensure_ascii=False, separators=(',', ':'))
+                                        for name in names[category]))
+                       for category in categories),
+    )
+    return light.encode('utf-8'), heavy.encode('utf-8')
+
+
+def module_paths(output_dir=None, module=MODULE_NAME):
+    """Return the paths of the light and heavy module."""
+    output_dir = output_dir or DEFAULT_OUTPUT_DIR
+    return os.path.join(output_dir, f"{module}.py"), os.path.join(output_dir, f"{module}_heavy.py")
+
+
+def write_modules(merged, output_dir=None, module=MODULE_NAME):
+    """
+    Write the frozen lookup modules and byte-compile them.
+
+    The `.pyc` files are written even where bytecode writing is disabled
+    (PYTHONDONTWRITEBYTECODE), so the first process to import the modules
+    does not pay for compiling them.
+
+    Returns:
+        list: (path, size in bytes) of each module written
+    """
+    written = []
+    for path, source in zip(module_paths(output_dir, module), render_modules(merged, module)):
+        with open(path, 'wb') as f:
+            f.write(source)
+        py_compile.compile(path, doraise=True)
+        written.append((path, len(source)))
+    return written
+
+
+def _import_time(statement, cwd, rounds):
+    """Best self+cumulative import time in microseconds of the last module `statement` imports, over `rounds` runs."""
+    best = None
+    for _ in range(rounds):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                                cwd=cwd, capture_output=True, text=True, check=True)
+        lines = [line for line in result.stderr.splitlines() if line.startswith('import time:') and '|' in line]
+        cumulative = int(lines[-1].split('|')[1])
+        best = cumulative if best is None else min(best, cumulative)
+    return best
+
+
+def benchmark(json_path=None, output_dir=None, rounds=10):
+    """
+    Compare the startup cost of the frozen module with loading the JSON file.
+
+    Each measurement is a fresh interpreter run with `-X importtime` and the
+    best of `rounds` runs is reported.
+
+    Returns:
+        dict: Import times in microseconds and the wall time of a complete lookup process
+    """
+    import time
+
+    json_path = json_path or DEFAULT_DATA_FILE
+    output_dir = output_dir or DEFAULT_OUTPUT_DIR
+    if not os.path.exists(module_paths(output_dir)[0]):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            write_modules(json.load(f), output_dir)
+
+    def process_time(statement):
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', statement], cwd=output_dir, check=True)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
+
+    frozen_lookup = f"import {MODULE_NAME} as d; d.status('properties', 'zoom'); d.inherited('color')"
+    json_lookup = (f"import json; d = json.load(open({json_path!r}, encoding='utf-8')); "
+                   "d['properties']['zoom'].get('status'); d['properties']['color']['inherited']")
+    return {
+        "frozen_import_us": _import_time(f"import {MODULE_NAME}", output_dir, rounds),
+        "frozen_heavy_import_us": _import_time(f"import {MODULE_NAME}_heavy", output_dir, rounds),
+        "json_import_us": _import_time("import json", output_dir, rounds),
+        "frozen_lookup_process_ms": process_time(frozen_lookup),
+        "json_lookup_process_ms": process_time(json_lookup),
+        "empty_process_ms": process_time("pass"),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == '--benchmark':
+        print(json.dumps(benchmark(), indent=2))
+    elif len(sys.argv) <= 3:
+        with open(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for path, size in write_modules(data, sys.argv[2] if len(sys.argv) > 2 else None):
+            print(f"Wrote {path} ({size / 1024:.1f} KiB)")
+    else:
+        print("Usage: cssfrozen.py [merged.json [output_dir]] | --benchmark")
+        sys.exit(2)
@@ -10,15 +10,32 @@ Created: 2025-05-27
 
 import requests
 from bs4 import BeautifulSoup
+import argparse
+import asyncio
+import heapq
 import json
 import time
 import os
 import re
 import random
-from urllib.parse import urljoin, urlparse
-from collections import defaultdict
+import sqlite3
+import sys
+import threading
+import warnings
+import zlib
+from urllib.parse import urldefrag, urljoin, urlparse
+from collections import defaultdict, deque
+from email.utils import parsedate_to_datetime
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from cssextract import canonicalize_url, extract_page, is_css_doc_page
+from cssmetrics import LogLimiter, Metrics, print_snapshot
+
+try:
+    import aiohttp
+except ImportError:  # Only needed for the asyncio crawl (--async)
+    aiohttp = None
 
 # Configure logging
 logging.basicConfig(
@@ -31,6 +48,625 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class CrawlFrontier:
+    """
+    The queue of URLs still to crawl: a deque for FIFO order plus a set of
+    every canonical URL ever queued, so enqueueing, dequeueing and duplicate
+    checks are all O(1). Safe to use from several threads.
+    """
+    
+    def __init__(self, pending=(), seen=()):
+        """
+        Initialize the frontier.
+        
+        Args:
+            pending (iterable): Canonical URLs to queue, e.g. from a resumed crawl
+            seen (iterable): Canonical URLs already queued or crawled
+        """
+        self._queue = deque(pending)
+        self._seen = set(seen)
+        self._seen.update(self._queue)
+        self._lock = threading.Lock()
+        self.stats = {"queued": len(self._queue), "duplicates": 0, "canonicalized": 0}
+    
+    def push(self, url, queue=True):
+        """
+        Queue a URL unless its canonical form was seen before.
+        
+        Args:
+            url (str): Absolute URL
+            queue (bool): Append it to the queue; False only records it as seen,
+                for callers that hand URLs out through a queue of their own
+            
+        Returns:
+            str: The queued canonical URL, or None for a duplicate
+        """
+        canonical = canonicalize_url(url)
+        with self._lock:
+            if canonical != url:
+                self.stats["canonicalized"] += 1
+            if canonical in self._seen:
+                self.stats["duplicates"] += 1
+                return None
+            self._seen.add(canonical)
+            if queue:
+                self._queue.append(canonical)
+            self.stats["queued"] += 1
+        return canonical
+    
+    def pop(self):
+        """Return the oldest queued URL, or None if the frontier is empty."""
+        with self._lock:
+            return self._queue.popleft() if self._queue else None
+    
+    def __contains__(self, url):
+        return canonicalize_url(url) in self._seen
+    
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._queue))
+    
+    def __len__(self):
+        return len(self._queue)
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header.
+    
+    Args:
+        value (str): Delay in seconds or an HTTP date
+        
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Per-host token bucket shared by all fetch threads and asyncio workers.
+    
+    Each request reserves a token and waits until the bucket refills to it,
+    so the aggregate rate to a host never exceeds its budget no matter how
+    many workers there are. The budget adapts with AIMD: a 429 or 503 halves
+    it (at most once per interval) and pauses the host for its Retry-After,
+    and every successful response raises it by a small step back up to the
+    configured rate.
+    """
+    
+    THROTTLE_STATUSES = (429, 503)
+    MIN_RATE = 0.05
+    # Share of the configured rate regained per successful response
+    INCREASE = 0.05
+    
+    def __init__(self, rate, burst=1):
+        """
+        Initialize the limiter.
+        
+        Args:
+            rate (float): Maximum requests per second to each host
+            burst (int): Requests that may be sent back to back after an idle period
+        """
+        self.rate = rate
+        self.burst = burst
+        self.hosts = {}
+        self.lock = threading.Lock()
+        self.stats = {"throttled": 0}
+    
+    def _bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = {"rate": self.rate, "tokens": float(self.burst), "updated": time.monotonic(),
+                                "cooldown": 0.0}
+        return self.hosts[host]
+    
+    def reserve(self, url):
+        """
+        Take a token for a request to the URL's host.
+        
+        Returns:
+            float: Seconds the caller must wait before sending the request
+        """
+        with self.lock:
+            bucket = self._bucket(url)
+            now = time.monotonic()
+            # `updated` is in the future while the host is paused
+            if now > bucket["updated"]:
+                bucket["tokens"] = min(self.burst, bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+                bucket["updated"] = now
+            bucket["tokens"] -= 1
+            return max(0.0, bucket["updated"] - now) + max(0.0, -bucket["tokens"]) / bucket["rate"]
+    
+    def record(self, url, status, retry_after=None):
+        """
+        Adapt the host's rate to a response.
+        
+        Args:
+            url (str): Requested URL
+            status (int): HTTP status
+            retry_after (float, optional): Parsed Retry-After header
+        """
+        with self.lock:
+            bucket = self._bucket(url)
+            now = time.monotonic()
+            if status in self.THROTTLE_STATUSES:
+                self.stats["throttled"] += 1
+                # Responses to requests already in flight must not halve the rate again
+                if now >= bucket["cooldown"]:
+                    bucket["rate"] = max(self.MIN_RATE, bucket["rate"] / 2)
+                    bucket["cooldown"] = now + 1 / bucket["rate"]
+                    logger.warning(f"Throttled by {urlparse(url).netloc}; rate lowered to {bucket['rate']:.2f} req/s")
+                if retry_after:
+                    bucket["tokens"] = min(bucket["tokens"], 0.0)
+                    bucket["updated"] = max(bucket["updated"], now + retry_after)
+            elif status < 500:
+                bucket["rate"] = min(self.rate, bucket["rate"] + self.rate * self.INCREASE)
+    
+    def current_rate(self, url):
+        """Return the current request budget for the URL's host."""
+        with self.lock:
+            return self._bucket(url)["rate"]
+
+
+class RetryScheduler:
+    """
+    Schedules transient failures (timeouts, connection errors, 429 and 5xx
+    responses) for another attempt after an exponential backoff with jitter,
+    honoring Retry-After when the server sends one. URLs become due in a heap
+    that the crawl loops drain; a URL that fails every attempt is given up
+    and counted, never silently dropped.
+    """
+    
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=60.0):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            max_attempts (int): Retries per URL before giving up
+            base_delay (float): Backoff before the first retry in seconds
+            max_delay (float): Upper bound of the backoff in seconds
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts = {}
+        self._due = []
+        self._pending = set()
+        self.lock = threading.Lock()
+        self.stats = {"retried": 0, "gave_up": 0}
+    
+    def schedule(self, url, retry_after=None):
+        """
+        Schedule another attempt at a URL.
+        
+        Returns:
+            float: Seconds until the retry, or None if the URL has used up its attempts
+        """
+        with self.lock:
+            attempt = self.attempts.get(url, 0) + 1
+            if attempt > self.max_attempts:
+                self.stats["gave_up"] += 1
+                return None
+            self.attempts[url] = attempt
+            # "Equal jitter": half the backoff is fixed, half random, so retries spread out
+            backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+            if retry_after:
+                delay = max(delay, retry_after)
+            heapq.heappush(self._due, (time.monotonic() + delay, url))
+            self._pending.add(url)
+            self.stats["retried"] += 1
+            return delay
+    
+    def pop_due(self, limit=None):
+        """Remove and return the URLs whose retry is due (at most `limit`)."""
+        due = []
+        with self.lock:
+            now = time.monotonic()
+            while self._due and self._due[0][0] <= now and (limit is None or len(due) < limit):
+                _, url = heapq.heappop(self._due)
+                self._pending.discard(url)
+                due.append(url)
+        return due
+    
+    def wait(self):
+        """Return the seconds until the next retry is due."""
+        with self.lock:
+            return max(0.0, self._due[0][0] - time.monotonic()) if self._due else 0.0
+    
+    def __contains__(self, url):
+        return url in self._pending
+    
+    def __len__(self):
+        return len(self._due)
+
+
+class CrawlState:
+    """
+    Persistent crawl state in an SQLite database in WAL mode.
+    
+    The frontier table holds every URL ever queued with its status (queued,
+    done, failed, or skipped as already visited) and the pages table the extracted content of every done
+    page. Each change is a single-row write, and a checkpoint is a commit of
+    the changes since the previous one, so its cost is proportional to the
+    pages changed rather than to the size of the tree.
+    """
+    
+    QUEUED = 'queued'
+    DONE = 'done'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+    
+    def __init__(self, path):
+        """
+        Open (or create) a state database.
+        
+        Args:
+            path (str): Path to the SQLite file
+        """
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS frontier (url TEXT PRIMARY KEY, status TEXT NOT NULL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, content TEXT NOT NULL)")
+        self.db.commit()
+    
+    def is_empty(self):
+        """Return True if no crawl has been recorded yet."""
+        return self.db.execute("SELECT 1 FROM frontier LIMIT 1").fetchone() is None
+    
+    def enqueue(self, urls):
+        """Record newly queued URLs; URLs already known keep their status."""
+        self.db.executemany("INSERT OR IGNORE INTO frontier (url, status) VALUES (?, ?)",
+                            ((url, self.QUEUED) for url in urls))
+    
+    def complete(self, url, content):
+        """Record a processed page and its extracted content."""
+        self.db.execute("INSERT INTO frontier (url, status) VALUES (?, ?) "
+                        "ON CONFLICT(url) DO UPDATE SET status = excluded.status", (url, self.DONE))
+        self.db.execute("INSERT OR REPLACE INTO pages (url, content) VALUES (?, ?)",
+                        (url, json.dumps(content, ensure_ascii=False)))
+    
+    def fail(self, url):
+        """Record a page that could not be fetched (unless it was already processed)."""
+        self.db.execute("UPDATE frontier SET status = ? WHERE url = ? AND status = ?", (self.FAILED, url, self.QUEUED))
+    
+    def skip(self, url):
+        """Record a URL that needed no fetch, e.g. one redirected to an already visited page."""
+        self.db.execute("UPDATE frontier SET status = ? WHERE url = ? AND status = ?", (self.SKIPPED, url, self.QUEUED))
+    
+    def pending(self):
+        """Return the queued (including in-flight) URLs in the order they were queued."""
+        return [url for url, in self.db.execute("SELECT url FROM frontier WHERE status = ? ORDER BY rowid", (self.QUEUED,))]
+    
+    def visited(self):
+        """Return the URLs that were processed or failed."""
+        return {url for url, in self.db.execute("SELECT url FROM frontier WHERE status != ?", (self.QUEUED,))}
+    
+    def known(self):
+        """Return every URL in the frontier."""
+        return {url for url, in self.db.execute("SELECT url FROM frontier")}
+    
+    def pages(self):
+        """Yield (url, content) of every processed page in the order it was recorded."""
+        for url, content in self.db.execute("SELECT url, content FROM pages ORDER BY rowid"):
+            yield url, json.loads(content)
+    
+    def reset(self):
+        """Forget the recorded crawl, so the next one starts over."""
+        self.db.execute("DELETE FROM frontier")
+        self.db.execute("DELETE FROM pages")
+        self.db.commit()
+    
+    def commit(self):
+        """Make the changes since the last commit durable."""
+        self.db.commit()
+    
+    def close(self):
+        """Commit and close the database."""
+        self.db.commit()
+        self.db.close()
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache for re-crawls, in an SQLite database.
+    
+    Each URL (without its fragment) maps to the compressed response body, its
+    ETag and Last-Modified validators, and the page extracted from it, so a
+    304 Not Modified can reuse the extraction without parsing the body again.
+    """
+    
+    def __init__(self, path):
+        """
+        Open (or create) a cache database.
+        
+        Args:
+            path (str): Path to the SQLite file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                        "body BLOB NOT NULL, page TEXT, fetched_at REAL NOT NULL)")
+        self.db.commit()
+    
+    @staticmethod
+    def key(url):
+        """Return the cache key of a URL."""
+        return urldefrag(url)[0]
+    
+    def get(self, url):
+        """
+        Look up a cached response.
+        
+        Args:
+            url (str): Page URL
+            
+        Returns:
+            dict: body, etag, last_modified and page (or None if not extracted), or None if not cached
+        """
+        with self.lock:
+            row = self.db.execute("SELECT body, etag, last_modified, page FROM responses WHERE url = ?",
+                                  (self.key(url),)).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, page = row
+        return {
+            "body": zlib.decompress(body).decode('utf-8'),
+            "etag": etag,
+            "last_modified": last_modified,
+            "page": json.loads(page) if page else None,
+        }
+    
+    def store(self, url, body, etag, last_modified, page):
+        """
+        Cache a response and the page extracted from it.
+        
+        Args:
+            url (str): Page URL
+            body (str): Response body
+            etag (str): ETag header, if any
+            last_modified (str): Last-Modified header, if any
+            page (dict): Extracted page (`get_page_content` result with all child links)
+        """
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO responses (url, etag, last_modified, body, page, fetched_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (self.key(url), etag, last_modified, zlib.compress(body.encode('utf-8')),
+                             json.dumps(page, ensure_ascii=False), time.time()))
+            self.db.commit()
+    
+    def close(self):
+        """Close the database."""
+        with self.lock:
+            self.db.close()
+
+
+def clean_key_name(name):
+    """
+    Clean up a name for use as a key in the tree.
+    
+    Args:
+        name (str): Original name
+        
+    Returns:
+        str: Cleaned name
+    """
+    # Remove file extension if present
+    name = re.sub(r'\.html$', '', name)
+    
+    # Replace underscores with spaces
+    name = name.replace('_', ' ')
+    
+    return name
+
+
+def tree_path(url):
+    """
+    Keys under which a page is stored in the tree.
+    
+    Args:
+        url (str): URL of the page
+        
+    Returns:
+        list: Keys below the CSS root (empty for the root itself), or None for non-CSS pages
+    """
+    # Parse the URL to determine the category hierarchy
+    path = urlparse(url).path
+    parts = [p for p in path.split('/') if p and p not in ['en-US', 'docs', 'Web']]
+    
+    # Skip non-CSS pages
+    if not parts or parts[0] != 'CSS':
+        return None
+    
+    # Remove 'CSS' from the beginning
+    return [clean_key_name(part) for part in parts[1:]]
+
+
+def insert_page(tree, keys, page):
+    """
+    Add a page to the tree at the given keys, creating categories on the way.
+    
+    Args:
+        tree (dict): The tree
+        keys (list): Result of `tree_path`
+        page: The page's content (or a `_PageRef` while assembling from a page log)
+    """
+    current = tree
+    for i, key in enumerate(keys):
+        # If this is the last part, add the content
+        if i == len(keys) - 1:
+            current[key] = page
+        else:
+            # Create path if it doesn't exist
+            if key not in current:
+                current[key] = {}
+            current = current[key]
+
+
+class _PageRef:
+    """
+    A page of a tree assembled from a JSONL page log: the byte offset of its
+    line, plus any subpages stored inside it (as `insert_page` does with
+    content dicts).
+    """
+    
+    __slots__ = ('offset', 'children')
+    
+    def __init__(self, offset):
+        self.offset = offset
+        self.children = {}
+    
+    def __contains__(self, key):
+        return key in self.children
+    
+    def __getitem__(self, key):
+        return self.children[key]
+    
+    def __setitem__(self, key, value):
+        self.children[key] = value
+
+
+def count_pages(obj):
+    """Count the number of pages in a (sub)tree."""
+    if isinstance(obj, _PageRef):
+        return 1
+    if isinstance(obj, dict):
+        # If it's a page content dict with specific keys
+        if "url" in obj and "title" in obj:
+            return 1
+        
+        # Otherwise it's a category containing other items
+        return sum(count_pages(val) for val in obj.values())
+    
+    return 0
+
+
+def tree_depth(obj, current_depth=0):
+    """Get the maximum depth of a (sub)tree."""
+    if not isinstance(obj, dict) or not obj:
+        return current_depth
+    
+    # If this looks like a content object rather than a container
+    if "url" in obj and "title" in obj:
+        return current_depth
+    
+    # Otherwise, recurse into children
+    return max(tree_depth(child, current_depth + 1) for child in obj.values())
+
+
+def tree_stats(tree, total_pages):
+    """
+    Generate statistics about a tree.
+    
+    Args:
+        tree (dict): The tree
+        total_pages (int): Number of pages crawled
+        
+    Returns:
+        dict: Page count, timestamp, pages per top-level category and depth
+    """
+    return {
+        "total_pages": total_pages,
+        "scrape_timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        # Count items in each top-level category
+        "categories": {category: count_pages(content) for category, content in tree.items()},
+        "structure_depth": tree_depth(tree),
+    }
+
+
+def save_stats(output_file, stats):
+    """
+    Write the statistics next to the tree file.
+    
+    Returns:
+        str: Path of the statistics file
+    """
+    stats_file = os.path.splitext(output_file)[0] + "_stats.json"
+    with open(stats_file, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+    logger.info(f"Saved statistics to: {stats_file}")
+    return stats_file
+
+
+def _write_json(out, value, page_log, depth=0):
+    """Write a value as `json.dump(value, indent=2)` would at this depth, reading pages back from the log."""
+    if isinstance(value, _PageRef):
+        page_log.seek(value.offset)
+        content = json.loads(page_log.readline())
+        if not value.children:
+            out.write(json.dumps(content, indent=2).replace("\n", "\n" + "  " * depth))
+            return
+        # Subpages stored inside the page follow its own keys
+        content.update(value.children)
+        value = content
+    if not isinstance(value, dict) or not value:
+        out.write(json.dumps(value, indent=2).replace("\n", "\n" + "  " * depth))
+        return
+    indent = "  " * (depth + 1)
+    out.write("{")
+    for i, (key, child) in enumerate(value.items()):
+        out.write(("," if i else "") + "\n" + indent + json.dumps(key) + ": ")
+        _write_json(out, child, page_log, depth + 1)
+    out.write("\n" + "  " * depth + "}")
+
+
+def assemble_tree(jsonl_file, output_file):
+    """
+    Build the documentation tree and its statistics from a JSONL page log.
+    
+    One streaming pass over the log builds the tree's skeleton: its keys and
+    the byte offset of each page's line. Writing the tree then reads each
+    page back from the log on its own, so memory holds the skeleton and a
+    single page, however large the crawl. A page logged more than once (a
+    re-crawl after an interrupted run) takes the place of its earlier copy,
+    as it would in the in-memory tree.
+    
+    Args:
+        jsonl_file (str): Page log written by a `jsonl_file` crawl
+        output_file (str): Path of the tree JSON to write
+        
+    Returns:
+        dict: Statistics of the tree
+    """
+    tree = {}
+    urls = set()
+    with open(jsonl_file, 'rb') as page_log:
+        offset = 0
+        for number, line in enumerate(page_log, 1):
+            line_offset = offset
+            offset += len(line)
+            try:
+                url = json.loads(line)["url"]
+            except (ValueError, KeyError, TypeError):
+                # e.g. a line cut short by a crash
+                logger.warning(f"Skipping malformed line {number} of {jsonl_file}")
+                continue
+            urls.add(url)
+            keys = tree_path(url)
+            if keys:
+                insert_page(tree, keys, _PageRef(line_offset))
+        
+        with open(output_file, 'w', encoding='utf-8') as out:
+            _write_json(out, tree, page_log)
+    
+    logger.info(f"Assembled {len(urls)} pages from {jsonl_file} into {output_file}")
+    return tree_stats(tree, len(urls))
+
+
 class MDNCSScraper:
     """A scraper to extract all CSS documentation from MDN."""
     
@@ -45,25 +681,87 @@ class MDNCSScraper:
         "Connection": "keep-alive",
         "Upgrade-Insecure-Requests": "1",
     }
+    # Sections queued up front when crawling from the CSS docs root
+    KEY_SECTIONS = [
+        "/en-US/docs/Web/CSS/Reference",
+        "/en-US/docs/Web/CSS/CSS_Selectors",
+        "/en-US/docs/Web/CSS/CSS_Properties_Reference",
+        "/en-US/docs/Web/CSS/CSS_Values_and_Units",
+        "/en-US/docs/Web/CSS/Layout_cookbook",
+        "/en-US/docs/Web/CSS/CSS_Grid_Layout",
+        "/en-US/docs/Web/CSS/CSS_Flexible_Box_Layout",
+        "/en-US/docs/Web/CSS/Media_Queries"
+    ]
     
-    def __init__(self, output_file="mdn_css_complete.json", max_threads=5, delay_range=(1, 3)):
+    def __init__(self, output_file="mdn_css_complete.json", max_threads=5, rate=2.0, base_url=None,
+                 state_file="mdn_css_crawl.sqlite", cache_file=None, replay=False, fast_extract=False,
+                 extract_workers=0, max_retries=5, timeout=30, jsonl_file=None, metrics_json=None,
+                 metrics_prom=None, metrics_interval=10.0, delay_range=None):
         """
         Initialize the MDN CSS scraper.
         
         Args:
             output_file (str): Path to the output JSON file
-            max_threads (int): Maximum number of concurrent threads for scraping
-            delay_range (tuple): Range for random delay between requests in seconds
+            max_threads (int): Maximum number of concurrent threads (or asyncio workers) for scraping
+            rate (float): Request budget per host in requests/sec, lowered on 429/503 responses
+            base_url (str, optional): Site to crawl instead of BASE_URL, e.g. a local mirror
+            state_file (str): SQLite file holding the resumable crawl state
+            cache_file (str, optional): SQLite response cache; re-crawls revalidate cached pages
+            replay (bool): Serve every page from the cache without any network access
+            fast_extract (bool): Extract pages in a single lxml pass (cssextract.py) instead of BeautifulSoup
+            extract_workers (int): Run the single-pass extraction in this many worker processes (implies fast_extract)
+            max_retries (int): Retries of a timed out, throttled or 5xx request before the page is given up
+            timeout (float): Request timeout in seconds
+            jsonl_file (str, optional): Append each page to this JSONL log as it is processed instead of
+                keeping the tree in memory; `save_tree` assembles the tree from the log
+            metrics_json (str, optional): Write a JSON snapshot of the crawl metrics here during `crawl`
+            metrics_prom (str, optional): Write the crawl metrics here in the Prometheus text format
+            metrics_interval (float): Seconds between metrics exports
+            delay_range (tuple, optional): Deprecated; the (min, max) seconds each thread used to sleep
+                before a request. Converted to the equivalent `rate` of max_threads / mean delay
         """
+        # delay_range used to be the third positional argument
+        if isinstance(rate, (tuple, list)):
+            delay_range, rate = rate, 2.0
+        if delay_range is not None:
+            warnings.warn("delay_range is deprecated; pass rate (requests/sec per host) instead",
+                          DeprecationWarning, stacklevel=2)
+            rate = max_threads / max(sum(delay_range) / 2, 0.001)
+        if replay and not cache_file:
+            raise ValueError("Replay mode needs a response cache (cache_file)")
+        if base_url:
+            self.BASE_URL = base_url.rstrip('/')
+            self.CSS_DOCS_URL = f"{self.BASE_URL}/en-US/docs/Web/CSS"
         self.output_file = output_file
         self.max_threads = max_threads
-        self.delay_range = delay_range
+        self.limiter = RateLimiter(rate)
+        self.retries = RetryScheduler(max_retries)
+        self.timeout = timeout
         self.visited_urls = set()
+        self._visited_lock = threading.Lock()
+        self.frontier = CrawlFrontier()
+        self.redirect_duplicates = 0
         self.css_tree = defaultdict(dict)
+        self.page_log = open(jsonl_file, 'a', encoding='utf-8') if jsonl_file else None
+        self._log_lock = threading.Lock()
         self.session = requests.Session()
-        
-        # Create checkpoint directory
-        os.makedirs("checkpoints", exist_ok=True)
+        self.state = CrawlState(state_file)
+        self.cache = ResponseCache(cache_file) if cache_file else None
+        self.replay = replay
+        self.cache_stats = {"fetched": 0, "not_modified": 0, "replayed": 0, "missing": 0}
+        self._stats_lock = threading.Lock()
+        self.fast_extract = fast_extract or extract_workers > 0
+        self.extract_workers = extract_workers
+        self.extract_pool = None
+        # Stage timings, counters and gauges (cssmetrics.py); per-link debug logging is rate-limited
+        self.metrics = Metrics("cssget")
+        self.metrics_files = (metrics_json, metrics_prom)
+        self.metrics_interval = metrics_interval
+        self.link_log = LogLimiter()
+        self.metrics.watch("retry_queue", lambda: len(self.retries))
+        self.metrics.watch("visited_urls", lambda: len(self.visited_urls))
+        self.metrics.watch("duplicate_links", lambda: self.frontier.stats["duplicates"])
+        self.metrics.watch("request_rate", lambda: self.limiter.current_rate(self.CSS_DOCS_URL))
         
     def request_page(self, url):
         """
@@ -75,23 +773,129 @@ class MDNCSScraper:
         Returns:
             BeautifulSoup: Parsed HTML content or None if failed
         """
-        try:
-            # Add random delay to avoid overloading the server
-            time.sleep(random.uniform(*self.delay_range))
+        if self.replay:
+            cached = self.cache.get(url)
+            return BeautifulSoup(cached["body"], 'html.parser') if cached else None
+        
+        response = self.fetch_page(url)
+        if response is None:
+            return None
+        status, html = response[:2]
+        if status == 200:
+            return BeautifulSoup(html, 'html.parser')
+        logger.warning(f"Failed to fetch {url}, status code: {status}")
+        return None
+    
+    def fetch_page(self, url, cached=None):
+        """
+        Fetch a page, revalidating a cached copy if there is one.
+        
+        Args:
+            url (str): The URL to request
+            cached (dict, optional): Cached response whose validators are sent
             
-            response = self.session.get(url, headers=self.HEADERS, timeout=30)
+        Returns:
+            tuple: (status, body, ETag, Last-Modified, final URL after redirects, Retry-After seconds),
+                or None if the request failed
+        """
+        headers = self._request_headers(cached)
+        try:
+            # Wait for this host's rate limiter
+            wait = self.limiter.reserve(url)
+            self.metrics.observe("rate_limit_wait", wait)
+            time.sleep(wait)
             
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                return soup
-            else:
-                logger.warning(f"Failed to fetch {url}, status code: {response.status_code}")
-                return None
+            self.metrics.add("requests_in_flight", 1)
+            try:
+                with self.metrics.timer("fetch"):
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+            finally:
+                self.metrics.add("requests_in_flight", -1)
+            self.metrics.count("responses", status=response.status_code)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.limiter.record(url, response.status_code, retry_after)
+            return (response.status_code, response.text, response.headers.get('ETag'),
+                    response.headers.get('Last-Modified'), response.url, retry_after)
                 
         except Exception as e:
+            self.metrics.count("request_errors")
             logger.error(f"Error fetching {url}: {str(e)}")
             return None
     
+    def _request_headers(self, cached):
+        """Request headers, with conditional validators for a cached response."""
+        if not cached:
+            return self.HEADERS
+        headers = dict(self.HEADERS)
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+    
+    def _claim(self, url):
+        """
+        Atomically mark a URL as visited.
+        
+        Returns:
+            bool: True if the caller should process the URL, False if it was already visited
+        """
+        with self._visited_lock:
+            if url in self.visited_urls:
+                return False
+            self.visited_urls.add(url)
+            return True
+    
+    def _is_redirect_duplicate(self, url, final_url):
+        """
+        Check whether a request was redirected to a page that was already visited.
+        
+        The redirect target is claimed as visited, so it is not fetched again
+        under its own URL either.
+        """
+        final_url = canonicalize_url(final_url) if final_url else url
+        if final_url == url:
+            return False
+        if self._claim(final_url):
+            return False
+        with self._visited_lock:
+            self.redirect_duplicates += 1
+        logger.info(f"Skipping {url}: redirected to already visited {final_url}")
+        return True
+    
+    def _retry_later(self, url, response):
+        """
+        Schedule a retry if a request failed transiently.
+        
+        Timeouts, connection errors, 429 and 5xx responses are retried; the
+        URL is released from the visited set so the retry can claim it again.
+        
+        Args:
+            url (str): Requested URL
+            response (tuple): Result of `fetch_page`, None if the request failed
+            
+        Returns:
+            bool: True if a retry was scheduled, False if the response is final
+        """
+        status = response[0] if response is not None else None
+        if status is not None and status < 500 and status not in RateLimiter.THROTTLE_STATUSES:
+            return False
+        delay = self.retries.schedule(url, response[5] if response is not None else None)
+        if delay is None:
+            self.metrics.count("pages_given_up")
+            logger.error(f"Giving up on {url} after {self.retries.max_attempts} retries")
+            return False
+        with self._visited_lock:
+            self.visited_urls.discard(url)
+        self.metrics.count("retries")
+        logger.warning(f"Retrying {url} in {delay:.1f}s ({status or 'request failed'})")
+        return True
+    
+    def _count(self, key):
+        with self._stats_lock:
+            self.cache_stats[key] += 1
+        self.metrics.count("cache", outcome=key)
+    
     def get_page_content(self, url):
         """
         Extract structured content from an MDN page.
@@ -100,36 +904,100 @@ class MDNCSScraper:
             url (str): URL of the page to scrape
             
         Returns:
-            dict: Structured content of the page
+            dict: Structured content of the page, empty if it could not be fetched (or a
+                retry was scheduled), or None if it was skipped as already visited
         """
         # Skip if already visited
-        if url in self.visited_urls:
-            return {}
+        url = canonicalize_url(url)
+        if not self._claim(url):
+            return None
         
-        self.visited_urls.add(url)
         logger.info(f"Processing: {url}")
         
-        soup = self.request_page(url)
-        if not soup:
-            return {}
-        
-        # Extract page metadata
-        content = {
-            "url": url,
-            "title": self._extract_title(soup),
-            "description": self._extract_description(soup),
-            "syntax": self._extract_syntax(soup),
-            "values": self._extract_values(soup),
-            "formal_definition": self._extract_formal_definition(soup),
-            "examples": self._extract_examples(soup),
-            "browser_compatibility": self._extract_browser_compatibility(soup),
-            "see_also": self._extract_see_also(soup),
-            "specifications": self._extract_specifications(soup),
-            "children": []
+        cached = self.cache.get(url) if self.cache else None
+        if self.replay:
+            if cached is None:
+                self._count("missing")
+                logger.warning(f"Not in the response cache: {url}")
+                return {}
+            self._count("replayed")
+            page = self._parse_page(url, cached["body"])
+        else:
+            response = self.fetch_page(url, cached)
+            if self._retry_later(url, response):
+                return {}
+            if response is None:
+                return {}
+            if self._is_redirect_duplicate(url, response[4]):
+                return None
+            page = self._page_from_response(url, cached, *response[:4])
+            if page is None:
+                return {}
+        
+        return self._drop_visited_links(page)
+    
+    def _page_from_response(self, url, cached, status, html, etag, last_modified):
+        """
+        Turn a (possibly conditional) response into an extracted page.
+        
+        A 304 reuses the cached extraction; a 200 is parsed and cached.
+        
+        Returns:
+            dict: The extracted page with all of its child links, or None for a failed request
+        """
+        if status == 304 and cached is not None:
+            self._count("not_modified")
+            if cached["page"] is not None:
+                page = cached["page"]
+                return {"content": dict(page["content"], url=url), "child_links": page["child_links"]}
+            return self._parse_page(url, cached["body"])
+        if status != 200:
+            logger.warning(f"Failed to fetch {url}, status code: {status}")
+            return None
+        self._count("fetched")
+        page = self._parse_page(url, html)
+        if self.cache:
+            self.cache.store(url, html, etag, last_modified, page)
+        return page
+    
+    def _drop_visited_links(self, page):
+        """Return the page with child links to already visited URLs removed."""
+        child_links = [link for link in page["child_links"] if link not in self.visited_urls]
+        return {"content": page["content"], "child_links": child_links}
+    
+    def _page_from_soup(self, url, soup):
+        """
+        Extract the structured content and child links of a parsed page.
+        
+        Args:
+            url (str): URL of the page
+            soup (BeautifulSoup): Parsed page
+            
+        Returns:
+            dict: Structured content of the page and its child links
+        """
+        # Extract page metadata, timing each extractor
+        extractors = {
+            "title": self._extract_title,
+            "description": self._extract_description,
+            "syntax": self._extract_syntax,
+            "values": self._extract_values,
+            "formal_definition": self._extract_formal_definition,
+            "examples": self._extract_examples,
+            "browser_compatibility": self._extract_browser_compatibility,
+            "see_also": self._extract_see_also,
+            "specifications": self._extract_specifications,
         }
+        content = {"url": url}
+        for field, extract in extractors.items():
+            with self.metrics.timer("extract", field=field):
+                content[field] = extract(soup)
+        content["children"] = []
         
-        # Find child pages and add to structure
-        child_links = self._find_child_links(soup, url)
+        # Find child pages and add to structure; visited ones are dropped by the
+        # caller, so a cached extraction stays valid for later crawls
+        with self.metrics.timer("find_child_links"):
+            child_links = self._find_child_links(soup, url, skip_visited=False)
         logger.info(f"Found {len(child_links)} child links on {url}")
         
         return {
@@ -137,6 +1005,105 @@ class MDNCSScraper:
             "child_links": child_links
         }
     
+    async def fetch_page_async(self, session, url, cached=None):
+        """
+        Fetch a page without blocking the event loop, revalidating a cached copy if there is one.
+        
+        Args:
+            session (aiohttp.ClientSession): Shared session (and connection pool)
+            url (str): The URL to request
+            cached (dict, optional): Cached response whose validators are sent
+            
+        Returns:
+            tuple: (status, body, ETag, Last-Modified, final URL after redirects, Retry-After seconds),
+                or None if the request failed
+        """
+        headers = self._request_headers(cached)
+        try:
+            # Wait for this host's rate limiter; only this worker waits, not a whole thread
+            wait = self.limiter.reserve(url)
+            self.metrics.observe("rate_limit_wait", wait)
+            await asyncio.sleep(wait)
+            
+            self.metrics.add("requests_in_flight", 1)
+            try:
+                with self.metrics.timer("fetch"):
+                    async with session.get(url, headers=headers) as response:
+                        body = await response.text() if response.status == 200 else ""
+            finally:
+                self.metrics.add("requests_in_flight", -1)
+            self.metrics.count("responses", status=response.status)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.limiter.record(url, response.status, retry_after)
+            return (response.status, body, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                    str(response.url), retry_after)
+                
+        except Exception as e:
+            self.metrics.count("request_errors")
+            logger.error(f"Error fetching {url}: {str(e)}")
+            return None
+    
+    async def get_page_content_async(self, session, url):
+        """
+        Asyncio counterpart of `get_page_content`, with the same output shape.
+        
+        Parsing and extraction run in the default executor so the event loop
+        keeps fetching while a page is being parsed.
+        
+        Args:
+            session (aiohttp.ClientSession): Shared session (and connection pool)
+            url (str): URL of the page to scrape
+            
+        Returns:
+            dict: Structured content of the page, empty if it could not be fetched (or a
+                retry was scheduled), or None if it was skipped as already visited
+        """
+        url = canonicalize_url(url)
+        if not self._claim(url):
+            return None
+        
+        logger.info(f"Processing: {url}")
+        
+        loop = asyncio.get_running_loop()
+        cached = self.cache.get(url) if self.cache else None
+        if self.replay:
+            if cached is None:
+                self._count("missing")
+                logger.warning(f"Not in the response cache: {url}")
+                return {}
+            self._count("replayed")
+            page = await loop.run_in_executor(None, self._parse_page, url, cached["body"])
+        else:
+            response = await self.fetch_page_async(session, url, cached)
+            if self._retry_later(url, response):
+                return {}
+            if response is None:
+                return {}
+            if self._is_redirect_duplicate(url, response[4]):
+                return None
+            page = await loop.run_in_executor(None, self._page_from_response, url, cached, *response[:4])
+            if page is None:
+                return {}
+        
+        return self._drop_visited_links(page)
+    
+    def _parse_page(self, url, html):
+        """Parse fetched HTML and extract its content."""
+        if not self.fast_extract:
+            with self.metrics.timer("parse"):
+                soup = BeautifulSoup(html, 'html.parser')
+            return self._page_from_soup(url, soup)
+        
+        # Parsing and extraction are one pass here, timed as a single stage
+        with self.metrics.timer("extract_single_pass"):
+            # The calling fetch thread just waits on the worker, without holding the GIL
+            if self.extract_pool:
+                page = self.extract_pool.submit(extract_page, url, html, self.BASE_URL).result()
+            else:
+                page = extract_page(url, html, self.BASE_URL)
+        logger.info(f"Found {len(page['child_links'])} child links on {url}")
+        return page
+    
     def _extract_title(self, soup):
         """Extract the title of the page."""
         try:
@@ -330,8 +1297,8 @@ class MDNCSScraper:
         
         return specs
     
-    def _find_child_links(self, soup, current_url):
-        """Find links to child pages anywhere in the article."""
+    def _find_child_links(self, soup, current_url, skip_visited=True):
+        """Find links to child pages anywhere in the article (optionally keeping visited ones)."""
         child_links = set()
         try:
             # More aggressive link finding - search ALL links in the page
@@ -339,12 +1306,13 @@ class MDNCSScraper:
                 href = link['href']
                 # Broaden link detection to catch more CSS doc pages
                 if '/docs/Web/CSS/' in href:
-                    # Ensure we get the full URL
-                    abs_url = urljoin(self.BASE_URL, href)
-                    if abs_url not in self.visited_urls and self._is_css_doc_page(abs_url):
+                    # Ensure we get the full, canonical URL
+                    abs_url = canonicalize_url(href, self.BASE_URL)
+                    if (not skip_visited or abs_url not in self.visited_urls) and self._is_css_doc_page(abs_url):
                         child_links.add(abs_url)
-                        # Debug - print each link found
-                        logger.debug(f"Found child link: {abs_url}")
+                        # Debug - print links found, at most a few per second
+                        if self.link_log.allow():
+                            logger.debug(f"Found child link: {abs_url}{self.link_log.suppressed_note()}")
                     
         except Exception as e:
             logger.error(f"Error finding child links: {str(e)}")
@@ -353,26 +1321,7 @@ class MDNCSScraper:
     
     def _is_css_doc_page(self, url):
         """Check if the URL is a CSS documentation page."""
-        parsed = urlparse(url)
-        path = parsed.path
-        
-        # Check if this is a CSS documentation page
-        if '/docs/Web/CSS' in path:
-            # Exclude non-documentation pages
-            excluded_patterns = [
-                'index.html',
-                'contributors.txt',
-                '/tag/',
-                '/docs/MDN/',
-            ]
-            
-            for pattern in excluded_patterns:
-                if pattern in path:
-                    return False
-                    
-            return True
-            
-        return False
+        return is_css_doc_page(url)
     
     def build_tree(self, url=None):
         """
@@ -386,57 +1335,41 @@ class MDNCSScraper:
         """
         if url is None:
             url = self.CSS_DOCS_URL
+        url = canonicalize_url(url)
+
+        queue = self.frontier
+        resumed = self._resume()
+        if resumed is not None:
+            pending, _ = resumed
+            queue = self.frontier = CrawlFrontier(pending, self.state.known())
+        else:
+            queue.push(url)
 
-        queue = [url]
-        processed_urls = set()
-
-        # Special handling for root - manually add key CSS sections
-        if url == self.CSS_DOCS_URL:
-            # Add important CSS sections manually
-            key_sections = [
-                "/en-US/docs/Web/CSS/Reference",
-                "/en-US/docs/Web/CSS/CSS_Selectors",
-                "/en-US/docs/Web/CSS/CSS_Properties_Reference",
-                "/en-US/docs/Web/CSS/CSS_Values_and_Units",
-                "/en-US/docs/Web/CSS/Layout_cookbook",
-                "/en-US/docs/Web/CSS/CSS_Grid_Layout",
-                "/en-US/docs/Web/CSS/CSS_Flexible_Box_Layout",
-                "/en-US/docs/Web/CSS/Media_Queries"
-            ]
-            for section in key_sections:
-                abs_url = urljoin(self.BASE_URL, section)
-                if abs_url not in queue:
-                    queue.append(abs_url)
+        # Special handling for root - manually add key CSS sections. The root
+        # itself is crawled like any other page (through the response cache),
+        # and its links are queued from its extraction
+        if resumed is None and url == canonicalize_url(self.CSS_DOCS_URL):
+            for section in self.KEY_SECTIONS:
+                abs_url = queue.push(urljoin(self.BASE_URL, section))
+                if abs_url:
                     logger.info(f"Added key section: {abs_url}")
-                
-            # Also find links on the root page
-            soup = self.request_page(url)
-            if soup:
-                # Add the root page content to the tree
-                root_data = self.get_page_content(url)
-                if root_data and 'content' in root_data:
-                    self._add_to_tree(url, root_data['content'])
-                
-                # Find all links to main CSS sections and subpages
-                for a in soup.find_all('a', href=True):
-                    href = a['href']
-                    if href.startswith('/en-US/docs/Web/CSS/') and href != '/en-US/docs/Web/CSS':
-                        abs_url = urljoin(self.BASE_URL, href)
-                        if abs_url not in queue:
-                            queue.append(abs_url)
+        
+        if resumed is None:
+            self.state.enqueue(list(queue))
+        self.metrics.watch("queue_depth", lambda: len(self.frontier))
         
         # Process queue for breadth-first traversal
-        while queue:
-            current_batch = []
+        while queue or self.retries:
+            # Retries that are due go first, then new URLs
+            current_batch = self.retries.pop_due(self.max_threads)
             
             # Prepare current batch of URLs to process
             while queue and len(current_batch) < self.max_threads:
-                current_url = queue.pop(0)
-                if current_url not in processed_urls:
-                    current_batch.append(current_url)
-                    processed_urls.add(current_url)
+                current_batch.append(queue.pop())
             
             if not current_batch:
+                # Only retries that are not due yet are left
+                time.sleep(self.retries.wait())
                 continue
                 
             # Process current batch with ThreadPoolExecutor
@@ -452,13 +1385,20 @@ class MDNCSScraper:
                         data = future.result()
                         if data:
                             # Add to tree
-                            self._add_to_tree(url, data['content'])
+                            self._store_page(url, data['content'])
+                            self.state.complete(url, data['content'])
                             
                             # Add child links to queue
-                            for child_url in data.get('child_links', []):
-                                if child_url not in processed_urls and child_url not in queue:
-                                    queue.append(child_url)
+                            new_links = [queued for queued in map(queue.push, data.get('child_links', [])) if queued]
+                            self.state.enqueue(new_links)
+                        elif data is None:
+                            self.metrics.count("pages_skipped")
+                            self.state.skip(url)
+                        elif url not in self.retries:
+                            self.metrics.count("pages_failed")
+                            self.state.fail(url)
                     except Exception as e:
+                        self.metrics.count("page_errors")
                         logger.error(f"Error processing {url}: {str(e)}")
             
             # Save checkpoint after each batch
@@ -466,6 +1406,131 @@ class MDNCSScraper:
             
         return self.css_tree
     
+    async def build_tree_async(self, url=None, concurrency=None):
+        """
+        Build the CSS documentation tree with a continuously fed pool of asyncio workers.
+        
+        Unlike `build_tree`, there are no batch barriers: each worker takes the
+        next queued URL as soon as it finishes one, all workers share one
+        connection pool, and politeness delays only suspend the waiting worker.
+        
+        Args:
+            url (str, optional): Starting URL. If None, use the default CSS docs URL.
+            concurrency (int, optional): Number of workers (default: max_threads)
+            
+        Returns:
+            dict: The complete CSS documentation tree
+        """
+        if aiohttp is None:
+            raise RuntimeError("The asyncio crawl requires aiohttp (pip install aiohttp)")
+        if url is None:
+            url = self.CSS_DOCS_URL
+        url = canonicalize_url(url)
+        concurrency = concurrency or self.max_threads
+        
+        # The frontier de-duplicates; the asyncio queue hands URLs to idle workers
+        queue = asyncio.Queue()
+        processed = 0
+        
+        def enqueue(page_url):
+            page_url = self.frontier.push(page_url, queue=False)
+            if page_url:
+                queue.put_nowait(page_url)
+                self.state.enqueue((page_url,))
+        
+        resumed = self._resume()
+        if resumed is not None:
+            pending, _ = resumed
+            self.frontier = CrawlFrontier((), self.state.known())
+            for page_url in pending:
+                queue.put_nowait(page_url)
+        else:
+            enqueue(url)
+            if url == canonicalize_url(self.CSS_DOCS_URL):
+                for section in self.KEY_SECTIONS:
+                    enqueue(urljoin(self.BASE_URL, section))
+        
+        async def worker(session):
+            nonlocal processed
+            while True:
+                current_url = await queue.get()
+                retrying = False
+                try:
+                    data = await self.get_page_content_async(session, current_url)
+                    if data:
+                        self._store_page(current_url, data['content'])
+                        self.state.complete(current_url, data['content'])
+                        for child_url in data.get('child_links', []):
+                            enqueue(child_url)
+                    elif data is None:
+                        self.metrics.count("pages_skipped")
+                        self.state.skip(current_url)
+                    elif current_url in self.retries:
+                        # The item stays unfinished until feed_retries queues it again
+                        retrying = True
+                    else:
+                        self.metrics.count("pages_failed")
+                        self.state.fail(current_url)
+                    processed += 1
+                    # Same checkpoint cadence as one batch of the threaded crawl
+                    if processed % self.max_threads == 0:
+                        self._save_checkpoint()
+                except Exception as e:
+                    self.metrics.count("page_errors")
+                    logger.error(f"Error processing {current_url}: {str(e)}")
+                finally:
+                    if not retrying:
+                        queue.task_done()
+        
+        async def feed_retries():
+            while True:
+                await asyncio.sleep(min(self.retries.wait(), 0.25) if self.retries else 0.25)
+                for retry_url in self.retries.pop_due():
+                    queue.put_nowait(retry_url)
+                    queue.task_done()
+        
+        self.metrics.watch("queue_depth", queue.qsize)
+        connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+            workers.append(asyncio.create_task(feed_retries()))
+            try:
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        
+        self._save_checkpoint()
+        return self.css_tree
+    
+    def crawl(self, url=None, use_async=False):
+        """
+        Build the tree with the threaded or the asyncio crawler.
+        
+        Args:
+            url (str, optional): Starting URL. If None, use the default CSS docs URL.
+            use_async (bool): Use `build_tree_async` instead of `build_tree`
+            
+        Returns:
+            dict: The complete CSS documentation tree
+        """
+        if self.extract_workers:
+            self.extract_pool = ProcessPoolExecutor(max_workers=self.extract_workers)
+            # Fork the workers now, while this is still the only thread
+            self.extract_pool.submit(int).result()
+        self.metrics.start_exporter(*self.metrics_files, interval=self.metrics_interval)
+        try:
+            if use_async:
+                return asyncio.run(self.build_tree_async(url))
+            return self.build_tree(url)
+        finally:
+            if self.extract_pool:
+                self.extract_pool.shutdown()
+                self.extract_pool = None
+            self.metrics.stop_exporter()
+    
     def _add_to_tree(self, url, content):
         """
         Add page content to the appropriate place in the tree structure.
@@ -474,140 +1539,163 @@ class MDNCSScraper:
             url (str): URL of the page
             content (dict): Structured content from the page
         """
-        # Parse the URL to determine the category hierarchy
-        path = urlparse(url).path
-        parts = [p for p in path.split('/') if p and p not in ['en-US', 'docs', 'Web']]
+        keys = tree_path(url)
+        if keys:
+            insert_page(self.css_tree, keys, content)
+    
+    def _store_page(self, url, content):
+        """
+        Keep a processed page: in the in-memory tree, or as one line of the
+        JSONL page log in streaming mode.
         
-        # Skip non-CSS pages
-        if not parts or parts[0] != 'CSS':
+        The line is flushed before the crawl state marks the page done, so the
+        log never misses a page the state considers crawled.
+        """
+        self.metrics.count("pages_stored")
+        if self.page_log is None:
+            with self.metrics.timer("add_to_tree"):
+                self._add_to_tree(url, content)
             return
-            
-        # Remove 'CSS' from the beginning
-        parts = parts[1:]
-        
-        # Add content to the tree at the appropriate level
-        current = self.css_tree
-        for i, part in enumerate(parts):
-            # Clean up part name for use as a key
-            clean_part = self._clean_key_name(part)
-            
-            # If this is the last part, add the content
-            if i == len(parts) - 1:
-                current[clean_part] = content
-            else:
-                # Create path if it doesn't exist
-                if clean_part not in current:
-                    current[clean_part] = {}
-                current = current[clean_part]
+        with self.metrics.timer("append_page_log"):
+            line = json.dumps(content) + "\n"
+            with self._log_lock:
+                self.page_log.write(line)
+                self.page_log.flush()
     
-    def _clean_key_name(self, name):
+    def _resume(self):
         """
-        Clean up a name for use as a key in the tree.
+        Restore the tree, visited URLs and queue of an interrupted crawl.
+        
+        A finished crawl (nothing left queued) is not resumed: its state and
+        page log are cleared, so the next run crawls, and with a response
+        cache revalidates, every page again.
         
-        Args:
-            name (str): Original name
-            
         Returns:
-            str: Cleaned name
+            tuple: (queued URLs, processed URLs), or None if there is no crawl to resume
         """
-        # Remove file extension if present
-        name = re.sub(r'\.html$', '', name)
-        
-        # Replace underscores with spaces
-        name = name.replace('_', ' ')
-        
-        return name
+        if self.state.is_empty():
+            return None
+        if not self.state.pending():
+            logger.info(f"The crawl in {self.state.path} is complete; starting a new crawl")
+            self.state.reset()
+            if self.page_log is not None:
+                with self._log_lock:
+                    self.page_log.truncate(0)
+            return None
+        # In streaming mode the pages are already in the page log
+        if self.page_log is None:
+            for url, content in self.state.pages():
+                self._add_to_tree(url, content)
+        self.visited_urls.update(self.state.visited())
+        pending = self.state.pending()
+        logger.info(f"Resuming crawl from {self.state.path}: {len(self.visited_urls)} pages done, {len(pending)} queued")
+        return pending, set(self.visited_urls)
     
     def _save_checkpoint(self):
-        """Save a checkpoint of the current progress."""
-        checkpoint_path = os.path.join("checkpoints", f"css_checkpoint_{int(time.time())}.json")
-        with open(checkpoint_path, 'w', encoding='utf-8') as f:
-            json.dump(self.css_tree, f, indent=2)
+        """Commit the pages and frontier changes recorded since the last checkpoint."""
+        with self.metrics.timer("checkpoint"):
+            self.state.commit()
         
-        logger.info(f"Saved checkpoint: {checkpoint_path}")
+        logger.info(f"Saved checkpoint: {self.state.path}")
     
     def save_tree(self):
-        """Save the complete tree to the output file."""
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.css_tree, f, indent=2)
+        """Save the complete tree to the output file (assembling it from the page log in streaming mode)."""
+        self.state.commit()
+        
+        if self.page_log is not None:
+            self.page_log.flush()
+            stats = assemble_tree(self.page_log.name, self.output_file)
+        else:
+            with open(self.output_file, 'w', encoding='utf-8') as f:
+                json.dump(self.css_tree, f, indent=2)
+            stats = self._generate_stats()
         
         logger.info(f"Saved complete CSS documentation tree to: {self.output_file}")
         
         # Generate a statistics summary
-        stats = self._generate_stats()
-        stats_file = os.path.splitext(self.output_file)[0] + "_stats.json"
-        
-        with open(stats_file, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, indent=2)
-            
-        logger.info(f"Saved statistics to: {stats_file}")
+        save_stats(self.output_file, stats)
         
         return self.output_file
     
     def _generate_stats(self):
         """Generate statistics about the scraped data."""
-        stats = {
-            "total_pages": len(self.visited_urls),
-            "scrape_timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "categories": {},
-            "structure_depth": self._get_max_depth(self.css_tree),
-        }
-        
-        # Count items in each top-level category
-        for category, content in self.css_tree.items():
-            stats["categories"][category] = self._count_items(content)
-        
-        return stats
-    
-    def _count_items(self, obj):
-        """Count the number of items in a nested dictionary."""
-        if isinstance(obj, dict):
-            # If it's a page content dict with specific keys
-            if "url" in obj and "title" in obj:
-                return 1
-            
-            # Otherwise it's a category containing other items
-            return sum(self._count_items(val) for val in obj.values())
-        
-        return 0
-    
-    def _get_max_depth(self, obj, current_depth=0):
-        """Get the maximum depth of the tree."""
-        if not isinstance(obj, dict):
-            return current_depth
-            
-        if not obj:
-            return current_depth
-            
-        # If this looks like a content object rather than a container
-        if "url" in obj and "title" in obj:
-            return current_depth
-            
-        # Otherwise, recurse into children
-        return max(
-            self._get_max_depth(child, current_depth + 1)
-            for child in obj.values()
-        )
+        return tree_stats(self.css_tree, len(self.visited_urls))
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the MDN CSS documentation into a JSON tree.")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="crawl with a pool of asyncio workers instead of thread batches (needs aiohttp)")
+    parser.add_argument('--base-url', help="crawl this site instead of developer.mozilla.org (e.g. a local mirror)")
+    parser.add_argument('--state', default="mdn_css_crawl.sqlite", help="crawl state database (default: %(default)s)")
+    parser.add_argument('--fresh', action='store_true', help="discard the saved crawl state and start over")
+    parser.add_argument('--cache', default="mdn_css_cache.sqlite",
+                        help="HTTP response cache; cached pages are revalidated with ETag/Last-Modified (default: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true', help="fetch every page without the response cache")
+    parser.add_argument('--fast-extract', action='store_true',
+                        help="extract each page in a single lxml pass instead of BeautifulSoup scans (needs lxml)")
+    parser.add_argument('--extract-workers', type=int, default=0, metavar='N',
+                        help="run the single-pass extraction in N worker processes fed by the fetchers")
+    parser.add_argument('--replay', action='store_true',
+                        help="serve every page from the response cache without network access (re-runs extraction)")
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help="requests/sec per host; halved on 429/503 and regained gradually (default: %(default)s)")
+    parser.add_argument('--retries', type=int, default=5,
+                        help="retries of a timed out, throttled or 5xx request before giving up (default: %(default)s)")
+    parser.add_argument('--timeout', type=float, default=30, help="request timeout in seconds (default: %(default)s)")
+    parser.add_argument('--jsonl', metavar='PATH',
+                        help="stream each page to this JSONL log instead of keeping the tree in memory")
+    parser.add_argument('--assemble', metavar='PATH',
+                        help="only assemble the tree and statistics from a JSONL page log, without crawling")
+    parser.add_argument('--metrics-json', metavar='PATH', help="periodically write a JSON snapshot of the crawl metrics")
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help="periodically write the crawl metrics in the Prometheus text format (e.g. for a textfile collector)")
+    parser.add_argument('--metrics-interval', type=float, default=10.0, metavar='SEC',
+                        help="seconds between metrics exports (default: %(default)s)")
+    args = parser.parse_args()
+    
+    if args.assemble:
+        stats = assemble_tree(args.assemble, "mdn_css_complete.json")
+        print(f"Assembled {stats['total_pages']} pages into mdn_css_complete.json "
+              f"(statistics in {save_stats('mdn_css_complete.json', stats)})")
+        sys.exit(0)
+    
+    if args.fresh:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.state + suffix):
+                os.remove(args.state + suffix)
+        if args.jsonl and os.path.exists(args.jsonl):
+            os.remove(args.jsonl)
+    
     # Create and run the scraper
     scraper = MDNCSScraper(
         output_file="mdn_css_complete.json",
         max_threads=5,  # Adjust based on your system capabilities
-        delay_range=(1, 3)  # Random delay between requests to avoid rate limiting
+        rate=args.rate,  # Shared request budget, adapted to 429/503 responses
+        base_url=args.base_url,
+        state_file=args.state,
+        cache_file=None if args.no_cache else args.cache,
+        replay=args.replay,
+        fast_extract=args.fast_extract,
+        extract_workers=args.extract_workers,
+        max_retries=args.retries,
+        timeout=args.timeout,
+        jsonl_file=args.jsonl,
+        metrics_json=args.metrics_json,
+        metrics_prom=args.metrics_prom,
+        metrics_interval=args.metrics_interval
     )
     
     print("Starting MDN CSS documentation scraping...")
     print("This may take several hours to complete due to the comprehensive nature and politeness delays.")
     print("Progress will be logged to mdn_css_scraper.log")
-    print("Checkpoints will be saved periodically to the 'checkpoints' directory.")
+    print(f"Progress is saved continuously to {args.state}; an interrupted crawl resumes where it stopped.")
     
     start_time = time.time()
     
     try:
         # Build the documentation tree
-        tree = scraper.build_tree()
+        tree = scraper.crawl(use_async=args.use_async)
         
         # Save the results
         output_file = scraper.save_tree()
@@ -617,6 +1705,16 @@ if __name__ == "__main__":
         print(f"\nScraping completed successfully in {elapsed_time:.2f} minutes!")
         print(f"CSS documentation tree saved to: {output_file}")
         print(f"Statistics saved to: {os.path.splitext(output_file)[0]}_stats.json")
+        frontier_stats = scraper.frontier.stats
+        print(f"Frontier: {frontier_stats['queued']} URLs queued, {frontier_stats['duplicates']} duplicate links "
+              f"({frontier_stats['canonicalized']} canonicalized), {scraper.redirect_duplicates} redirects to visited pages")
+        print(f"Requests: {scraper.limiter.stats['throttled']} throttled, {scraper.retries.stats['retried']} retries, "
+              f"{scraper.retries.stats['gave_up']} pages given up; final rate {scraper.limiter.current_rate(scraper.CSS_DOCS_URL):.2f} req/s")
+        if scraper.cache:
+            print("Response cache: " + ", ".join(f"{count} {name.replace('_', ' ')}"
+                                                 for name, count in scraper.cache_stats.items()))
+        print()
+        print_snapshot(scraper.metrics.snapshot())
         
     except KeyboardInterrupt:
         print("\nScraping interrupted by user.")
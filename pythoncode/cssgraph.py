@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Syntax Reference Graph
+------------------------------
+Extracts every `<type>` and `<'property'>` reference from the `syntax` strings
+of properties, syntaxes, functions and at-rules (including descriptors) into
+a dependency graph. The build reports dangling references and cycles, and
+stores a dependency-first topological order plus the transitive closure of
+every node, so grammars can be expanded in one pass.
+
+Node ids use the reference notation of the dataset:
+    <'margin'>          property
+    <length-percentage> syntax (or builtin data type)
+    abs()               function entry
+    @media              at-rule
+    @font-face/src      at-rule descriptor
+
+Usage:
+    python cssgraph.py [output.json]
+    python cssgraph.py --deps "<'margin'>"
+    python cssgraph.py --affected "<color>"
+"""
+
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+from csssyntax import BUILTIN_SYNTAXES, BUILTIN_TYPES, PropertyRef, SyntaxParseError, iter_references, parse_syntax
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_FILE = os.path.join(ROOT_DIR, 'cssdata-merged.json')
+DEFAULT_GRAPH_FILE = os.path.join(ROOT_DIR, 'cssdata-syntax-graph.json')
+DEFAULT_MANIFEST_FILE = os.path.join(ROOT_DIR, 'cssdata-merged.manifest.json')
+
+GRAPH_VERSION = 1
+
+
+def property_id(name):
+    return f"<'{name}'>"
+
+
+def type_id(name):
+    return f"<{name}>"
+
+
+class SyntaxGraph:
+    """
+    The reference graph between all syntax-bearing entries of the dataset.
+
+    Attributes:
+        nodes (dict): Node id -> {"kind": ..., "syntax": ...}
+        edges (dict): Node id -> sorted tuple of referenced node ids
+        dangling (dict): Node id -> sorted references that resolve to nothing
+        order (list): Node ids, dependencies before their dependents
+        cycles (list): Strongly connected components that contain a cycle
+        closure (dict): Node id -> frozenset of every transitively referenced node id
+        content_hash (str): `meta.contentHash` of the dataset the graph was built from
+    """
+
+    def __init__(self, data=None):
+        """
+        Build the graph.
+
+        Args:
+            data (dict, optional): The merged dataset (as written by merge_cssdata.py).
+                Without it the graph is empty, e.g. before `read()` fills it in.
+        """
+        self.nodes = {}
+        self.edges = {}
+        self.dangling = {}
+        self.order = []
+        self.cycles = []
+        self.closure = {}
+        self._component_list = []
+        self.timings = {}
+        self.content_hash = ''
+        if data is None:
+            return
+        self.content_hash = data.get('meta', {}).get('contentHash', '')
+
+        start = time.perf_counter()
+        for name, entry in data.get('properties', {}).items():
+            self.nodes[property_id(name)] = {"kind": "property", "syntax": entry.get('syntax')}
+        for name, entry in data.get('syntaxes', {}).items():
+            self.nodes[type_id(name)] = {"kind": "syntax", "syntax": entry.get('syntax')}
+        for name in sorted(BUILTIN_TYPES):
+            if type_id(name) not in self.nodes:
+                self.nodes[type_id(name)] = {"kind": "builtin", "syntax": BUILTIN_SYNTAXES.get(name)}
+        for name, entry in data.get('functions', {}).items():
+            self.nodes[name] = {"kind": "function", "syntax": entry.get('syntax')}
+        for name, entry in data.get('atRules', {}).items():
+            self.nodes[name] = {"kind": "at-rule", "syntax": entry.get('syntax')}
+            for descriptor, value in entry.get('descriptors', {}).items():
+                self.nodes[f"{name}/{descriptor}"] = {"kind": "descriptor", "syntax": value.get('syntax')}
+
+        for node_id in self.nodes:
+            self._extract(node_id)
+        self.timings["extract"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self._components()
+        self.timings["order"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self._close(self.nodes)
+        self.timings["closure"] = time.perf_counter() - start
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Build the graph from the merged dataset on disk.
+
+        Args:
+            path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            SyntaxGraph: The built graph
+        """
+        with open(path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def open(cls, path=None, data_path=None):
+        """
+        Read the stored graph, rebuilding it first if it is missing or older than the dataset.
+
+        The dataset version is taken from merge_cssdata.py's manifest, so an
+        up-to-date graph is used without parsing cssdata-merged.json.
+
+        Args:
+            path (str, optional): Path to the graph file
+            data_path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            SyntaxGraph: The graph
+        """
+        path = path or DEFAULT_GRAPH_FILE
+        expected = None
+        if data_path is None and os.path.exists(DEFAULT_MANIFEST_FILE):
+            with open(DEFAULT_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                expected = json.load(f).get("contentHash")
+        if os.path.exists(path):
+            try:
+                graph = cls.read(path)
+            except (ValueError, KeyError):
+                graph = None
+            if graph is not None and (expected is None or graph.content_hash == expected):
+                return graph
+        graph = cls.load(data_path)
+        graph.write(path)
+        return graph
+
+    # -- extraction ----------------------------------------------------------
+
+    def _resolve(self, ref, node_id):
+        """Map a reference node to a graph node id, or None if it is dangling."""
+        if isinstance(ref, PropertyRef):
+            target = property_id(ref.name)
+            return target if target in self.nodes else None
+        # Inside an at-rule, <name> may refer to one of its own descriptors
+        if self.nodes[node_id]["kind"] in ("at-rule", "descriptor"):
+            descriptor = f"{node_id.split('/')[0]}/{ref.name}"
+            if descriptor in self.nodes:
+                return descriptor
+        target = type_id(ref.name)
+        return target if target in self.nodes else None
+
+    def _extract(self, node_id):
+        """Parse one node's syntax and record its direct and dangling references."""
+        syntax = self.nodes[node_id]["syntax"]
+        refs = set()
+        missing = set()
+        if syntax:
+            try:
+                tree = parse_syntax(syntax)
+            except SyntaxParseError:
+                tree = None
+                missing.add("(unparsable syntax)")
+            if tree is not None:
+                for ref in iter_references(tree):
+                    target = self._resolve(ref, node_id)
+                    if target is None:
+                        missing.add(property_id(ref.name) if isinstance(ref, PropertyRef) else type_id(ref.name))
+                    else:
+                        refs.add(target)
+        self.edges[node_id] = tuple(sorted(refs))
+        if missing:
+            self.dangling[node_id] = sorted(missing)
+        else:
+            self.dangling.pop(node_id, None)
+
+    # -- analysis ------------------------------------------------------------
+
+    def _components(self):
+        """
+        Find strongly connected components with an iterative Tarjan search.
+
+        Tarjan emits each component after every component it references, so
+        the emission order is already dependency-first.
+        """
+        edges = self.edges
+        index = {}
+        low = {}
+        on_stack = set()
+        stack = []
+        components = []
+        counter = 0
+
+        for root in self.nodes:
+            if root in index:
+                continue
+            work = [(root, iter(edges[root]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(edges[child])))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+
+        self._component_list = components
+        self.order = [member for component in components for member in component]
+        self.cycles = [
+            component for component in components
+            if len(component) > 1 or component[0] in edges[component[0]]
+        ]
+
+    def _close(self, targets):
+        """Recompute the transitive closure of the components containing `targets`."""
+        targets = set(targets)
+        edges = self.edges
+        closure = self.closure
+        for component in self._component_list:
+            if not targets.intersection(component):
+                continue
+            members = set(component)
+            reach = set()
+            for member in component:
+                for target in edges[member]:
+                    reach.add(target)
+                    if target not in members:
+                        reach.update(closure[target])
+            reach = frozenset(reach)
+            for member in component:
+                closure[member] = reach
+
+    # -- queries -------------------------------------------------------------
+
+    def dependencies(self, node_id):
+        """
+        Return every node a node references, directly or transitively.
+
+        Args:
+            node_id (str): Node id, e.g. "<'margin'>"
+
+        Returns:
+            frozenset: Referenced node ids
+        """
+        return self.closure[node_id]
+
+    def expansion_order(self, node_id):
+        """
+        Return a node's dependencies ordered so each comes after everything it references.
+
+        Args:
+            node_id (str): Node id
+
+        Returns:
+            list: Node ids including `node_id` itself, which comes last unless it is in a cycle
+        """
+        needed = self.closure[node_id] | {node_id}
+        return [member for member in self.order if member in needed]
+
+    def dependents(self, node_ids):
+        """
+        Return every node that references any of `node_ids`, directly or transitively.
+
+        Args:
+            node_ids (iterable): Node ids
+
+        Returns:
+            set: Dependent node ids (excluding the inputs unless they are in a cycle)
+        """
+        reverse = defaultdict(list)
+        for source, targets in self.edges.items():
+            for target in targets:
+                reverse[target].append(source)
+        found = set()
+        stack = list(node_ids)
+        while stack:
+            for source in reverse.get(stack.pop(), ()):
+                if source not in found:
+                    found.add(source)
+                    stack.append(source)
+        return found
+
+    def update(self, node_id, syntax, kind=None):
+        """
+        Change (or add) one node's syntax and refresh only what depends on it.
+
+        Args:
+            node_id (str): Node id
+            syntax (str): New syntax, or None to remove the node's references
+            kind (str, optional): Kind for a new node; defaults to its id notation
+
+        Returns:
+            set: Node ids whose closure was recomputed
+        """
+        stale = self.dependents([node_id]) if node_id in self.nodes else set()
+        if node_id not in self.nodes:
+            if kind is None:
+                kind = "property" if node_id.startswith("<'") else "syntax"
+            self.nodes[node_id] = {"kind": kind, "syntax": syntax}
+        else:
+            self.nodes[node_id]["syntax"] = syntax
+        self._extract(node_id)
+
+        # Nodes that used to dangle on this id now resolve to it
+        if node_id.startswith('<'):
+            for source, missing in list(self.dangling.items()):
+                if node_id in missing:
+                    self._extract(source)
+                    stale.add(source)
+
+        self._components()
+        affected = {node_id} | stale | self.dependents([node_id])
+        self._close(affected)
+        return affected
+
+    # -- persistence ---------------------------------------------------------
+
+    def to_dict(self):
+        """
+        Serialize the graph. Closures are stored as positions in `order`.
+
+        Returns:
+            dict: JSON-serializable graph
+        """
+        position = {node_id: i for i, node_id in enumerate(self.order)}
+        return {
+            "meta": {
+                "version": GRAPH_VERSION,
+                "contentHash": self.content_hash,
+                "nodes": len(self.nodes),
+                "edges": sum(len(targets) for targets in self.edges.values()),
+                "dangling": sum(len(missing) for missing in self.dangling.values()),
+                "cycles": len(self.cycles),
+            },
+            "order": self.order,
+            "nodes": {
+                node_id: {
+                    "kind": node["kind"],
+                    "syntax": node["syntax"],
+                    "refs": list(self.edges[node_id]),
+                    "closure": sorted(position[target] for target in self.closure[node_id]),
+                    **({"dangling": self.dangling[node_id]} if node_id in self.dangling else {}),
+                }
+                for node_id, node in self.nodes.items()
+            },
+            "cycles": self.cycles,
+        }
+
+    def write(self, path=None):
+        """
+        Write the graph as compact JSON.
+
+        Args:
+            path (str, optional): Output path
+
+        Returns:
+            str: The output path
+        """
+        path = path or DEFAULT_GRAPH_FILE
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+        return path
+
+    @classmethod
+    def read(cls, path=None):
+        """
+        Read a graph written by `write()` without reparsing any syntax.
+
+        Args:
+            path (str, optional): Path to the graph file
+
+        Returns:
+            SyntaxGraph: The graph
+        """
+        with open(path or DEFAULT_GRAPH_FILE, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get("meta", {}).get("version") != GRAPH_VERSION:
+            raise ValueError(f"Unsupported syntax graph version in {path or DEFAULT_GRAPH_FILE}")
+        graph = cls()
+        graph.content_hash = stored["meta"].get("contentHash", '')
+        graph.order = stored["order"]
+        graph.cycles = stored["cycles"]
+        for node_id, node in stored["nodes"].items():
+            graph.nodes[node_id] = {"kind": node["kind"], "syntax": node["syntax"]}
+            graph.edges[node_id] = tuple(node["refs"])
+            graph.closure[node_id] = frozenset(graph.order[i] for i in node["closure"])
+            if "dangling" in node:
+                graph.dangling[node_id] = node["dangling"]
+        graph._components()
+        return graph
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) == 2 and args[0] in ('--deps', '--affected'):
+        graph = SyntaxGraph.open()
+        if args[1] not in graph.nodes:
+            print(f"Unknown node: {args[1]}")
+            sys.exit(1)
+        if args[0] == '--deps':
+            result = [node_id for node_id in graph.expansion_order(args[1]) if node_id != args[1]]
+        else:
+            result = sorted(graph.dependents([args[1]]))
+        for node_id in result:
+            print(node_id)
+    elif len(args) <= 1:
+        graph = SyntaxGraph.load()
+        path = graph.write(args[0] if args else None)
+        summary = graph.to_dict()["meta"]
+        print(f"Wrote {path}: {summary['nodes']} nodes, {summary['edges']} edges, "
+              f"{summary['dangling']} dangling references, {summary['cycles']} cycles")
+        for node_id, missing in sorted(graph.dangling.items()):
+            print(f"  dangling {node_id}: {', '.join(missing)}")
+        for component in graph.cycles:
+            print(f"  cycle: {' -> '.join(component)}")
+        print(", ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in graph.timings.items()))
+    else:
+        print("Usage: cssgraph.py [output.json] | --deps <node> | --affected <node>")
+        sys.exit(2)
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Crawl Metrics
+-------------
+Lightweight, thread-safe instrumentation for cssget.py.
+
+`Metrics` keeps per-stage timers (count, total, max and a latency
+histogram), counters and gauges, and can poll callbacks for values owned by
+other objects, such as queue depth. Snapshots are exported as JSON and in
+the Prometheus text format, either on demand or periodically from a
+background thread, so a multi-hour crawl can be watched (or scraped by a
+node_exporter textfile collector) while it runs.
+
+`LogLimiter` caps how often a hot-path log message is emitted and reports
+how many were suppressed.
+
+Usage:
+    metrics = Metrics("cssget")
+    with metrics.timer("fetch"):
+        ...
+    metrics.count("responses", status=200)
+    metrics.start_exporter(json_file="metrics.json", prometheus_file="metrics.prom", interval=10)
+
+    python cssmetrics.py metrics.json     # print a saved snapshot as a table
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _write_atomically(path, text):
+    """Replace a file in one step, so readers never see a half-written snapshot."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+class Metrics:
+    """Timers, counters and gauges shared by all threads of a crawl."""
+
+    def __init__(self, namespace="cssget"):
+        """
+        Initialize an empty registry.
+
+        Args:
+            namespace (str): Prefix of the exported Prometheus metric names
+        """
+        self.namespace = namespace
+        self.started = time.time()
+        self.lock = threading.Lock()
+        # (stage, labels) -> [count, total seconds, max seconds, bucket counts]
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+        self.watched = {}
+        # stage -> every observed duration, for stages registered with `sample`
+        self.samples = {}
+        self._exporter = None
+        self._stop = threading.Event()
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Time the enclosed block as one run of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def observe(self, stage, seconds, **labels):
+        """Record one run of a stage that took `seconds`."""
+        key = _key(stage, labels)
+        with self.lock:
+            timer = self.timers.get(key)
+            if timer is None:
+                timer = self.timers[key] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    timer[3][i] += 1
+                    break
+            if not labels and stage in self.samples:
+                self.samples[stage].append(seconds)
+
+    def sample(self, stage):
+        """
+        Keep every duration observed for an (unlabelled) stage, e.g. for exact percentiles.
+
+        Returns:
+            list: The list the durations are appended to
+        """
+        with self.lock:
+            return self.samples.setdefault(stage, [])
+
+    def count(self, name, n=1, **labels):
+        """Add `n` to a counter."""
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def gauge(self, name, value, **labels):
+        """Set a gauge."""
+        with self.lock:
+            self.gauges[_key(name, labels)] = value
+
+    def add(self, name, delta, **labels):
+        """Move a gauge up or down, e.g. requests in flight."""
+        key = _key(name, labels)
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + delta
+
+    def watch(self, name, callback, **labels):
+        """Read a gauge from `callback()` whenever a snapshot is taken."""
+        with self.lock:
+            self.watched[_key(name, labels)] = callback
+
+    def _gauge_values(self):
+        values = dict(self.gauges)
+        for key, callback in list(self.watched.items()):
+            try:
+                values[key] = callback()
+            except Exception:  # A watched object may be gone or mid-update
+                continue
+        return values
+
+    def snapshot(self):
+        """
+        Return the current values.
+
+        Returns:
+            dict: Timestamp, uptime, per-stage timings, counters and gauges
+        """
+        with self.lock:
+            timers = {key: (count, total, peak) for key, (count, total, peak, _) in self.timers.items()}
+            counters = dict(self.counters)
+            gauges = self._gauge_values()
+
+        def label(key):
+            name, labels = key
+            return name + _label_text(labels)
+
+        return {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "uptime_s": round(time.time() - self.started, 3),
+            "stages": {
+                label(key): {
+                    "count": count,
+                    "total_s": round(total, 6),
+                    "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+                    "max_ms": round(peak * 1000, 3),
+                }
+                for key, (count, total, peak) in sorted(timers.items(), key=lambda item: -item[1][1])
+            },
+            "counters": {label(key): value for key, value in sorted(counters.items())},
+            "gauges": {label(key): value for key, value in sorted(gauges.items())},
+        }
+
+    def prometheus(self):
+        """Return the current values in the Prometheus text exposition format."""
+        prefix = self.namespace
+        with self.lock:
+            timers = {key: (count, total, list(buckets)) for key, (count, total, _, buckets) in self.timers.items()}
+            counters = dict(self.counters)
+            gauges = self._gauge_values()
+
+        lines = [f"# HELP {prefix}_stage_seconds Time spent per crawl stage",
+                 f"# TYPE {prefix}_stage_seconds histogram"]
+        for (stage, labels), (count, total, buckets) in sorted(timers.items()):
+            labels = (("stage", stage),) + labels
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f"{prefix}_stage_seconds_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{prefix}_stage_seconds_bucket{_label_text(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{prefix}_stage_seconds_sum{_label_text(labels)} {total:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{_label_text(labels)} {count}")
+
+        for name in sorted({name for name, _ in counters}):
+            lines += [f"# TYPE {prefix}_{name}_total counter"]
+            lines += [f"{prefix}_{name}_total{_label_text(labels)} {value}"
+                      for (other, labels), value in sorted(counters.items()) if other == name]
+        for name in sorted({name for name, _ in gauges}):
+            lines += [f"# TYPE {prefix}_{name} gauge"]
+            lines += [f"{prefix}_{name}{_label_text(labels)} {value}"
+                      for (other, labels), value in sorted(gauges.items()) if other == name]
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_file=None, prometheus_file=None):
+        """Write a JSON snapshot and/or a Prometheus text file."""
+        if json_file:
+            _write_atomically(json_file, json.dumps(self.snapshot(), indent=2))
+        if prometheus_file:
+            _write_atomically(prometheus_file, self.prometheus())
+
+    def start_exporter(self, json_file=None, prometheus_file=None, interval=10.0):
+        """
+        Export every `interval` seconds from a daemon thread until `stop_exporter`.
+
+        Args:
+            json_file (str, optional): Path of the JSON snapshot
+            prometheus_file (str, optional): Path of the Prometheus text file
+            interval (float): Seconds between exports
+        """
+        if not (json_file or prometheus_file) or self._exporter is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.export(json_file, prometheus_file)
+
+        self._stop.clear()
+        self._exporter = (threading.Thread(target=run, name="metrics-exporter", daemon=True),
+                          json_file, prometheus_file)
+        self._exporter[0].start()
+
+    def stop_exporter(self):
+        """Stop the exporter thread and write a final export."""
+        if self._exporter is None:
+            return
+        thread, json_file, prometheus_file = self._exporter
+        self._stop.set()
+        thread.join()
+        self._exporter = None
+        self.export(json_file, prometheus_file)
+
+
+class LogLimiter:
+    """
+    Let a hot-path log message through at most `per_second` times a second.
+
+    Usage:
+        if link_log.allow():
+            logger.debug(f"Found child link: {url}{link_log.suppressed_note()}")
+    """
+
+    def __init__(self, per_second=5):
+        self.interval = 1.0 / per_second
+        self.next_allowed = 0.0
+        self.suppressed = 0
+        self._reported = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Return True if the message should be logged now."""
+        now = time.monotonic()
+        with self.lock:
+            if now < self.next_allowed:
+                self.suppressed += 1
+                return False
+            self.next_allowed = now + self.interval
+            return True
+
+    def suppressed_note(self):
+        """Return ' (N similar messages suppressed)' for messages dropped since the last note."""
+        with self.lock:
+            dropped = self.suppressed - self._reported
+            self._reported = self.suppressed
+        return f" ({dropped} similar messages suppressed)" if dropped else ""
+
+
+def print_snapshot(snapshot):
+    """Print a JSON snapshot as a table of stages, counters and gauges."""
+    stages = snapshot["stages"]
+    print(f"Snapshot {snapshot['timestamp']}, {snapshot['uptime_s']:.0f} s into the crawl")
+    if stages:
+        # Stages nest (parse contains the extract stages) and overlap across threads,
+        # so totals are not shares of the wall time
+        width = max(len(name) for name in stages)
+        print(f"{'stage':<{width}}  {'count':>8}  {'total s':>9}  {'mean ms':>9}  {'max ms':>9}")
+        for name, stage in stages.items():
+            print(f"{name:<{width}}  {stage['count']:>8}  {stage['total_s']:>9.2f}  "
+                  f"{stage['mean_ms']:>9.2f}  {stage['max_ms']:>9.1f}")
+    for section in ("counters", "gauges"):
+        if snapshot[section]:
+            print(f"{section}: " + ", ".join(f"{name}={value}" for name, value in snapshot[section].items()))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        print_snapshot(json.load(f))
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Local MDN Mirror and Crawl Benchmark
+------------------------------------
+Measures cssget.py without touching developer.mozilla.org.
+
+`record` saves a representative set of MDN CSS pages as fixtures: one HTML
+file per page, laid out like the URL paths (`en-US/docs/Web/CSS/margin.html`).
+Pages come from a breadth-first crawl of the live site (or any mirror), or
+from an existing cssget.py response cache without any network access.
+
+`serve` serves the fixtures over HTTP with configurable latency, bandwidth,
+error rate (429/503 with Retry-After, or 500) and stalled responses that
+outlast the client's timeout, and answers conditional requests with 304 like
+MDN does.
+
+`bench` starts the server in a separate process, runs
+`MDNCSScraper.build_tree` (or the asyncio crawl) against it with a fresh
+state database, and reports pages/sec, p50/p99 fetch latency (the HTTP
+request alone), rate limiter wait and parse latency, peak RSS of the crawler
+and the bytes its checkpoints wrote, so changes to concurrency, parsing or
+checkpointing can be compared on a fixed workload.
+
+Usage:
+    python cssmirror.py record fixtures/ [--limit 300] [--base-url URL | --from-cache mdn_css_cache.sqlite]
+    python cssmirror.py serve fixtures/ [--port 8000] [--latency 80] [--error-rate 0.02] [--stall-rate 0.01] [--bandwidth 2000]
+    python cssmirror.py bench fixtures/ [--latency 80] [--error-rate 0.05] [--threads 10] [--async] [--fast-extract] [--json out.json]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import sqlite3
+import tempfile
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlparse
+
+from cssextract import canonicalize_url
+from cssget import CrawlFrontier, MDNCSScraper
+
+MDN_URL = "https://developer.mozilla.org"
+CSS_ROOT = "/en-US/docs/Web/CSS"
+
+
+def fixture_path(fixtures_dir, url_path):
+    """Return the fixture file of a URL path; segments are percent-encoded, so `::after` is a safe file name."""
+    segments = [quote(unquote(segment), safe='') for segment in url_path.strip('/').split('/')]
+    return os.path.join(fixtures_dir, *segments) + '.html'
+
+
+def load_mirror(fixtures_dir):
+    """
+    Load every fixture page.
+
+    Returns:
+        dict: URL path -> (body bytes, ETag)
+    """
+    pages = {}
+    for directory, _, filenames in os.walk(fixtures_dir):
+        for name in filenames:
+            if not name.endswith('.html'):
+                continue
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, fixtures_dir)[:-len('.html')]
+            url_path = '/' + '/'.join(unquote(segment) for segment in relative.split(os.sep))
+            with open(path, 'rb') as f:
+                body = f.read()
+            pages[url_path] = (body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"')
+    return pages
+
+
+def record(fixtures_dir, limit=300, base_url=MDN_URL, rate=1.0, from_cache=None):
+    """
+    Save pages as fixtures.
+
+    Args:
+        fixtures_dir (str): Output directory
+        limit (int): Maximum number of pages
+        base_url (str): Site to crawl, breadth-first from the CSS root
+        rate (float): Requests/sec while crawling
+        from_cache (str, optional): Export this cssget.py response cache instead of crawling
+
+    Returns:
+        int: Number of pages recorded
+    """
+    def save(url, html):
+        path = fixture_path(fixtures_dir, urlparse(url).path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+    recorded = 0
+    if from_cache:
+        db = sqlite3.connect(from_cache)
+        for url, body in db.execute("SELECT url, body FROM responses ORDER BY fetched_at LIMIT ?", (limit,)):
+            save(url, zlib.decompress(body).decode('utf-8'))
+            recorded += 1
+        db.close()
+        return recorded
+
+    # Reuse the scraper's rate-limited fetching and link extraction, without its crawl state
+    scraper = MDNCSScraper(state_file=':memory:', rate=rate, base_url=base_url)
+    frontier = CrawlFrontier()
+    frontier.push(canonicalize_url(base_url + CSS_ROOT))
+    while len(frontier) and recorded < limit:
+        url = frontier.pop()
+        response = scraper.fetch_page(url)
+        if response is None or response[0] != 200:
+            continue
+        save(url, response[1])
+        recorded += 1
+        for child_url in scraper._parse_page(url, response[1])["child_links"]:
+            frontier.push(child_url)
+        if recorded % 25 == 0:
+            print(f"Recorded {recorded} pages, {len(frontier)} queued")
+    return recorded
+
+
+def make_handler(pages, latency=0.0, jitter=0.0, error_rate=0.0, bandwidth=None, stall_rate=0.0, stall=30.0,
+                 error_statuses=(429, 500, 503), retry_after=1, redirects=None):
+    """
+    Build a request handler serving the mirror.
+
+    Args:
+        pages (dict): Result of `load_mirror`
+        latency (float): Seconds before each response
+        jitter (float): Random extra latency, up to this many seconds
+        error_rate (float): Share of requests answered with one of `error_statuses`
+        bandwidth (float, optional): Bytes/sec per response body
+        stall_rate (float): Share of requests held for `stall` seconds before the response,
+            so the client times out
+        stall (float): Seconds a stalled request is held
+        error_statuses (tuple): Statuses injected by `error_rate`; 429 and 503 carry Retry-After
+        retry_after (int): Retry-After seconds of injected 429 and 503 responses
+        redirects (dict, optional): URL path -> path it is permanently redirected to, like MDN's renamed pages
+    """
+    redirects = redirects or {}
+
+    class MirrorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up on a stalled or trickled response
+                pass
+
+        def do_GET(self):
+            time.sleep(latency + random.uniform(0, jitter))
+            if stall_rate and random.random() < stall_rate:
+                time.sleep(stall)
+            if error_rate and random.random() < error_rate:
+                status = random.choice(error_statuses)
+                self.send_response(status)
+                if status in (429, 503):
+                    self.send_header('Retry-After', str(retry_after))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            url_path = unquote(urlparse(self.path).path).rstrip('/') or '/'
+            if url_path in redirects:
+                self.send_response(301)
+                self.send_header('Location', quote(redirects[url_path]))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if url_path not in pages:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body, etag = pages[url_path]
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            if not bandwidth:
+                self.wfile.write(body)
+                return
+            # Trickle the body out in chunks to simulate a slow link
+            chunk = max(1024, int(bandwidth / 20))
+            for start in range(0, len(body), chunk):
+                self.wfile.write(body[start:start + chunk])
+                time.sleep(chunk / bandwidth)
+
+    return MirrorHandler
+
+
+def serve(fixtures_dir, port=8000, latency=0.0, jitter=0.0, error_rate=0.0, bandwidth=None, stall_rate=0.0,
+          stall=30.0, ready=None):
+    """
+    Serve the fixtures until interrupted.
+
+    Args:
+        ready (multiprocessing.Queue, optional): Receives the bound port once the server listens
+    """
+    pages = load_mirror(fixtures_dir)
+    server = ThreadingHTTPServer(('127.0.0.1', port),
+                                 make_handler(pages, latency, jitter, error_rate, bandwidth, stall_rate, stall))
+    server.daemon_threads = True
+    if ready is not None:
+        ready.put(server.server_address[1])
+    else:
+        print(f"Serving {len(pages)} pages on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+class BenchmarkScraper(MDNCSScraper):
+    """
+    MDNCSScraper that times every fetch and parse and counts checkpoints and stored pages.
+
+    Fetch times are those of the HTTP requests alone; the time spent waiting
+    for the rate limiter before each request is kept apart.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetch_times = self.metrics.sample("fetch")
+        self.wait_times = self.metrics.sample("rate_limit_wait")
+        self.parse_times = []
+        self.pages_stored = 0
+        self.checkpoints = 0
+        # Keep every committed frame in the WAL, so its size is the checkpoint I/O
+        self.state.db.execute("PRAGMA wal_autocheckpoint=0")
+
+    def _parse_page(self, url, html):
+        start = time.perf_counter()
+        try:
+            return super()._parse_page(url, html)
+        finally:
+            self.parse_times.append(time.perf_counter() - start)
+
+    def _store_page(self, url, content):
+        super()._store_page(url, content)
+        self.pages_stored += 1
+
+    def _save_checkpoint(self):
+        super()._save_checkpoint()
+        self.checkpoints += 1
+
+
+def percentile(values, p):
+    """Return the p-quantile of a list of seconds, in milliseconds."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+def bench(fixtures_dir, latency=0.0, jitter=0.0, error_rate=0.0, bandwidth=None, stall_rate=0.0, stall=30.0,
+          threads=5, use_async=False, fast_extract=False, extract_workers=0, jsonl=False, rate=1000.0,
+          timeout=30):
+    """
+    Crawl the mirror once and measure the crawler.
+
+    Args:
+        fixtures_dir (str): Recorded fixtures
+        latency, jitter, error_rate, bandwidth, stall_rate, stall: Server behaviour, see `make_handler`
+        threads (int): Crawler threads (or asyncio workers)
+        use_async (bool): Use the asyncio crawl
+        fast_extract (bool): Use the single-pass extractor
+        extract_workers (int): Extraction worker processes
+        jsonl (bool): Stream pages to a JSONL log instead of the in-memory tree
+        rate (float): Request budget of the crawler's rate limiter
+        timeout (float): Crawler request timeout in seconds
+
+    Returns:
+        dict: The measurements
+    """
+    # Requests to the mirror must not end up in the log file or on the console
+    logging.getLogger().setLevel(logging.WARNING)
+
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    server = context.Process(target=serve, args=(fixtures_dir, 0, latency, jitter, error_rate, bandwidth,
+                                                 stall_rate, stall, ready), daemon=True)
+    server.start()
+    port = ready.get(timeout=60)
+
+    workdir = tempfile.mkdtemp(prefix='cssmirror-')
+    state_file = os.path.join(workdir, 'state.sqlite')
+    try:
+        scraper = BenchmarkScraper(
+            output_file=os.path.join(workdir, 'tree.json'),
+            max_threads=threads,
+            rate=rate,
+            timeout=timeout,
+            base_url=f"http://127.0.0.1:{port}",
+            state_file=state_file,
+            fast_extract=fast_extract,
+            extract_workers=extract_workers,
+            jsonl_file=os.path.join(workdir, 'pages.jsonl') if jsonl else None
+        )
+        start = time.perf_counter()
+        scraper.crawl(use_async=use_async)
+        elapsed = time.perf_counter() - start
+        scraper.save_tree()
+        checkpoint_bytes = os.path.getsize(state_file + '-wal') if os.path.exists(state_file + '-wal') else 0
+    finally:
+        server.terminate()
+        server.join()
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+    return {
+        "pages": scraper.pages_stored,
+        "requests": len(scraper.fetch_times),
+        "seconds": elapsed,
+        "pages_per_sec": scraper.pages_stored / elapsed if elapsed else 0.0,
+        "fetch_p50_ms": percentile(scraper.fetch_times, 0.50),
+        "fetch_p99_ms": percentile(scraper.fetch_times, 0.99),
+        "rate_limit_wait_p50_ms": percentile(scraper.wait_times, 0.50),
+        "rate_limit_wait_p99_ms": percentile(scraper.wait_times, 0.99),
+        "rate_limit_wait_s": sum(scraper.wait_times),
+        "parse_p50_ms": percentile(scraper.parse_times, 0.50),
+        "parse_p99_ms": percentile(scraper.parse_times, 0.99),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "checkpoints": scraper.checkpoints,
+        "checkpoint_bytes": checkpoint_bytes,
+        "throttled": scraper.limiter.stats["throttled"],
+        "retries": scraper.retries.stats["retried"],
+        "gave_up": scraper.retries.stats["gave_up"],
+    }
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0.0, help="milliseconds before each response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random extra latency, up to this many milliseconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with 429/500/503")
+    parser.add_argument('--stall-rate', type=float, default=0.0,
+                        help="share of requests held for --stall milliseconds before the response")
+    parser.add_argument('--stall', type=float, default=30000.0,
+                        help="milliseconds a stalled request is held (default: %(default)s)")
+    parser.add_argument('--bandwidth', type=float, help="KiB/s per response body")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record, serve and benchmark a local MDN CSS mirror.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help="save MDN pages as fixtures")
+    record_parser.add_argument('fixtures')
+    record_parser.add_argument('--limit', type=int, default=300, help="number of pages (default: %(default)s)")
+    record_parser.add_argument('--base-url', default=MDN_URL, help="site to crawl (default: %(default)s)")
+    record_parser.add_argument('--rate', type=float, default=1.0, help="requests/sec (default: %(default)s)")
+    record_parser.add_argument('--from-cache', metavar='SQLITE', help="export a cssget.py response cache instead")
+
+    serve_parser = commands.add_parser('serve', help="serve the fixtures over HTTP")
+    serve_parser.add_argument('fixtures')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    add_server_arguments(serve_parser)
+
+    bench_parser = commands.add_parser('bench', help="crawl the served fixtures and report measurements")
+    bench_parser.add_argument('fixtures')
+    add_server_arguments(bench_parser)
+    bench_parser.add_argument('--threads', type=int, default=5, help="crawler threads or asyncio workers")
+    bench_parser.add_argument('--async', dest='use_async', action='store_true', help="use the asyncio crawl")
+    bench_parser.add_argument('--fast-extract', action='store_true', help="use the single-pass extractor")
+    bench_parser.add_argument('--extract-workers', type=int, default=0, help="extraction worker processes")
+    bench_parser.add_argument('--jsonl', action='store_true', help="stream pages to a JSONL log")
+    bench_parser.add_argument('--rate', type=float, default=1000.0, help="crawler requests/sec (default: %(default)s)")
+    bench_parser.add_argument('--timeout', type=float, default=30,
+                              help="crawler request timeout in seconds (default: %(default)s)")
+    bench_parser.add_argument('--json', metavar='PATH', help="also write the measurements to this file")
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        count = record(args.fixtures, args.limit, args.base_url.rstrip('/'), args.rate, args.from_cache)
+        print(f"Recorded {count} pages into {args.fixtures}")
+    else:
+        server_options = {
+            "latency": args.latency / 1000,
+            "jitter": args.jitter / 1000,
+            "error_rate": args.error_rate,
+            "stall_rate": args.stall_rate,
+            "stall": args.stall / 1000,
+            "bandwidth": args.bandwidth * 1024 if args.bandwidth else None,
+        }
+        if args.command == 'serve':
+            serve(args.fixtures, args.port, **server_options)
+        else:
+            results = bench(args.fixtures, threads=args.threads, use_async=args.use_async,
+                            fast_extract=args.fast_extract, extract_workers=args.extract_workers,
+                            jsonl=args.jsonl, rate=args.rate, timeout=args.timeout, **server_options)
+            print(f"{results['pages']} pages ({results['requests']} requests) in {results['seconds']:.2f} s: "
+                  f"{results['pages_per_sec']:.1f} pages/s")
+            print(f"fetch  p50 {results['fetch_p50_ms']:8.1f} ms   p99 {results['fetch_p99_ms']:8.1f} ms")
+            print(f"wait   p50 {results['rate_limit_wait_p50_ms']:8.1f} ms   p99 "
+                  f"{results['rate_limit_wait_p99_ms']:8.1f} ms   (rate limiter, {results['rate_limit_wait_s']:.2f} s total)")
+            print(f"parse  p50 {results['parse_p50_ms']:8.1f} ms   p99 {results['parse_p99_ms']:8.1f} ms")
+            print(f"peak RSS {results['peak_rss_mib']:.1f} MiB; {results['checkpoints']} checkpoints wrote "
+                  f"{results['checkpoint_bytes'] / 1024:.1f} KiB; {results['throttled']} throttled, "
+                  f"{results['retries']} retries, "
+                  f"{results['gave_up']} pages given up")
+            if args.json:
+                with open(args.json, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, indent=2)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Query API
+-----------------
+Loads the merged dataset once and answers filtered queries through secondary
+indexes. Each index maps a field value to the set of entry keys that have it,
+is built lazily on first use, and queries intersect these postings
+(smallest first) instead of scanning every entry.
+
+Example:
+    data = CSSData.load()
+    data.query('properties').where(status='experimental', groups='CSS Box Model',
+                                   inherited=True, animationType='length').keys()
+"""
+
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+# Path to the merged dataset written by merge_cssdata.py
+DEFAULT_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cssdata-merged.json')
+
+INDEXED_FIELDS = ('status', 'groups', 'inherited', 'animationType', 'appliesto', 'media', 'mdn_url')
+
+
+def _field_values(entry, field):
+    """Return the index values of a field: list fields contribute each element."""
+    if field not in entry:
+        return ()
+    value = entry[field]
+    if isinstance(value, list):
+        return value
+    return (value,)
+
+
+class CSSData:
+    """The merged dataset with lazily built secondary indexes."""
+
+    def __init__(self, data):
+        """
+        Initialize the query layer.
+
+        Args:
+            data (dict): The merged dataset (as written by merge_cssdata.py)
+        """
+        self.meta = data.get('meta', {})
+        self.categories = {name: entries for name, entries in data.items() if name != 'meta'}
+        self._indexes = {}
+        self.timings = {
+            "load": 0.0,
+            "index_build": {},
+            "queries": 0,
+            "query_total": 0.0,
+        }
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Load the merged dataset from disk.
+
+        Args:
+            path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            CSSData: The query layer over the loaded data
+        """
+        start = time.perf_counter()
+        with open(path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            data = cls(json.load(f))
+        data.timings["load"] = time.perf_counter() - start
+        return data
+
+    def __getitem__(self, category):
+        return self.categories[category]
+
+    def get(self, category, key, default=None):
+        """
+        Look up a single entry.
+
+        Args:
+            category (str): Category name, e.g. 'properties'
+            key (str): Entry key, e.g. 'margin'
+            default: Value returned if the entry is missing
+
+        Returns:
+            dict: The entry, or `default`
+        """
+        return self.categories.get(category, {}).get(key, default)
+
+    def index(self, category, field):
+        """
+        Get the secondary index of a field, building it on first use.
+
+        Args:
+            category (str): Category name
+            field (str): Field name, e.g. 'status'
+
+        Returns:
+            dict: Field value -> frozenset of entry keys
+        """
+        key = (category, field)
+        index = self._indexes.get(key)
+        if index is None:
+            start = time.perf_counter()
+            postings = defaultdict(set)
+            for name, entry in self.categories[category].items():
+                if isinstance(entry, dict):
+                    for value in _field_values(entry, field):
+                        postings[value].add(name)
+            index = self._indexes[key] = {value: frozenset(keys) for value, keys in postings.items()}
+            self.timings["index_build"][f"{category}.{field}"] = time.perf_counter() - start
+        return index
+
+    def values(self, category, field):
+        """
+        List the distinct values of a field with their entry counts.
+
+        Args:
+            category (str): Category name
+            field (str): Field name
+
+        Returns:
+            dict: Field value -> number of entries
+        """
+        return {value: len(keys) for value, keys in self.index(category, field).items()}
+
+    def query(self, category='properties'):
+        """
+        Start a query over a category.
+
+        Args:
+            category (str): Category name
+
+        Returns:
+            Query: A query matching every entry of the category
+        """
+        if category not in self.categories:
+            raise KeyError(f"Unknown category: {category}")
+        return Query(self, category)
+
+    def postings(self, category, field, values):
+        """
+        Get the keys whose field has any of the given values.
+
+        Fields listed in INDEXED_FIELDS use their index; other fields fall
+        back to a scan of the category.
+
+        Args:
+            category (str): Category name
+            field (str): Field name
+            values (iterable): Accepted values
+
+        Returns:
+            frozenset: Matching entry keys
+        """
+        values = list(values)
+        if field in INDEXED_FIELDS:
+            index = self.index(category, field)
+            if len(values) == 1:
+                return index.get(values[0], frozenset())
+            return frozenset().union(*(index.get(value, ()) for value in values))
+        accepted = set(values)
+        return frozenset(
+            name for name, entry in self.categories[category].items()
+            if isinstance(entry, dict) and any(v in accepted for v in _field_values(entry, field)))
+
+    def _record_query(self, elapsed):
+        self.timings["queries"] += 1
+        self.timings["query_total"] += elapsed
+
+
+class Query:
+    """
+    An immutable, composable filter over one category.
+
+    Filters are kept as (field, values, negated) conditions and evaluated
+    together: positive postings are intersected smallest first, then negated
+    postings are subtracted. Queries over the same category can be combined
+    with `&` and `|`.
+    """
+
+    def __init__(self, data, category, conditions=(), keys=None):
+        self.data = data
+        self.category = category
+        self.conditions = tuple(conditions)
+        self._keys = keys
+        self._result = None
+
+    def where(self, **fields):
+        """
+        Add equality filters; a list or tuple value matches any of its items.
+
+        Returns:
+            Query: A narrowed query
+        """
+        return Query(self.data, self.category, self.conditions + tuple(
+            (field, tuple(value) if isinstance(value, (list, tuple, set, frozenset)) else (value,), False)
+            for field, value in fields.items()), self._keys)
+
+    def exclude(self, **fields):
+        """
+        Add negated filters; a list or tuple value excludes any of its items.
+
+        Returns:
+            Query: A narrowed query
+        """
+        return Query(self.data, self.category, self.conditions + tuple(
+            (field, tuple(value) if isinstance(value, (list, tuple, set, frozenset)) else (value,), True)
+            for field, value in fields.items()), self._keys)
+
+    def __and__(self, other):
+        self._check_compatible(other)
+        return Query(self.data, self.category, keys=self.key_set() & other.key_set())
+
+    def __or__(self, other):
+        self._check_compatible(other)
+        return Query(self.data, self.category, keys=self.key_set() | other.key_set())
+
+    def _check_compatible(self, other):
+        if not isinstance(other, Query) or other.data is not self.data or other.category != self.category:
+            raise ValueError("Only queries over the same data and category can be combined")
+
+    def key_set(self):
+        """
+        Evaluate the query.
+
+        Returns:
+            frozenset: Keys of the matching entries
+        """
+        if self._result is not None:
+            return self._result
+        start = time.perf_counter()
+        postings = [self.data.postings(self.category, field, values)
+                    for field, values, negated in self.conditions if not negated]
+        if self._keys is not None:
+            postings.append(self._keys)
+        if postings:
+            postings.sort(key=len)
+            result = postings[0]
+            for posting in postings[1:]:
+                if not result:
+                    break
+                result = result & posting
+        else:
+            result = frozenset(self.data.categories[self.category])
+        for field, values, negated in self.conditions:
+            if negated and result:
+                result = result - self.data.postings(self.category, field, values)
+        self.data._record_query(time.perf_counter() - start)
+        self._result = result
+        return result
+
+    def keys(self):
+        """Return the sorted keys of the matching entries."""
+        return sorted(self.key_set())
+
+    def entries(self):
+        """Return the matching entries as a dict keyed by name, in key order."""
+        entries = self.data.categories[self.category]
+        return {key: entries[key] for key in self.keys()}
+
+    def count(self):
+        """Return the number of matching entries."""
+        return len(self.key_set())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.count()
+
+    def __repr__(self):
+        parts = [f"{'not ' if negated else ''}{field} in {list(values)}" for field, values, negated in self.conditions]
+        return f"Query({self.category}: {' and '.join(parts) or 'all'})"
+
+
+if __name__ == "__main__":
+    # Usage: cssquery.py [category] field=value ...  (values are parsed as JSON when possible)
+    args = sys.argv[1:]
+    category = 'properties'
+    if args and '=' not in args[0]:
+        category = args.pop(0)
+    filters = {}
+    for arg in args:
+        field, _, value = arg.partition('=')
+        try:
+            filters[field] = json.loads(value)
+        except ValueError:
+            filters[field] = value
+
+    data = CSSData.load()
+    query = data.query(category).where(**filters)
+    for key in query.keys():
+        print(key)
+
+    timings = data.timings
+    print(f"\n{query.count()} matches; load {timings['load'] * 1000:.2f} ms, "
+          f"index build {sum(timings['index_build'].values()) * 1000:.3f} ms, "
+          f"{timings['queries']} queries {timings['query_total'] * 1000:.3f} ms", file=sys.stderr)
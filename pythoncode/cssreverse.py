@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Reverse Syntax Index
+----------------------------
+Maps every keyword, data type, function and property reference found in the
+`syntax` strings to the properties, at-rule descriptors and functions that
+accept it, directly or through transitive syntax references:
+
+    auto                  -> every entry whose grammar can contain `auto`
+    <length-percentage>   -> ... that reference it, at any depth
+    rgb()                 -> ... whose grammar contains the rgb( function
+    <'margin-top'>        -> ... that embed margin-top's grammar
+
+Entries are interned as integer ids, grouped by kind (properties first), and
+each term keeps two postings, direct and transitive, as sorted integer
+arrays. The index is built from cssgraph.py's closures once per dataset
+version (merge_cssdata.py writes it next to the merged output) and stored as
+one binary file that loads with a few `array.frombytes` calls; a lookup is a
+dict access and an array slice.
+
+File layout (little-endian):
+    header      magic, version, content hash, entry count, term count, posting count, posting item size
+    kinds       first entry id of each kind in KINDS, then the entry count
+    strings     length, then entry names and terms as UTF-8, newline-separated
+    offsets     per term: start of its direct postings, then of its transitive ones (count + 1 each)
+    postings    entry ids
+
+Usage:
+    python cssreverse.py                                   # build cssdata-reverse-index.bin
+    python cssreverse.py "<length-percentage>" [--direct] [--kind property]
+    python cssreverse.py --benchmark
+"""
+
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+from cssgraph import SyntaxGraph
+from csssyntax import Function, Group, Keyword, Multiplier, PropertyRef, SyntaxParseError, TypeRef, parse_syntax
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_FILE = os.path.join(ROOT_DIR, 'cssdata-merged.json')
+DEFAULT_INDEX_FILE = os.path.join(ROOT_DIR, 'cssdata-reverse-index.bin')
+DEFAULT_MANIFEST_FILE = os.path.join(ROOT_DIR, 'cssdata-merged.manifest.json')
+
+MAGIC = b'CSSDRIDX'
+VERSION = 1
+
+# Indexed entry kinds, in id order; graph ids map to names as the dataset spells them
+KINDS = ('property', 'descriptor', 'function')
+
+_HEADER = struct.Struct('<8sI64sIIII')
+_U32 = struct.Struct('<I')
+
+
+class ReverseIndexError(ValueError):
+    """Raised when a file is not a readable reverse index."""
+
+
+def syntax_terms(syntax):
+    """
+    Return the terms a syntax string mentions directly.
+
+    Args:
+        syntax (str): Value definition syntax
+
+    Returns:
+        set: Keywords (`auto`), data types (`<length>`), functions (`rgb()`)
+            and property references (`<'margin-top'>`)
+    """
+    terms = set()
+    if not syntax:
+        return terms
+    try:
+        stack = [parse_syntax(syntax)]
+    except SyntaxParseError:
+        return terms
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Keyword):
+            terms.add(node.name)
+        elif isinstance(node, TypeRef):
+            terms.add(f"<{node.name}>")
+        elif isinstance(node, PropertyRef):
+            terms.add(f"<'{node.name}'>")
+        elif isinstance(node, Function):
+            terms.add(f"{node.name}()")
+        elif isinstance(node, Group):
+            stack.extend(node.terms)
+        elif isinstance(node, Multiplier):
+            stack.append(node.term)
+    return terms
+
+
+def _entry_name(node_id, kind):
+    # Properties are graph nodes <'name'>; descriptors (@rule/name) and functions (name()) are used as is
+    return node_id[2:-2] if kind == 'property' else node_id
+
+
+class ReverseIndex:
+    """
+    Keyword, type and function -> accepting entries, as sorted integer postings.
+
+    Attributes:
+        content_hash (str): `meta.contentHash` of the dataset the index was built from
+        entries (list): Entry names by id (properties, then descriptors, then functions)
+        terms (list): Indexed terms
+    """
+
+    def __init__(self, content_hash, entries, kind_starts, terms, offsets, postings):
+        self.content_hash = content_hash
+        self.entries = entries
+        self.kind_starts = kind_starts
+        self.terms = terms
+        self._offsets = offsets
+        self._postings = postings
+        self._term_ids = {term: term_id for term_id, term in enumerate(terms)}
+        self._entry_ids = None
+
+    @classmethod
+    def build(cls, data, graph=None):
+        """
+        Build the index for a merged dataset.
+
+        Args:
+            data (dict): The merged dataset (as written by merge_cssdata.py)
+            graph (SyntaxGraph, optional): Its syntax graph, if already built
+
+        Returns:
+            ReverseIndex: The index
+        """
+        graph = graph or SyntaxGraph(data)
+        direct_terms = {node_id: syntax_terms(node["syntax"]) for node_id, node in graph.nodes.items()}
+
+        entries = []
+        node_ids = []
+        kind_starts = []
+        for kind in KINDS:
+            kind_starts.append(len(entries))
+            for node_id in sorted(node_id for node_id, node in graph.nodes.items() if node["kind"] == kind):
+                entries.append(_entry_name(node_id, kind))
+                node_ids.append(node_id)
+        kind_starts.append(len(entries))
+
+        direct = {}
+        reachable = {}
+        for entry_id, node_id in enumerate(node_ids):
+            own = direct_terms[node_id]
+            for term in own:
+                direct.setdefault(term, []).append(entry_id)
+            accepted = set(own)
+            for target in graph.closure[node_id]:
+                accepted |= direct_terms[target]
+            for term in accepted:
+                reachable.setdefault(term, []).append(entry_id)
+
+        terms = sorted(reachable)
+        offsets = array('I')
+        postings = array('H' if len(entries) < (1 << 16) else 'I')
+        for term in terms:
+            offsets.append(len(postings))
+            postings.extend(direct.get(term, ()))
+            offsets.append(len(postings))
+            postings.extend(reachable[term])
+        offsets.append(len(postings))
+        return cls(data.get('meta', {}).get('contentHash', ''), entries, kind_starts, terms, offsets, postings)
+
+    # -- persistence ---------------------------------------------------------
+
+    def write(self, path=None):
+        """
+        Write the index.
+
+        Args:
+            path (str, optional): Output path
+
+        Returns:
+            int: Size of the written file in bytes
+        """
+        strings = "\n".join(self.entries + self.terms).encode('utf-8')
+        offsets = array('I', self._offsets)
+        postings = array(self._postings.typecode, self._postings)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+            postings.byteswap()
+        with open(path or DEFAULT_INDEX_FILE, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.content_hash.encode('ascii').ljust(64, b'\0'),
+                                 len(self.entries), len(self.terms), len(postings), postings.itemsize))
+            for start in self.kind_starts:
+                f.write(_U32.pack(start))
+            f.write(_U32.pack(len(strings)))
+            f.write(strings)
+            f.write(offsets.tobytes())
+            f.write(postings.tobytes())
+            return f.tell()
+
+    @classmethod
+    def read(cls, path=None):
+        """
+        Read an index written by `write()`.
+
+        Args:
+            path (str, optional): Path to the index file
+
+        Returns:
+            ReverseIndex: The index
+
+        Raises:
+            ReverseIndexError: If the file is not a reverse index of this version
+        """
+        path = path or DEFAULT_INDEX_FILE
+        with open(path, 'rb') as f:
+            buf = f.read()
+        if len(buf) < _HEADER.size or buf[:8] != MAGIC:
+            raise ReverseIndexError(f"{path} is not a CSSDATA reverse index")
+        _, version, content_hash, entry_count, term_count, posting_count, item_size = _HEADER.unpack_from(buf)
+        if version != VERSION:
+            raise ReverseIndexError(f"Unsupported reverse index version {version} in {path}")
+
+        pos = _HEADER.size
+        kind_starts = list(struct.unpack_from(f'<{len(KINDS) + 1}I', buf, pos))
+        pos += _U32.size * (len(KINDS) + 1)
+        (strings_size,) = _U32.unpack_from(buf, pos)
+        pos += _U32.size
+        strings = buf[pos:pos + strings_size].decode('utf-8').split("\n")
+        pos += strings_size
+        offsets = array('I')
+        offsets.frombytes(buf[pos:pos + 4 * (2 * term_count + 1)])
+        pos += 4 * (2 * term_count + 1)
+        postings = array('H' if item_size == 2 else 'I')
+        postings.frombytes(buf[pos:pos + item_size * posting_count])
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+            postings.byteswap()
+        return cls(content_hash.rstrip(b'\0').decode('ascii'), strings[:entry_count], kind_starts,
+                   strings[entry_count:], offsets, postings)
+
+    @classmethod
+    def open(cls, path=None, data_path=None):
+        """
+        Read the index, rebuilding it first if it is missing or older than the dataset.
+
+        The dataset version is taken from merge_cssdata.py's manifest, so an
+        up-to-date index is used without parsing cssdata-merged.json.
+
+        Args:
+            path (str, optional): Path to the index file
+            data_path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            ReverseIndex: The index
+        """
+        path = path or DEFAULT_INDEX_FILE
+        expected = None
+        if data_path is None and os.path.exists(DEFAULT_MANIFEST_FILE):
+            with open(DEFAULT_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                expected = json.load(f).get("contentHash")
+        if os.path.exists(path):
+            try:
+                index = cls.read(path)
+            except ReverseIndexError:
+                index = None
+            if index is not None and (expected is None or index.content_hash == expected):
+                return index
+        with open(data_path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            index = cls.build(json.load(f))
+        index.write(path)
+        return index
+
+    # -- lookups -------------------------------------------------------------
+
+    def ids(self, term, direct=False):
+        """
+        Return the postings of a term.
+
+        Args:
+            term (str): A keyword (`auto`), type (`<color>`), function (`rgb()`) or property reference (`<'top'>`)
+            direct (bool): Only entries whose own syntax mentions the term
+
+        Returns:
+            array: Sorted entry ids (empty for unknown terms)
+        """
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            return self._postings[:0]
+        slot = 2 * term_id + (0 if direct else 1)
+        return self._postings[self._offsets[slot]:self._offsets[slot + 1]]
+
+    def lookup(self, term, direct=False, kind=None):
+        """
+        Return the names of the entries that accept a term.
+
+        Args:
+            term (str): See `ids`
+            direct (bool): Only entries whose own syntax mentions the term
+            kind (str, optional): Restrict to one of KINDS
+
+        Returns:
+            list: Entry names in id order (kind, then name)
+        """
+        ids = self.ids(term, direct)
+        if kind is not None:
+            position = KINDS.index(kind)
+            low, high = self.kind_starts[position], self.kind_starts[position + 1]
+            ids = ids[bisect_left(ids, low):bisect_left(ids, high)]
+        entries = self.entries
+        return [entries[entry_id] for entry_id in ids]
+
+    def accepts(self, entry, term, direct=False):
+        """Return whether an entry (e.g. 'margin', '@font-face/src', 'abs()') accepts a term."""
+        if self._entry_ids is None:
+            self._entry_ids = {name: entry_id for entry_id, name in enumerate(self.entries)}
+        entry_id = self._entry_ids.get(entry)
+        if entry_id is None:
+            return False
+        ids = self.ids(term, direct)
+        position = bisect_left(ids, entry_id)
+        return position < len(ids) and ids[position] == entry_id
+
+    def __contains__(self, term):
+        return term in self._term_ids
+
+    def __len__(self):
+        return len(self.terms)
+
+
+def write_reverse_index(data, path, graph=None):
+    """
+    Build and write the reverse index of a merged dataset (used by merge_cssdata.py).
+
+    Returns:
+        int: Size of the written file in bytes
+    """
+    return ReverseIndex.build(data, graph).write(path)
+
+
+def benchmark(json_path=None, index_path=None, rounds=20):
+    """
+    Compare the stored index with answering the same questions from the syntax strings.
+
+    The baseline rebuilds the syntax graph and rescans every entry's
+    expanded terms for each question, as a tool without the index does.
+
+    Returns:
+        dict: Build, write and load times, file size and per-lookup timings
+    """
+    with open(json_path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    index_path = index_path or os.path.join(ROOT_DIR, 'cssdata-reverse-index.bench.bin')
+
+    start = time.perf_counter()
+    index = ReverseIndex.build(data)
+    build = time.perf_counter() - start
+    size = index.write(index_path)
+
+    load = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        ReverseIndex.read(index_path)
+        elapsed = time.perf_counter() - start
+        load = elapsed if load is None else min(load, elapsed)
+    os.remove(index_path)
+
+    questions = ['<length-percentage>', 'auto', '<color>', 'calc()', "<'margin-top'>", 'none', '<image>']
+    start = time.perf_counter()
+    for _ in range(1000):
+        for term in questions:
+            index.lookup(term)
+    lookup = (time.perf_counter() - start) / (1000 * len(questions))
+
+    start = time.perf_counter()
+    for term in questions:
+        graph = SyntaxGraph(data)
+        terms = {node_id: syntax_terms(node["syntax"]) for node_id, node in graph.nodes.items()}
+        found = [node_id for node_id, node in graph.nodes.items() if node["kind"] in KINDS
+                 and any(term in terms[other] for other in graph.closure[node_id] | {node_id})]
+        assert len(found) == len(index.ids(term))
+    rescan = (time.perf_counter() - start) / len(questions)
+
+    return {
+        "entries": len(index.entries),
+        "terms": len(index.terms),
+        "postings": len(index._postings),
+        "file_kib": round(size / 1024, 1),
+        "build_ms": round(build * 1000, 1),
+        "load_ms": round(load * 1000, 3),
+        "lookup_us": round(lookup * 1e6, 2),
+        "rescan_per_question_ms": round(rescan * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args == ['--benchmark']:
+        print(json.dumps(benchmark(), indent=2))
+    elif not args:
+        start = time.perf_counter()
+        with open(DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            built = ReverseIndex.build(json.load(f))
+        size = built.write()
+        print(f"Wrote {DEFAULT_INDEX_FILE}: {len(built.terms)} terms over {len(built.entries)} entries, "
+              f"{len(built._postings)} postings, {size / 1024:.1f} KiB in {(time.perf_counter() - start) * 1000:.0f} ms")
+    elif not args[0].startswith('--'):
+        kind = None
+        if '--kind' in args:
+            kind = args[args.index('--kind') + 1]
+            if kind not in KINDS:
+                print(f"--kind must be one of {', '.join(KINDS)}")
+                sys.exit(2)
+        index = ReverseIndex.open()
+        if args[0] not in index:
+            print(f"Unknown term: {args[0]} (keywords as is, types as <name>, functions as name())")
+            sys.exit(1)
+        for name in index.lookup(args[0], direct='--direct' in args, kind=kind):
+            print(name)
+    else:
+        print("Usage: cssreverse.py [TERM [--direct] [--kind property|descriptor|function] | --benchmark]")
+        sys.exit(2)
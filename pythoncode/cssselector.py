@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Selector Engine
+-----------------------
+Parses selector lists, classifies every pseudo-class and pseudo-element
+against `selectors.json` and computes specificity as defined by Selectors
+Level 4: `:is()`, `:not()` and `:has()` take the specificity of their most
+specific argument, `:where()` counts nothing, `:nth-child(An+B of S)` adds
+its selector list to that of a pseudo-class, and `:host()`/`::slotted()` add
+their argument to their own. In stylesheets, nested rules add the
+specificity of their parent rule once per `&` (an implicit one when the
+selector has none).
+
+Bundles repeat the same selectors over and over, so parsed results are
+interned: every selector list by its text, and every compound selector by its
+text, shared between all complex selectors that contain it. A repeated
+selector costs one dict lookup.
+
+Usage:
+    python cssselector.py ".nav > a:is(#home, .active):hover::before"
+    python cssselector.py --stylesheet dist/app.css [--json]
+    python cssselector.py --benchmark bundle.css [more.css ...]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+from cssaudit import GROUP_AT_RULES, KEYFRAMES_AT_RULES, LEGACY_PSEUDO_ELEMENTS, VENDOR_PREFIX
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_FILE = os.path.join(ROOT_DIR, 'cssdata-merged.json')
+
+ZERO = (0, 0, 0)
+ID, CLASS, TYPE = (1, 0, 0), (0, 1, 0), (0, 0, 1)
+
+# Pseudo-classes replaced by the specificity of their most specific argument
+MAX_OF_ARGUMENT = frozenset([':is', ':not', ':has', ':matches'])
+# Pseudos that add the specificity of their argument to their own
+PLUS_ARGUMENT = frozenset([':host', ':host-context', '::slotted', '::cue'])
+# Pseudos taking a selector list; :has() takes relative selectors
+SELECTOR_ARGUMENT = MAX_OF_ARGUMENT | PLUS_ARGUMENT | frozenset([':where', ':-webkit-any', ':-moz-any'])
+NTH_OF = frozenset([':nth-child', ':nth-last-child'])
+
+Component = namedtuple('Component', ['kind', 'name', 'argument'])
+Finding = namedtuple('Finding', ['name', 'status', 'note'])
+Rule = namedtuple('Rule', ['offset', 'prelude', 'selectors', 'specificities', 'error'])
+
+_ESCAPE = r'\\(?:[0-9a-fA-F]{1,6}\s?|.)'
+_NAME_CHAR = r'(?:[\w-]|[^\x00-\x7f]|' + _ESCAPE + r')'
+_IDENT = r'(?:--|-?(?:[A-Za-z_]|[^\x00-\x7f]|' + _ESCAPE + r'))' + _NAME_CHAR + r'*'
+_STRING = r'"(?:[^"\\]|\\.)*"?|\'(?:[^\'\\]|\\.)*\'?'
+_ATTRIBUTE = r'\[(?:[^\]"\'\\]|\\.|"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')*\]'
+
+_SPACE = re.compile(r'(?:\s+|/\*.*?(?:\*/|\Z))*', re.S)
+# Pieces of a compound selector at parenthesis depth 0
+_COMPOUND_PART = re.compile(r'[^\s>+~,()\[\]\\"\'/|]+|' + _ESCAPE + r'|' + _ATTRIBUTE + r'|\|(?!\|)|/(?!\*)|\(',
+                            re.S)
+_PAREN_PART = re.compile(_STRING + r'|\\.|/\*.*?(?:\*/|\Z)|[()]', re.S)
+_SIMPLE = re.compile(
+    r'(?P<type>(?:' + _IDENT + r'|\*)?\|(?:' + _IDENT + r'|\*)|' + _IDENT + r'|\*)'
+    r'|#(?P<id>' + _NAME_CHAR + r'+)'
+    r'|\.(?P<class>' + _IDENT + r')'
+    r'|(?P<attribute>' + _ATTRIBUTE + r')'
+    r'|(?P<nesting>&)'
+    r'|(?P<colons>::?)(?P<pseudo>' + _IDENT + r')(?P<open>\()?', re.S)
+_NTH_OF = re.compile(r'\s+of\s+', re.I)
+_AT_KEYWORD = re.compile(r'@([\w-]*)')
+
+# Statement boundaries of a stylesheet; strings, comments and escapes are skipped whole
+_STYLESHEET_TOKEN = re.compile(r'/\*.*?(?:\*/|\Z)|' + _STRING + r'|\\.|[{};]', re.S)
+
+
+class SelectorError(ValueError):
+    """Raised for selectors that cannot be parsed."""
+
+
+def _add(left, right):
+    return left[0] + right[0], left[1] + right[1], left[2] + right[2]
+
+
+def _matching_paren(text, pos):
+    """Return the position after the `)` closing the parenthesis opened just before `pos`."""
+    depth = 1
+    for match in _PAREN_PART.finditer(text, pos):
+        char = match.group()
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if not depth:
+                return match.end()
+    raise SelectorError(f"Unclosed parenthesis in {text!r}")
+
+
+def _compound_end(text, pos):
+    """Return the end of the compound selector starting at `pos`."""
+    end = len(text)
+    while pos < end:
+        match = _COMPOUND_PART.match(text, pos)
+        if match is None:
+            break
+        pos = _matching_paren(text, match.end()) if match.group() == '(' else match.end()
+    return pos
+
+
+class Compound:
+    """An interned compound selector: its simple selectors, specificity and findings."""
+
+    __slots__ = ('text', 'components', 'specificity', 'findings', 'nesting')
+
+    def __init__(self, text, components, specificity, findings, nesting):
+        self.text = text
+        self.components = components
+        self.specificity = specificity
+        self.findings = findings
+        self.nesting = nesting
+
+    def __repr__(self):
+        return f"Compound({self.text!r}, {self.specificity})"
+
+
+class Selector:
+    """A complex selector: compounds joined by combinators (' ', '>', '+', '~', '||')."""
+
+    __slots__ = ('text', 'compounds', 'combinators', 'specificity', 'findings', 'nesting')
+
+    def __init__(self, text, compounds, combinators):
+        """
+        Args:
+            text (str): Source text
+            compounds (tuple): Compound objects
+            combinators (tuple): One combinator before each compound; the first is None
+                unless the selector is relative (`> img` in `:has(> img)`)
+        """
+        self.text = text
+        self.compounds = compounds
+        self.combinators = combinators
+        specificity = ZERO
+        findings = ()
+        nesting = 0
+        for compound in compounds:
+            specificity = _add(specificity, compound.specificity)
+            findings += compound.findings
+            nesting += compound.nesting
+        self.specificity = specificity
+        self.findings = findings
+        self.nesting = nesting
+
+    def __repr__(self):
+        return f"Selector({self.text!r}, {self.specificity})"
+
+
+class SelectorEngine:
+    """Selector parser and specificity calculator with interning caches."""
+
+    def __init__(self, selectors, cache=True):
+        """
+        Initialize the engine.
+
+        Args:
+            selectors (dict): Selector entries keyed by name (selectors.json)
+            cache (bool): Intern parsed selector lists and compounds
+        """
+        self.statuses = {name.lower(): entry.get('status') or 'standard'
+                         for name, entry in selectors.items() if name.startswith(':')}
+        self.cache = cache
+        self._lists = {}
+        self._compounds = {}
+        self._pseudos = {}
+        self.stats = {"lists": [0, 0], "compounds": [0, 0]}
+
+    @classmethod
+    def load(cls, path=None, **options):
+        """
+        Build an engine from the merged dataset.
+
+        Args:
+            path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            SelectorEngine: The engine
+        """
+        with open(path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['selectors'], **options)
+
+    def clear_cache(self):
+        """Drop every interned selector list and compound."""
+        self._lists.clear()
+        self._compounds.clear()
+
+    def cache_stats(self):
+        """
+        Return the hit rates of the interning caches.
+
+        Returns:
+            dict: Per cache, its size, hits, misses and hit rate
+        """
+        report = {}
+        for name, (hits, misses) in self.stats.items():
+            report[name] = {"size": len(self._lists if name == "lists" else self._compounds),
+                            "hits": hits, "misses": misses,
+                            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0}
+        return report
+
+    # -- classification ----------------------------------------------------
+
+    def classify(self, key):
+        """
+        Look up a pseudo-class or pseudo-element and return (status, note).
+
+        Args:
+            key (str): Lowercase name with its colons, and `()` if functional, e.g. ':nth-child()'
+
+        Returns:
+            tuple: The dataset status ('unknown' if it is not listed) and an explanatory note
+        """
+        result = self._pseudos.get(key)
+        if result is not None:
+            return result
+        statuses = self.statuses
+        status = statuses.get(key)
+        note = ""
+        if status is None and key in LEGACY_PSEUDO_ELEMENTS:
+            status = statuses.get(':' + key)
+            note = "legacy single-colon pseudo-element"
+        if status is None and key.endswith('()'):
+            status = statuses.get(key[:-2])
+        if status is None:
+            prefix = VENDOR_PREFIX.match(key.lstrip(':'))
+            base = key.replace(prefix.group(), '', 1) if prefix else None
+            if base in statuses:
+                status, note = 'nonstandard', f"vendor-prefixed form of {base}"
+            else:
+                status = 'unknown'
+        result = self._pseudos[key] = (status, note)
+        return result
+
+    # -- parsing -------------------------------------------------------------
+
+    def parse(self, text, relative=False):
+        """
+        Parse a selector list.
+
+        Args:
+            text (str): Selector list, e.g. "a:hover, .nav > li"
+            relative (bool): Accept relative selectors ("> li"), as in nested rules and :has()
+
+        Returns:
+            tuple: Selector objects (interned: the same text returns the same tuple)
+
+        Raises:
+            SelectorError: If the text is not a valid selector list
+        """
+        key = (text, relative)
+        if self.cache:
+            selectors = self._lists.get(key)
+            if selectors is not None:
+                self.stats["lists"][0] += 1
+                return selectors
+            self.stats["lists"][1] += 1
+        selectors, pos = self._parse_list(text, 0, relative)
+        if pos < len(text):
+            raise SelectorError(f"Unexpected {text[pos]!r} in {text!r}")
+        if self.cache:
+            self._lists[key] = selectors
+        return selectors
+
+    def specificity(self, text):
+        """Return the specificity (a, b, c) of every selector of a selector list."""
+        return [selector.specificity for selector in self.parse(text)]
+
+    def _parse_list(self, text, pos, relative):
+        selectors = []
+        while True:
+            selector, pos = self._parse_complex(text, pos, relative)
+            selectors.append(selector)
+            if pos < len(text) and text[pos] == ',':
+                pos += 1
+                continue
+            return tuple(selectors), pos
+
+    def _parse_complex(self, text, pos, relative):
+        pos = _SPACE.match(text, pos).end()
+        start = pos
+        compounds = []
+        combinators = []
+        combinator = None
+        if relative and pos < len(text) and text[pos] in '>+~':
+            combinator = text[pos]
+            pos = _SPACE.match(text, pos + 1).end()
+        while True:
+            end = _compound_end(text, pos)
+            if end == pos:
+                if pos >= len(text):
+                    raise SelectorError(f"Missing selector in {text!r}")
+                raise SelectorError(f"Unexpected {text[pos]!r} in {text!r}")
+            compounds.append(self.compound(text[pos:end]))
+            combinators.append(combinator)
+            after = _SPACE.match(text, end).end()
+            if after >= len(text) or text[after] in ',)':
+                pos = after
+                break
+            if text[after] in '>+~':
+                combinator = text[after]
+                pos = _SPACE.match(text, after + 1).end()
+            elif text.startswith('||', after):
+                combinator = '||'
+                pos = _SPACE.match(text, after + 2).end()
+            elif after > end:
+                combinator = ' '
+                pos = after
+            else:
+                raise SelectorError(f"Unexpected {text[after]!r} in {text!r}")
+        return Selector(text[start:end], tuple(compounds), tuple(combinators)), pos
+
+    def compound(self, text):
+        """
+        Parse one compound selector, e.g. `a.nav:not(.x)::before`.
+
+        Returns:
+            Compound: The interned compound
+        """
+        if self.cache:
+            compound = self._compounds.get(text)
+            if compound is not None:
+                self.stats["compounds"][0] += 1
+                return compound
+            self.stats["compounds"][1] += 1
+
+        components = []
+        specificity = ZERO
+        findings = []
+        nesting = 0
+        pos = 0
+        while pos < len(text):
+            match = _SIMPLE.match(text, pos)
+            if match is None or (match.group('type') is not None and pos):
+                raise SelectorError(f"Unexpected {text[pos]!r} in {text!r}")
+            pos = match.end()
+            if match.group('type') is not None:
+                name = match.group('type')
+                components.append(Component('type', name, None))
+                if not name.endswith('*'):
+                    specificity = _add(specificity, TYPE)
+            elif match.group('id') is not None:
+                components.append(Component('id', match.group('id'), None))
+                specificity = _add(specificity, ID)
+            elif match.group('class') is not None:
+                components.append(Component('class', match.group('class'), None))
+                specificity = _add(specificity, CLASS)
+            elif match.group('attribute') is not None:
+                components.append(Component('attribute', match.group('attribute'), None))
+                specificity = _add(specificity, CLASS)
+            elif match.group('nesting') is not None:
+                components.append(Component('nesting', '&', None))
+                nesting += 1
+            else:
+                name = match.group('colons') + match.group('pseudo').lower()
+                element = name.startswith('::') or name in LEGACY_PSEUDO_ELEMENTS
+                own = TYPE if element else CLASS
+                argument = None
+                key = name
+                if match.group('open'):
+                    key += '()'
+                    close = _matching_paren(text, pos)
+                    argument, own, argument_findings, argument_nesting = self._argument(name, text[pos:close - 1], own)
+                    findings += argument_findings
+                    nesting += argument_nesting
+                    pos = close
+                status, note = self.classify(key)
+                if status != 'standard':
+                    findings.append(Finding(key, status, note))
+                components.append(Component('pseudo-element' if element else 'pseudo-class', key, argument))
+                specificity = _add(specificity, own)
+
+        compound = Compound(text, tuple(components), specificity, tuple(findings), nesting)
+        if self.cache:
+            self._compounds[text] = compound
+        return compound
+
+    def _argument(self, name, inner, own):
+        """
+        Parse the argument of a functional pseudo.
+
+        Returns:
+            tuple: (argument, specificity of the pseudo, findings, `&` count); the argument
+                is a tuple of Selectors for selector-taking pseudos, its text otherwise
+        """
+        selector_text = None
+        if name in SELECTOR_ARGUMENT:
+            selector_text = inner
+        elif name in NTH_OF:
+            of = _NTH_OF.search(inner)
+            if of:
+                selector_text = inner[of.end():]
+        if selector_text is None:
+            return inner.strip(), own, (), 0
+
+        selectors = self.parse(selector_text, relative=name == ':has')
+        most = max(selector.specificity for selector in selectors)
+        if name == ':where':
+            own = ZERO
+        elif name in MAX_OF_ARGUMENT:
+            own = most
+        elif name in PLUS_ARGUMENT or name in NTH_OF:
+            own = _add(own, most)
+        findings = tuple(finding for selector in selectors for finding in selector.findings)
+        nesting = max(selector.nesting for selector in selectors)
+        return selectors, own, findings, nesting
+
+    # -- stylesheets ---------------------------------------------------------
+
+    def stylesheet(self, text):
+        """
+        Parse the selectors of every style rule of a stylesheet.
+
+        Rules are found by tracking blocks: selector preludes at the top level,
+        in group rules (@media, @supports, ...) and nested in other style
+        rules; keyframe selectors and other at-rules are skipped. The
+        specificities of a nested rule include its parent's: the parent's most
+        specific selector once per `&`, or once if the selector has no `&`.
+
+        Args:
+            text (str): Stylesheet source
+
+        Returns:
+            list: Rule tuples in source order; invalid preludes have `error` set
+        """
+        rules = []
+        # Block stack: (kind, specificity contributed by `&` in this block, or None at the top level)
+        blocks = [("rules", None)]
+        start = 0
+        for match in _STYLESHEET_TOKEN.finditer(text):
+            char = match.group()
+            if len(char) != 1:
+                continue
+            if char == ';':
+                start = match.end()
+                continue
+            if char == '}':
+                if len(blocks) > 1:
+                    blocks.pop()
+                start = match.end()
+                continue
+
+            kind, parent = blocks[-1]
+            offset = _SPACE.match(text, start).end()
+            prelude = text[offset:match.start()].rstrip()
+            start = match.end()
+            if prelude.startswith('@'):
+                name = VENDOR_PREFIX.sub('', _AT_KEYWORD.match(prelude).group(1).lower())
+                if name in KEYFRAMES_AT_RULES:
+                    blocks.append(("keyframes", None))
+                elif name in GROUP_AT_RULES and kind != "keyframes":
+                    blocks.append((kind, parent))
+                else:
+                    blocks.append(("at-rule", None))
+                continue
+            if kind not in ("rules", "decls"):
+                blocks.append(("decls", None))
+                continue
+
+            nested = kind == "decls" and parent is not None
+            try:
+                selectors = self.parse(prelude, relative=nested)
+            except SelectorError as e:
+                rules.append(Rule(offset, prelude, (), (), str(e)))
+                blocks.append(("decls", ZERO))
+                continue
+            if nested:
+                specificities = tuple(
+                    _add(selector.specificity, tuple(max(1, selector.nesting) * part for part in parent))
+                    for selector in selectors)
+            else:
+                specificities = tuple(selector.specificity for selector in selectors)
+            rules.append(Rule(offset, prelude, selectors, specificities, None))
+            blocks.append(("decls", max(specificities)))
+        return rules
+
+
+def summarize(rules):
+    """
+    Summarize the rules of one or more stylesheets.
+
+    Returns:
+        dict: Rule, selector and error counts, findings by name and status, and the most specific selector
+    """
+    findings = {}
+    selectors = 0
+    top = None
+    for rule in rules:
+        selectors += len(rule.selectors)
+        for selector, specificity in zip(rule.selectors, rule.specificities):
+            for finding in selector.findings:
+                key = f"{finding.status} {finding.name}"
+                findings[key] = findings.get(key, 0) + 1
+            if top is None or specificity > top[0]:
+                top = (specificity, selector.text)
+    return {
+        "rules": len(rules),
+        "selectors": selectors,
+        "errors": sum(1 for rule in rules if rule.error),
+        "findings": dict(sorted(findings.items())),
+        "most_specific": {"selector": top[1], "specificity": list(top[0])} if top else None,
+    }
+
+
+def _line_columns(text, offsets):
+    """Map ascending offsets to (line, column)."""
+    positions = []
+    line, counted, line_start = 1, 0, 0
+    for offset in offsets:
+        newlines = text.count('\n', counted, offset)
+        if newlines:
+            line += newlines
+            line_start = text.rfind('\n', counted, offset) + 1
+        counted = offset
+        positions.append((line, offset - line_start + 1))
+    return positions
+
+
+def benchmark(paths, data_path=None, rounds=3):
+    """
+    Measure selector throughput over a bundle of stylesheets.
+
+    Each round parses the whole bundle with a fresh engine; the best round is
+    reported with and without the interning caches, plus a second pass over
+    warm caches.
+
+    Args:
+        paths (list): Stylesheets, concatenated into one bundle
+        data_path (str, optional): Path to cssdata-merged.json
+        rounds (int): Number of rounds
+
+    Returns:
+        dict: Bundle size, selector counts, selectors/sec and cache statistics
+    """
+    texts = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            texts.append(f.read())
+    bundle = "\n".join(texts)
+    with open(data_path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+        selectors = json.load(f)['selectors']
+
+    def best(cache):
+        fastest = None
+        for _ in range(rounds):
+            fresh = SelectorEngine(selectors, cache=cache)
+            start = time.perf_counter()
+            rules = fresh.stylesheet(bundle)
+            elapsed = time.perf_counter() - start
+            fastest = elapsed if fastest is None else min(fastest, elapsed)
+        return fastest, rules, fresh
+
+    uncached, rules, _ = best(False)
+    cold, _, warm_engine = best(True)
+    start = time.perf_counter()
+    warm_engine.stylesheet(bundle)
+    warm = time.perf_counter() - start
+    summary = summarize(rules)
+    count = summary["selectors"]
+    return {
+        "files": len(paths),
+        "bytes": len(bundle.encode('utf-8')),
+        "rules": summary["rules"],
+        "selectors": count,
+        "distinct_selector_lists": len(warm_engine._lists),
+        "distinct_compounds": len(warm_engine._compounds),
+        "errors": summary["errors"],
+        "uncached_selectors_per_s": round(count / uncached),
+        "cold_cache_selectors_per_s": round(count / cold),
+        "warm_cache_selectors_per_s": round(count / warm),
+        "cache": warm_engine.cache_stats(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse CSS selectors, classify their pseudos against the "
+                                                 "dataset and compute specificity.")
+    parser.add_argument('inputs', nargs='+', help="a selector list, or stylesheets with --stylesheet/--benchmark")
+    parser.add_argument('--stylesheet', action='store_true', help="treat the inputs as stylesheet paths")
+    parser.add_argument('--json', action='store_true', help="print a JSON summary per stylesheet")
+    parser.add_argument('--benchmark', action='store_true', help="measure selectors/sec over the stylesheets")
+    parser.add_argument('--data', help="merged dataset (default: cssdata-merged.json)")
+    options = parser.parse_args()
+
+    if options.benchmark:
+        print(json.dumps(benchmark(options.inputs, options.data), indent=2))
+        sys.exit(0)
+
+    engine = SelectorEngine.load(options.data)
+
+    if not options.stylesheet:
+        try:
+            selectors = engine.parse(" ".join(options.inputs))
+        except SelectorError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        for selector in selectors:
+            a, b, c = selector.specificity
+            notes = "".join(f"  [{finding.status} {finding.name}{', ' + finding.note if finding.note else ''}]"
+                            for finding in selector.findings)
+            print(f"({a},{b},{c})  {selector.text}{notes}")
+        sys.exit(0)
+
+    reported = False
+    for path in options.inputs:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            source = f.read()
+        rules = engine.stylesheet(source)
+        if options.json:
+            print(json.dumps({"path": path, **summarize(rules)}, indent=2))
+            continue
+        flagged = [rule for rule in rules if rule.error or any(selector.findings for selector in rule.selectors)]
+        for rule, (line, column) in zip(flagged, _line_columns(source, [rule.offset for rule in flagged])):
+            reported = True
+            if rule.error:
+                print(f"{path}:{line}:{column}: invalid selector: {rule.error}")
+                continue
+            for finding in dict.fromkeys(f for selector in rule.selectors for f in selector.findings):
+                note = f" ({finding.note})" if finding.note else ""
+                print(f"{path}:{line}:{column}: {finding.status.capitalize()} selector '{finding.name}'{note}")
+    sys.exit(1 if reported else 0)
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Binary Snapshot
+-----------------------
+A compact, memory-mapped snapshot of the merged dataset. Short-lived tools can
+open it and decode single entries on first access instead of parsing the
+whole of cssdata-merged.json.
+
+File layout (little-endian):
+    header      magic, version, category count, string table offset, string count
+    categories  per category: name string id, entry count, index offset
+    indexes     per category, sorted by key: key string id, value offset, value length
+    values      tagged binary encoding of each entry (strings are string table ids)
+    strings     offset array followed by the UTF-8 bytes of every distinct string
+
+Usage:
+    python csssnapshot.py ../cssdata-merged.json ../cssdata-merged.snapshot
+    python csssnapshot.py --benchmark
+"""
+
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from collections.abc import Mapping
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_JSON_FILE = os.path.join(ROOT_DIR, 'cssdata-merged.json')
+DEFAULT_SNAPSHOT_FILE = os.path.join(ROOT_DIR, 'cssdata-merged.snapshot')
+
+MAGIC = b'CSSDSNAP'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIQI')
+_CATEGORY = struct.Struct('<IIQ')
+_INDEX_ENTRY = struct.Struct('<IQI')
+_U32 = struct.Struct('<I')
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+
+# Value tags
+_NULL, _TRUE, _FALSE, _INT, _FLOAT, _STRING, _LIST, _MAP = range(8)
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a readable snapshot."""
+
+
+def write_snapshot(data, path):
+    """
+    Write the merged dataset to a snapshot file.
+
+    Every top-level key of `data` whose value is a dict becomes a category.
+
+    Args:
+        data (dict): The merged dataset (as written to cssdata-merged.json)
+        path (str): Output path
+
+    Returns:
+        int: Size of the written file in bytes
+    """
+    strings = {}
+
+    def intern(text):
+        string_id = strings.get(text)
+        if string_id is None:
+            string_id = strings[text] = len(strings)
+        return string_id
+
+    def encode(value, out):
+        if value is None:
+            out.append(bytes((_NULL,)))
+        elif value is True:
+            out.append(bytes((_TRUE,)))
+        elif value is False:
+            out.append(bytes((_FALSE,)))
+        elif isinstance(value, int):
+            out.append(bytes((_INT,)) + _I64.pack(value))
+        elif isinstance(value, float):
+            out.append(bytes((_FLOAT,)) + _F64.pack(value))
+        elif isinstance(value, str):
+            out.append(bytes((_STRING,)) + _U32.pack(intern(value)))
+        elif isinstance(value, list):
+            out.append(bytes((_LIST,)) + _U32.pack(len(value)))
+            for item in value:
+                encode(item, out)
+        elif isinstance(value, dict):
+            out.append(bytes((_MAP,)) + _U32.pack(len(value)))
+            for key, item in value.items():
+                out.append(_U32.pack(intern(key)))
+                encode(item, out)
+        else:
+            raise TypeError(f"Cannot encode {type(value).__name__} in a snapshot")
+
+    categories = [(name, entries) for name, entries in data.items() if isinstance(entries, dict)]
+
+    # Encode values first so the string table is complete before it is written
+    values = io.BytesIO()
+    indexes = []
+    for name, entries in categories:
+        intern(name)
+        index = []
+        for key in sorted(entries):
+            out = []
+            encode(entries[key], out)
+            blob = b''.join(out)
+            index.append((intern(key), values.tell(), len(blob)))
+            values.write(blob)
+        indexes.append(index)
+
+    header_size = _HEADER.size + _CATEGORY.size * len(categories)
+    index_size = sum(_INDEX_ENTRY.size * len(index) for index in indexes)
+    values_offset = header_size + index_size
+    strings_offset = values_offset + values.tell()
+
+    encoded_strings = [text.encode('utf-8') for text in strings]
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(categories), strings_offset, len(encoded_strings)))
+        index_offset = header_size
+        for (name, entries), index in zip(categories, indexes):
+            f.write(_CATEGORY.pack(strings[name], len(index), index_offset))
+            index_offset += _INDEX_ENTRY.size * len(index)
+        for index in indexes:
+            for key_id, offset, length in index:
+                f.write(_INDEX_ENTRY.pack(key_id, values_offset + offset, length))
+        f.write(values.getvalue())
+        offset = 0
+        for blob in encoded_strings:
+            f.write(_U32.pack(offset))
+            offset += len(blob)
+        f.write(_U32.pack(offset))
+        for blob in encoded_strings:
+            f.write(blob)
+        return f.tell()
+
+
+class Snapshot:
+    """
+    A read-only, memory-mapped snapshot of the merged dataset.
+
+    Opening a snapshot reads only the header and category directory. Keys
+    are found by binary search over the sorted per-category index, and each
+    entry and string is decoded on first access and cached.
+    """
+
+    def __init__(self, path=None):
+        """
+        Open a snapshot.
+
+        Args:
+            path (str, optional): Path to the snapshot file
+
+        Raises:
+            SnapshotError: If the file is not a snapshot of a supported version
+        """
+        self.path = path or DEFAULT_SNAPSHOT_FILE
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, self._strings_offset, self._string_count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise SnapshotError(f"Not a CSSDATA snapshot: {self.path}")
+        if version != VERSION:
+            self.close()
+            raise SnapshotError(f"Unsupported snapshot version {version}: {self.path}")
+        self._string_bytes = self._strings_offset + 4 * (self._string_count + 1)
+        self._strings = {}
+        self._categories = {}
+        for i in range(count):
+            name_id, entries, index_offset = _CATEGORY.unpack_from(self._map, _HEADER.size + i * _CATEGORY.size)
+            name = self._string(name_id)
+            self._categories[name] = SnapshotCategory(self, name, entries, index_offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the memory map and the underlying file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def categories(self):
+        """Return the names of the categories in the snapshot."""
+        return list(self._categories)
+
+    def __getitem__(self, name):
+        return self._categories[name]
+
+    def __contains__(self, name):
+        return name in self._categories
+
+    def get(self, category, key, default=None):
+        """
+        Look up a single entry.
+
+        Args:
+            category (str): Category name, e.g. 'properties'
+            key (str): Entry key, e.g. 'margin'
+            default: Value returned if the category or key is missing
+
+        Returns:
+            The decoded entry, or `default`
+        """
+        entries = self._categories.get(category)
+        if entries is None:
+            return default
+        return entries.get(key, default)
+
+    def _string(self, string_id):
+        text = self._strings.get(string_id)
+        if text is None:
+            start, end = struct.unpack_from('<II', self._map, self._strings_offset + 4 * string_id)
+            text = self._strings[string_id] = str(
+                self._map[self._string_bytes + start:self._string_bytes + end], 'utf-8')
+        return text
+
+    def _decode(self, offset):
+        """Decode the value at `offset`, returning it and the offset just past it."""
+        buf = self._map
+        tag = buf[offset]
+        offset += 1
+        if tag == _STRING:
+            return self._string(_U32.unpack_from(buf, offset)[0]), offset + 4
+        if tag == _MAP:
+            count = _U32.unpack_from(buf, offset)[0]
+            offset += 4
+            result = {}
+            for _ in range(count):
+                key = self._string(_U32.unpack_from(buf, offset)[0])
+                result[key], offset = self._decode(offset + 4)
+            return result, offset
+        if tag == _LIST:
+            count = _U32.unpack_from(buf, offset)[0]
+            offset += 4
+            result = []
+            for _ in range(count):
+                item, offset = self._decode(offset)
+                result.append(item)
+            return result, offset
+        if tag == _TRUE:
+            return True, offset
+        if tag == _FALSE:
+            return False, offset
+        if tag == _NULL:
+            return None, offset
+        if tag == _INT:
+            return _I64.unpack_from(buf, offset)[0], offset + 8
+        if tag == _FLOAT:
+            return _F64.unpack_from(buf, offset)[0], offset + 8
+        raise SnapshotError(f"Corrupt snapshot value at offset {offset - 1}: {self.path}")
+
+
+class SnapshotCategory(Mapping):
+    """A lazily decoded, read-only mapping over one category of a snapshot."""
+
+    def __init__(self, snapshot, name, count, index_offset):
+        self.snapshot = snapshot
+        self.name = name
+        self._count = count
+        self._index_offset = index_offset
+        self._cache = {}
+
+    def _index_entry(self, position):
+        return _INDEX_ENTRY.unpack_from(self.snapshot._map, self._index_offset + position * _INDEX_ENTRY.size)
+
+    def _key(self, position):
+        return self.snapshot._string(self._index_entry(position)[0])
+
+    def __getitem__(self, key):
+        if key in self._cache:
+            return self._cache[key]
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count:
+            key_id, offset, _ = self._index_entry(low)
+            if self.snapshot._string(key_id) == key:
+                value = self._cache[key] = self.snapshot._decode(offset)[0]
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self._key(position)
+
+    def __len__(self):
+        return self._count
+
+
+def build_snapshot(json_path=None, snapshot_path=None):
+    """
+    Convert a merged JSON file into a snapshot.
+
+    Args:
+        json_path (str, optional): Path to cssdata-merged.json
+        snapshot_path (str, optional): Output path for the snapshot
+
+    Returns:
+        int: Size of the written snapshot in bytes
+    """
+    with open(json_path or DEFAULT_JSON_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return write_snapshot(data, snapshot_path or DEFAULT_SNAPSHOT_FILE)
+
+
+def benchmark(json_path=None, snapshot_path=None, rounds=50):
+    """
+    Compare load-and-lookup cost of the JSON file against the snapshot.
+
+    Each round opens the data from scratch and looks up a handful of
+    properties, the way a pre-commit or editor save hook would.
+
+    Args:
+        json_path (str, optional): Path to cssdata-merged.json
+        snapshot_path (str, optional): Path to the snapshot (built if missing)
+        rounds (int): Number of open-and-lookup rounds per format
+
+    Returns:
+        dict: Per-format timings in milliseconds and file sizes in bytes
+    """
+    json_path = json_path or DEFAULT_JSON_FILE
+    snapshot_path = snapshot_path or DEFAULT_SNAPSHOT_FILE
+    if not os.path.exists(snapshot_path):
+        build_snapshot(json_path, snapshot_path)
+    lookups = ['margin', 'color', 'display', 'grid-template-areas', 'font-family']
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        json_results = [data['properties'][name] for name in lookups]
+    json_time = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        with Snapshot(snapshot_path) as snapshot:
+            snapshot_results = [snapshot.get('properties', name) for name in lookups]
+    snapshot_time = (time.perf_counter() - start) / rounds
+
+    if snapshot_results != json_results:
+        raise SnapshotError("Snapshot lookups differ from the JSON source")
+
+    return {
+        "json_bytes": os.path.getsize(json_path),
+        "snapshot_bytes": os.path.getsize(snapshot_path),
+        "lookups_per_round": len(lookups),
+        "json_load_and_lookup_ms": json_time * 1000,
+        "snapshot_open_and_lookup_ms": snapshot_time * 1000,
+        "speedup": json_time / snapshot_time,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == '--benchmark':
+        print(json.dumps(benchmark(), indent=2))
+    elif len(sys.argv) <= 3:
+        size = build_snapshot(*sys.argv[1:])
+        print(f"Wrote snapshot ({size} bytes)")
+    else:
+        print("Usage: csssnapshot.py [merged.json [output.snapshot]] | --benchmark")
+        sys.exit(2)
@@ -0,0 +1,1261 @@
+#!/usr/bin/env python3
+"""
+CSS Value Definition Syntax Engine
+----------------------------------
+Parses the `syntax` strings of the CSSDATA dataset (properties, syntaxes and
+functions) into an AST once, and compiles them into cached matcher objects
+that validate declaration values.
+
+Matchers never backtrack through generators: every matcher returns the set of
+token positions where it can end, so alternatives and multipliers are explored
+once per position. Referenced syntaxes (`<type>` and `<'property'>`) are
+compiled a single time per grammar and memoized per position during a match.
+
+Usage:
+    python csssyntax.py color "rgb(0 0 0 / 50%)"
+    python csssyntax.py --benchmark
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+
+# Path to the merged dataset written by merge_cssdata.py
+DEFAULT_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cssdata-merged.json')
+
+CSS_WIDE_KEYWORDS = frozenset(['inherit', 'initial', 'unset', 'revert', 'revert-layer'])
+
+# Functions whose presence makes a value impossible to validate before substitution
+SUBSTITUTION_FUNCTIONS = frozenset(['var', 'env', 'attr'])
+
+MATH_FUNCTIONS = frozenset([
+    'calc', 'min', 'max', 'clamp', 'round', 'mod', 'rem', 'sin', 'cos', 'tan', 'asin',
+    'acos', 'atan', 'atan2', 'pow', 'sqrt', 'hypot', 'log', 'exp', 'abs', 'sign',
+])
+
+UNITS = {
+    'length': frozenset([
+        'em', 'rem', 'ex', 'rex', 'cap', 'rcap', 'ch', 'rch', 'ic', 'ric', 'lh', 'rlh',
+        'vw', 'vh', 'vi', 'vb', 'vmin', 'vmax', 'svw', 'svh', 'svi', 'svb', 'svmin', 'svmax',
+        'lvw', 'lvh', 'lvi', 'lvb', 'lvmin', 'lvmax', 'dvw', 'dvh', 'dvi', 'dvb', 'dvmin',
+        'dvmax', 'cqw', 'cqh', 'cqi', 'cqb', 'cqmin', 'cqmax', 'px', 'cm', 'mm', 'q', 'in',
+        'pt', 'pc',
+    ]),
+    'angle': frozenset(['deg', 'grad', 'rad', 'turn']),
+    'time': frozenset(['s', 'ms']),
+    'frequency': frozenset(['hz', 'khz']),
+    'resolution': frozenset(['dpi', 'dpcm', 'dppx', 'x']),
+    'flex': frozenset(['fr']),
+}
+
+# Token kinds produced by tokenize_value()
+IDENT = 'ident'
+FUNCTION = 'function'
+NUMBER = 'number'
+PERCENTAGE = 'percentage'
+DIMENSION = 'dimension'
+STRING = 'string'
+URL = 'url'
+HASH = 'hash'
+DELIM = 'delim'
+
+_VALUE_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>/\*.*?\*/)
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<url>url\(\s*(?:[^"'()\s\\]|\\.)*\s*\))
+  | (?P<number>[+-]?(?:\d*\.\d+|\d+)(?:[eE][+-]?\d+)?)(?P<unit>%|-?(?:[a-zA-Z_]|[^\x00-\x7f])(?:[\w-]|[^\x00-\x7f])*)?
+  | (?P<ident>(?:--|-?(?:[a-zA-Z_]|[^\x00-\x7f]|\\.))(?:[\w-]|[^\x00-\x7f]|\\.)*)(?P<func>\()?
+  | (?P<hash>\#(?:[\w-]|[^\x00-\x7f]|\\.)+)
+  | (?P<delim>.)
+""", re.VERBOSE | re.DOTALL)
+
+
+@lru_cache(maxsize=8192)
+def tokenize_value_spans(text):
+    """
+    Split a declaration value into component value tokens with their source spans.
+
+    Whitespace and comments are dropped. Each token is a tuple
+    `(kind, value, extra)`: identifiers and function names are lowercased,
+    numbers carry whether they were written as integers, and dimensions carry
+    their lowercased unit.
+
+    Args:
+        text (str): The declaration value
+
+    Returns:
+        tuple: (tokens, spans), where spans[i] is the (start, end) offset of tokens[i]
+    """
+    tokens = []
+    spans = []
+    append = tokens.append
+    for m in _VALUE_TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind in ('ws', 'comment'):
+            continue
+        spans.append(m.span())
+        if kind == 'unit' or kind == 'number':
+            number = m.group('number')
+            unit = m.group('unit')
+            value = float(number)
+            if unit is None:
+                append((NUMBER, value, '.' not in number and 'e' not in number.lower()))
+            elif unit == '%':
+                append((PERCENTAGE, value, None))
+            else:
+                append((DIMENSION, value, unit.lower()))
+        elif kind == 'ident' or kind == 'func':
+            if m.group('func'):
+                append((FUNCTION, m.group('ident').lower(), None))
+            else:
+                append((IDENT, m.group('ident').lower(), None))
+        elif kind == 'string':
+            append((STRING, m.group('string')[1:-1], None))
+        elif kind == 'url':
+            append((URL, m.group('url')[4:-1].strip(), None))
+        elif kind == 'hash':
+            append((HASH, m.group('hash')[1:], None))
+        else:
+            append((DELIM, m.group('delim'), None))
+    return tuple(tokens), tuple(spans)
+
+
+def tokenize_value(text):
+    """
+    Split a declaration value into component value tokens.
+
+    Args:
+        text (str): The declaration value
+
+    Returns:
+        tuple: The tokens of the value (see tokenize_value_spans)
+    """
+    return tokenize_value_spans(text)[0]
+
+
+# ---------------------------------------------------------------------------
+# Definition syntax AST
+# ---------------------------------------------------------------------------
+
+class Node:
+    """Base class for value definition syntax AST nodes."""
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __hash__(self):
+        return hash((type(self).__name__,) + tuple(
+            tuple(v) if isinstance(v, list) else v for v in (getattr(self, s) for s in self.__slots__)))
+
+    def __repr__(self):
+        args = ", ".join(repr(getattr(self, s)) for s in self.__slots__)
+        return f"{type(self).__name__}({args})"
+
+
+class Keyword(Node):
+    """A literal keyword such as `auto`."""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Literal(Node):
+    """A literal character such as `,`, `/` or a quoted `'+'`."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Function(Node):
+    """The opening token of a function, e.g. `fit-content(`."""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class TypeRef(Node):
+    """A data type reference such as `<length [0,∞]>`."""
+    __slots__ = ('name', 'range')
+
+    def __init__(self, name, range=None):
+        self.name = name
+        self.range = range
+
+
+class PropertyRef(Node):
+    """A reference to the grammar of another property, e.g. `<'margin-top'>`."""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Group(Node):
+    """A group of terms joined by a combinator (' ', '&&', '||' or '|')."""
+    __slots__ = ('combinator', 'terms', 'explicit', 'nonempty')
+
+    def __init__(self, combinator, terms, explicit=False, nonempty=False):
+        self.combinator = combinator
+        self.terms = terms
+        self.explicit = explicit
+        self.nonempty = nonempty
+
+
+class Multiplier(Node):
+    """A repeated term: `?`, `*`, `+`, `#` or `{min,max}` (max None is unbounded)."""
+    __slots__ = ('term', 'min', 'max', 'comma')
+
+    def __init__(self, term, min, max, comma=False):
+        self.term = term
+        self.min = min
+        self.max = max
+        self.comma = comma
+
+
+class SyntaxParseError(ValueError):
+    """Raised when a value definition syntax string cannot be parsed."""
+
+
+_DEF_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+|†)
+  | (?P<prop><'[^'>]+'>)
+  | (?P<type><[^>'\s][^>]*>)
+  | (?P<quoted>'[^']*'|"[^"]*")
+  | (?P<comb>\|\||&&|\|)
+  | (?P<mult>\{\d+(?:,\d*)?\}|[*+?!#])
+  | (?P<open>\[)
+  | (?P<close>\])
+  | (?P<func>[\w-]+\()
+  | (?P<word>[\w-]+|%)
+  | (?P<char>\S)
+""", re.VERBOSE)
+
+_RANGE_RE = re.compile(r'^([\w()-]+)\s*(?:\[\s*([^,\]]*)\s*,\s*([^\]]*)\s*\])?$')
+
+# Lowest to highest precedence; juxtaposition binds tightest
+_COMBINATORS = ('|', '||', '&&')
+
+
+def _parse_bound(text):
+    text = text.strip()
+    if text in ('∞', 'inf', '+∞'):
+        return float('inf')
+    if text in ('-∞', '-inf'):
+        return float('-inf')
+    return float(re.sub(r'[a-zA-Z%]+$', '', text))
+
+
+def parse_syntax(text):
+    """
+    Parse a value definition syntax string into an AST.
+
+    Args:
+        text (str): A `syntax` string from the dataset
+
+    Returns:
+        Node: The root node of the parsed syntax
+
+    Raises:
+        SyntaxParseError: If the string is not valid definition syntax
+    """
+    tokens = [(m.lastgroup, m.group()) for m in _DEF_TOKEN_RE.finditer(text) if m.lastgroup != 'ws']
+    node, pos = _parse_group(tokens, 0, text)
+    if pos != len(tokens):
+        raise SyntaxParseError(f"Unexpected '{tokens[pos][1]}' in syntax: {text}")
+    return node
+
+
+def _parse_group(tokens, pos, text):
+    """Parse terms and combinators until a closing bracket or the end."""
+    items = []
+    while pos < len(tokens):
+        kind, value = tokens[pos]
+        if kind == 'close':
+            break
+        if kind == 'comb':
+            items.append(value)
+            pos += 1
+            continue
+        if kind == 'open':
+            term, pos = _parse_group(tokens, pos + 1, text)
+            if pos >= len(tokens) or tokens[pos][0] != 'close':
+                raise SyntaxParseError(f"Unclosed '[' in syntax: {text}")
+            pos += 1
+            if not isinstance(term, Group):
+                term = Group(' ', [term])
+            term.explicit = True
+        elif kind == 'prop':
+            term = PropertyRef(value[2:-2])
+            pos += 1
+        elif kind == 'type':
+            m = _RANGE_RE.match(value[1:-1].strip())
+            if not m:
+                raise SyntaxParseError(f"Invalid type reference {value} in syntax: {text}")
+            name, low, high = m.groups()
+            term = TypeRef(name, (_parse_bound(low), _parse_bound(high)) if low is not None else None)
+            pos += 1
+        elif kind == 'quoted':
+            term = Literal(value[1:-1])
+            pos += 1
+        elif kind == 'func':
+            term = Function(value[:-1].lower())
+            pos += 1
+        elif kind == 'word':
+            term = Keyword(value)
+            pos += 1
+        elif kind == 'char':
+            term = Literal(value)
+            pos += 1
+        else:
+            raise SyntaxParseError(f"Unexpected '{value}' in syntax: {text}")
+        term, pos = _parse_multipliers(term, tokens, pos)
+        items.append(term)
+    return _build_precedence(items, 0, text), pos
+
+
+def _parse_multipliers(term, tokens, pos):
+    """Wrap a term in any multipliers that follow it."""
+    while pos < len(tokens) and tokens[pos][0] == 'mult':
+        value = tokens[pos][1]
+        pos += 1
+        if value == '!':
+            if not isinstance(term, Group):
+                term = Group(' ', [term], explicit=True)
+            term.nonempty = True
+            continue
+        if value == '?':
+            term = Multiplier(term, 0, 1)
+        elif value == '*':
+            term = Multiplier(term, 0, None)
+        elif value == '+':
+            term = Multiplier(term, 1, None)
+        elif value == '#':
+            low, high = 1, None
+            if pos < len(tokens) and tokens[pos][0] == 'mult' and tokens[pos][1].startswith('{'):
+                low, high = _parse_range(tokens[pos][1])
+                pos += 1
+            term = Multiplier(term, low, high, comma=True)
+        else:
+            low, high = _parse_range(value)
+            term = Multiplier(term, low, high)
+    return term, pos
+
+
+def _parse_range(value):
+    bounds = value[1:-1].split(',')
+    low = int(bounds[0])
+    if len(bounds) == 1:
+        return low, low
+    return low, int(bounds[1]) if bounds[1] else None
+
+
+def _build_precedence(items, level, text):
+    """Fold a flat list of terms and combinators by combinator precedence."""
+    if level == len(_COMBINATORS):
+        if any(isinstance(item, str) for item in items):
+            raise SyntaxParseError(f"Dangling combinator in syntax: {text}")
+        if len(items) == 1:
+            return items[0]
+        return Group(' ', items)
+
+    combinator = _COMBINATORS[level]
+    parts = [[]]
+    for item in items:
+        if item == combinator:
+            parts.append([])
+        else:
+            parts[-1].append(item)
+    if len(parts) == 1:
+        return _build_precedence(items, level + 1, text)
+    if any(not part for part in parts):
+        raise SyntaxParseError(f"Empty operand for '{combinator}' in syntax: {text}")
+    return Group(combinator, [_build_precedence(part, level + 1, text) for part in parts])
+
+
+def iter_references(node):
+    """
+    Yield every TypeRef and PropertyRef in an AST.
+
+    Args:
+        node (Node): Root of a parsed syntax
+
+    Yields:
+        Node: TypeRef and PropertyRef nodes in definition order
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (TypeRef, PropertyRef)):
+            yield node
+        elif isinstance(node, Group):
+            stack.extend(reversed(node.terms))
+        elif isinstance(node, Multiplier):
+            stack.append(node.term)
+
+
+def format_syntax(node):
+    """
+    Render an AST back to definition syntax.
+
+    Args:
+        node (Node): Root of a parsed syntax
+
+    Returns:
+        str: Normalized definition syntax text
+    """
+    if isinstance(node, Keyword):
+        return node.name
+    if isinstance(node, Literal):
+        return f"'{node.value}'" if node.value not in (',', '/', '(', ')') else node.value
+    if isinstance(node, Function):
+        return f"{node.name}("
+    if isinstance(node, TypeRef):
+        if node.range:
+            low, high = ('∞' if b == float('inf') else '-∞' if b == float('-inf') else f"{b:g}" for b in node.range)
+            return f"<{node.name} [{low},{high}]>"
+        return f"<{node.name}>"
+    if isinstance(node, PropertyRef):
+        return f"<'{node.name}'>"
+    if isinstance(node, Multiplier):
+        inner = format_syntax(node.term)
+        if node.comma:
+            suffix = '#' if (node.min, node.max) == (1, None) else f"#{{{node.min},{'' if node.max is None else node.max}}}"
+        elif (node.min, node.max) == (0, 1):
+            suffix = '?'
+        elif (node.min, node.max) == (0, None):
+            suffix = '*'
+        elif (node.min, node.max) == (1, None):
+            suffix = '+'
+        elif node.min == node.max:
+            suffix = f"{{{node.min}}}"
+        else:
+            suffix = f"{{{node.min},{'' if node.max is None else node.max}}}"
+        return inner + suffix
+    separator = ' ' if node.combinator == ' ' else f" {node.combinator} "
+    text = separator.join(format_syntax(term) for term in node.terms)
+    if node.explicit:
+        text = f"[ {text} ]"
+    if node.nonempty:
+        text += '!'
+    return text
+
+
+# ---------------------------------------------------------------------------
+# Compiled matchers
+# ---------------------------------------------------------------------------
+
+_NO_MATCH = ()
+
+
+class Matcher:
+    """
+    Base class for compiled matchers.
+
+    `match(tokens, pos, memo)` returns an iterable of every position at which
+    the matcher can finish when started at `pos`; an empty result means no
+    match. `memo` is a per-value dictionary shared by reference matchers.
+    """
+    __slots__ = ()
+
+    def match(self, tokens, pos, memo):
+        raise NotImplementedError
+
+
+class KeywordMatcher(Matcher):
+    """Matches one identifier out of a set of keywords (ASCII case-insensitive)."""
+    __slots__ = ('words',)
+
+    def __init__(self, words):
+        self.words = frozenset(w.lower() for w in words)
+
+    def match(self, tokens, pos, memo):
+        if pos < len(tokens):
+            token = tokens[pos]
+            if token[0] == IDENT and token[1] in self.words:
+                return (pos + 1,)
+        return _NO_MATCH
+
+
+class NumberLiteralMatcher(Matcher):
+    """Matches a literal number written in a syntax, such as `0`."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def match(self, tokens, pos, memo):
+        if pos < len(tokens):
+            token = tokens[pos]
+            if token[0] == NUMBER and token[1] == self.value:
+                return (pos + 1,)
+        return _NO_MATCH
+
+
+class DelimMatcher(Matcher):
+    """Matches a literal punctuation sequence such as `,`, `/` or `||`."""
+    __slots__ = ('chars',)
+
+    def __init__(self, chars):
+        self.chars = chars
+
+    def match(self, tokens, pos, memo):
+        end = pos + len(self.chars)
+        if end > len(tokens):
+            return _NO_MATCH
+        for i, char in enumerate(self.chars):
+            token = tokens[pos + i]
+            if token[0] != DELIM or token[1] != char:
+                return _NO_MATCH
+        return (end,)
+
+
+class CommaMatcher(Matcher):
+    """
+    Matches a literal comma in a sequence.
+
+    Per the value definition syntax, the comma may be omitted when it would
+    sit at the start or end of the value or function arguments, or next to
+    another comma, i.e. when an adjacent optional term was omitted.
+    """
+    __slots__ = ()
+
+    def match(self, tokens, pos, memo):
+        if pos < len(tokens):
+            token = tokens[pos]
+            if token[0] == DELIM:
+                if token[1] == ',':
+                    return (pos + 1,)
+                if token[1] == ')':
+                    return (pos,)
+        else:
+            return (pos,)
+        if pos == 0:
+            return (pos,)
+        previous = tokens[pos - 1]
+        if previous[0] == FUNCTION or (previous[0] == DELIM and previous[1] in ',('):
+            return (pos,)
+        return _NO_MATCH
+
+
+class FunctionMatcher(Matcher):
+    """Matches the opening token of a named function."""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def match(self, tokens, pos, memo):
+        if pos < len(tokens):
+            token = tokens[pos]
+            if token[0] == FUNCTION and token[1] == self.name:
+                return (pos + 1,)
+        return _NO_MATCH
+
+
+class PredicateMatcher(Matcher):
+    """Matches a single token accepted by a predicate function."""
+    __slots__ = ('predicate', 'name')
+
+    def __init__(self, predicate, name):
+        self.predicate = predicate
+        self.name = name
+
+    def match(self, tokens, pos, memo):
+        if pos < len(tokens) and self.predicate(tokens[pos]):
+            return (pos + 1,)
+        return _NO_MATCH
+
+
+class BalancedMatcher(Matcher):
+    """
+    Matches one or more tokens with balanced brackets (`<declaration-value>`).
+
+    Every balanced cut point is a possible end position.
+    """
+    __slots__ = ()
+
+    _OPEN = {'(': ')', '[': ']', '{': '}'}
+
+    def match(self, tokens, pos, memo):
+        ends = []
+        stack = []
+        for i in range(pos, len(tokens)):
+            kind, value, _ = tokens[i]
+            if kind == FUNCTION:
+                stack.append(')')
+            elif kind == DELIM:
+                if value in self._OPEN:
+                    stack.append(self._OPEN[value])
+                elif value in (')', ']', '}'):
+                    if not stack or stack[-1] != value:
+                        break
+                    stack.pop()
+                elif value in ('!', ';') and not stack:
+                    break
+            if not stack:
+                ends.append(i + 1)
+        return ends
+
+
+class SequenceMatcher(Matcher):
+    """Matches its items one after another (juxtaposition)."""
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = tuple(items)
+
+    def match(self, tokens, pos, memo):
+        positions = (pos,)
+        for item in self.items:
+            if len(positions) == 1:
+                (p,) = positions
+                positions = item.match(tokens, p, memo)
+            else:
+                ends = set()
+                for p in positions:
+                    ends.update(item.match(tokens, p, memo))
+                positions = tuple(ends)
+            if not positions:
+                return _NO_MATCH
+        return positions
+
+
+class AlternativeMatcher(Matcher):
+    """Matches exactly one of its items (`a | b`)."""
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = tuple(items)
+
+    def match(self, tokens, pos, memo):
+        result = None
+        for item in self.items:
+            ends = item.match(tokens, pos, memo)
+            if ends:
+                if result is None:
+                    result = ends
+                else:
+                    if not isinstance(result, set):
+                        result = set(result)
+                    result.update(ends)
+        return result if result is not None else _NO_MATCH
+
+
+class AnyOrderMatcher(Matcher):
+    """
+    Matches items in any order: all of them (`a && b`) or at least one (`a || b`).
+
+    The search walks (position, used-items bitmask) states, so each state is
+    explored once regardless of how many orderings reach it.
+    """
+    __slots__ = ('items', 'require_all', 'full_mask')
+
+    def __init__(self, items, require_all):
+        self.items = tuple(items)
+        self.require_all = require_all
+        self.full_mask = (1 << len(self.items)) - 1
+
+    def match(self, tokens, pos, memo):
+        items = self.items
+        results = set()
+        stack = [(pos, 0)]
+        seen = {(pos, 0)}
+        while stack:
+            p, mask = stack.pop()
+            if mask and (mask == self.full_mask or not self.require_all):
+                results.add(p)
+            for i, item in enumerate(items):
+                bit = 1 << i
+                if mask & bit:
+                    continue
+                for end in item.match(tokens, p, memo):
+                    if end == p and not self.require_all:
+                        continue
+                    state = (end, mask | bit)
+                    if state not in seen:
+                        seen.add(state)
+                        stack.append(state)
+        return results
+
+
+class MultiplierMatcher(Matcher):
+    """Matches an item repeated between `min` and `max` times, optionally comma-separated."""
+    __slots__ = ('item', 'min', 'max', 'comma')
+
+    def __init__(self, item, min, max, comma=False):
+        self.item = item
+        self.min = min
+        self.max = max
+        self.comma = comma
+
+    def match(self, tokens, pos, memo):
+        item = self.item
+        results = {pos} if self.min == 0 else set()
+        current = (pos,)
+        seen = set()
+        count = 0
+        while current and (self.max is None or count < self.max):
+            following = set()
+            for p in current:
+                start = p
+                if self.comma and count:
+                    if start < len(tokens) and tokens[start][0] == DELIM and tokens[start][1] == ',':
+                        start += 1
+                    else:
+                        continue
+                for end in item.match(tokens, start, memo):
+                    # Repetitions must make progress or the loop never ends
+                    if end > p:
+                        following.add(end)
+            count += 1
+            if count >= self.min:
+                results.update(following)
+                following -= seen
+                seen.update(following)
+            current = following
+        return results
+
+
+class NonEmptyMatcher(Matcher):
+    """Rejects a zero-length match of the wrapped group (`[ ... ]!`)."""
+    __slots__ = ('item',)
+
+    def __init__(self, item):
+        self.item = item
+
+    def match(self, tokens, pos, memo):
+        return [end for end in self.item.match(tokens, pos, memo) if end != pos]
+
+
+class ReferenceMatcher(Matcher):
+    """
+    A named reference to another syntax, compiled on first use.
+
+    Results are memoized per (reference, position) in the per-value memo so
+    that shared sub-grammars are matched at most once per position. Re-entry
+    at the same position (left recursion) yields no match.
+    """
+    __slots__ = ('grammar', 'key', 'target')
+
+    def __init__(self, grammar, key):
+        self.grammar = grammar
+        self.key = key
+        self.target = None
+
+    def match(self, tokens, pos, memo):
+        memo_key = (self.key, pos)
+        cached = memo.get(memo_key)
+        if cached is not None:
+            return cached
+        target = self.target
+        if target is None:
+            target = self.target = self.grammar._resolve(self.key)
+        memo[memo_key] = _NO_MATCH
+        result = target.match(tokens, pos, memo)
+        memo[memo_key] = result
+        return result
+
+
+class UnresolvedMatcher(Matcher):
+    """Stands in for a reference to a syntax that does not exist; never matches."""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def match(self, tokens, pos, memo):
+        return _NO_MATCH
+
+
+class RangeMatcher(Matcher):
+    """Restricts a numeric type to a range, e.g. `<length [0,∞]>`."""
+    __slots__ = ('item', 'low', 'high')
+
+    def __init__(self, item, low, high):
+        self.item = item
+        self.low = low
+        self.high = high
+
+    def match(self, tokens, pos, memo):
+        ends = self.item.match(tokens, pos, memo)
+        if ends and pos < len(tokens):
+            token = tokens[pos]
+            # Math functions are resolved at computed-value time and not range checked
+            if token[0] in (NUMBER, PERCENTAGE, DIMENSION) and not self.low <= token[1] <= self.high:
+                return _NO_MATCH
+        return ends
+
+
+# ---------------------------------------------------------------------------
+# Builtin data types that syntaxes.json does not define
+# ---------------------------------------------------------------------------
+
+def _is_zero(token):
+    return token[0] == NUMBER and token[1] == 0
+
+
+def _unit_predicate(units, allow_zero):
+    def predicate(token):
+        if token[0] == DIMENSION:
+            return token[2] in units
+        return allow_zero and token[0] == NUMBER and token[1] == 0
+    return predicate
+
+
+def _is_hex_color(token):
+    return token[0] == HASH and len(token[1]) in (3, 4, 6, 8) and all(c in '0123456789abcdefABCDEF' for c in token[1])
+
+
+def _is_custom_ident(token):
+    return token[0] == IDENT and token[1] not in CSS_WIDE_KEYWORDS and token[1] != 'default'
+
+
+def _is_dashed_ident(token):
+    return token[0] == IDENT and token[1].startswith('--')
+
+
+_TOKEN_PREDICATES = {
+    'length': _unit_predicate(UNITS['length'], True),
+    'angle': _unit_predicate(UNITS['angle'], True),
+    'time': _unit_predicate(UNITS['time'], False),
+    'frequency': _unit_predicate(UNITS['frequency'], False),
+    'resolution': _unit_predicate(UNITS['resolution'], False),
+    'flex': _unit_predicate(UNITS['flex'], False),
+    'percentage': lambda token: token[0] == PERCENTAGE,
+    'number': lambda token: token[0] == NUMBER,
+    'integer': lambda token: token[0] == NUMBER and token[2],
+    'dimension': lambda token: token[0] == DIMENSION,
+    'zero': _is_zero,
+    'x': lambda token: token[0] == NUMBER,
+    'y': lambda token: token[0] == NUMBER,
+    'string': lambda token: token[0] == STRING,
+    'ident': lambda token: token[0] == IDENT,
+    'custom-ident': _is_custom_ident,
+    'dashed-ident': _is_dashed_ident,
+    'custom-property-name': _is_dashed_ident,
+    'attr-name': lambda token: token[0] == IDENT,
+    'hex-color': _is_hex_color,
+    'ident-token': lambda token: token[0] == IDENT,
+    'function-token': lambda token: token[0] == FUNCTION,
+    'hash-token': lambda token: token[0] == HASH,
+    'string-token': lambda token: token[0] == STRING,
+    'number-token': lambda token: token[0] == NUMBER,
+    'dimension-token': lambda token: token[0] == DIMENSION,
+}
+
+# Numeric types that also accept math functions such as calc()
+_NUMERIC_TYPES = frozenset([
+    'length', 'angle', 'time', 'frequency', 'resolution', 'flex', 'percentage', 'number',
+    'integer', 'dimension',
+])
+
+# Builtins expressed in definition syntax on top of the token predicates
+BUILTIN_SYNTAXES = {
+    'url': "<url-token> | url( <string> <url-modifier>* ) | src( <string> <url-modifier>* )",
+    'url-modifier': "<ident> | <function-token> <any-value> )",
+    'intrinsic-size-keyword': "min-content | max-content | fit-content",
+    'top': "<length> | auto",
+    'right': "<length> | auto",
+    'bottom': "<length> | auto",
+    'left': "<length> | auto",
+    'attr-fallback': "<any-value>",
+    'declaration': "<ident> : <declaration-value>",
+    'declaration-list': "<declaration> [ ; <declaration> ]* ;?",
+}
+
+# Every data type the grammar resolves without an entry in syntaxes.json
+BUILTIN_TYPES = frozenset(_TOKEN_PREDICATES) | frozenset(BUILTIN_SYNTAXES) | frozenset([
+    'any-value', 'declaration-value', 'url-token',
+])
+
+
+class Grammar:
+    """
+    Compiled value grammars for the properties, syntaxes and functions of the dataset.
+
+    Syntax strings are parsed once and compiled lazily; every `<type>` and
+    `<'property'>` reference compiles to a single shared matcher.
+    """
+
+    def __init__(self, properties, syntaxes, functions=None):
+        """
+        Initialize the grammar.
+
+        Args:
+            properties (dict): Property entries keyed by name (properties.json)
+            syntaxes (dict): Named syntaxes keyed by name (syntaxes.json)
+            functions (dict, optional): Function entries keyed by `name()` (functions.json)
+        """
+        self.properties = properties
+        self.syntaxes = dict(syntaxes)
+        for name, entry in (functions or {}).items():
+            self.syntaxes.setdefault(name, {"syntax": entry["syntax"]})
+        self.unresolved = set()
+        self._ast_cache = {}
+        self._compiled = {}
+        self._references = {}
+        self._property_matchers = {}
+        self._math = None
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Build a grammar from the merged dataset.
+
+        Args:
+            path (str, optional): Path to cssdata-merged.json
+
+        Returns:
+            Grammar: The grammar for the dataset
+        """
+        with open(path or DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['properties'], data['syntaxes'], data.get('functions'))
+
+    def parse(self, text):
+        """
+        Parse a definition syntax string, caching the AST by text.
+
+        Args:
+            text (str): Definition syntax
+
+        Returns:
+            Node: The parsed AST
+        """
+        node = self._ast_cache.get(text)
+        if node is None:
+            node = self._ast_cache[text] = parse_syntax(text)
+        return node
+
+    def compile(self, text):
+        """
+        Compile a definition syntax string into a matcher, caching by text.
+
+        Args:
+            text (str): Definition syntax
+
+        Returns:
+            Matcher: The compiled matcher
+        """
+        matcher = self._compiled.get(text)
+        if matcher is None:
+            matcher = self._compiled[text] = self.compile_node(self.parse(text))
+        return matcher
+
+    def property_matcher(self, name):
+        """
+        Get the compiled matcher for a property's value.
+
+        Args:
+            name (str): Property name
+
+        Returns:
+            Matcher: The matcher, or None if the property is unknown
+        """
+        matcher = self._property_matchers.get(name)
+        if matcher is None:
+            if name.startswith('--'):
+                matcher = self._reference('declaration-value')
+            elif name in self.properties:
+                matcher = self.compile(self.properties[name]['syntax'])
+            else:
+                return None
+            self._property_matchers[name] = matcher
+        return matcher
+
+    def match(self, matcher, value):
+        """
+        Check whether a matcher accepts an entire value.
+
+        Args:
+            matcher (Matcher): A compiled matcher
+            value (str): The value text
+
+        Returns:
+            bool: True if the whole value matches
+        """
+        tokens = tokenize_value(value)
+        return len(tokens) in matcher.match(tokens, 0, {})
+
+    def match_property(self, name, value):
+        """
+        Validate a declaration value against a property's grammar.
+
+        CSS-wide keywords are always accepted, as are values that use var(),
+        env() or attr(), which cannot be validated before substitution.
+
+        Args:
+            name (str): Property name
+            value (str): Declaration value, optionally ending in `!important`
+
+        Returns:
+            bool: True if the value is valid for the property; False for unknown properties
+        """
+        matcher = self.property_matcher(name)
+        if matcher is None:
+            return False
+        tokens = tokenize_value(value)
+        if len(tokens) >= 2 and tokens[-1][:2] == (IDENT, 'important') and tokens[-2][:2] == (DELIM, '!'):
+            tokens = tokens[:-2]
+        if len(tokens) == 1 and tokens[0][0] == IDENT and tokens[0][1] in CSS_WIDE_KEYWORDS:
+            return True
+        for token in tokens:
+            if token[0] == FUNCTION and token[1] in SUBSTITUTION_FUNCTIONS:
+                return True
+        return len(tokens) in matcher.match(tokens, 0, {})
+
+    def validate(self, declarations):
+        """
+        Validate a batch of declarations.
+
+        Args:
+            declarations (iterable): (property, value) pairs
+
+        Returns:
+            list: One bool per declaration
+        """
+        match_property = self.match_property
+        return [match_property(name, value) for name, value in declarations]
+
+    # -- compilation -------------------------------------------------------
+
+    def _reference(self, key):
+        matcher = self._references.get(key)
+        if matcher is None:
+            matcher = self._references[key] = ReferenceMatcher(self, key)
+        return matcher
+
+    def _resolve(self, key):
+        """Compile the target of a reference key (`name` or `'property'`)."""
+        if key.startswith("'"):
+            name = key[1:-1]
+            if name in self.properties:
+                return self.compile(self.properties[name]['syntax'])
+            self.unresolved.add(key)
+            return UnresolvedMatcher(key)
+
+        # Token types come first: the dataset defines some of them only as
+        # loose placeholders (`integer` is `<number-token>`).
+        if key in _TOKEN_PREDICATES:
+            matcher = PredicateMatcher(_TOKEN_PREDICATES[key], key)
+        elif key in self.syntaxes:
+            matcher = self.compile(self.syntaxes[key]['syntax'])
+        elif key in BUILTIN_SYNTAXES:
+            matcher = self.compile(BUILTIN_SYNTAXES[key])
+        elif key in ('any-value', 'declaration-value'):
+            matcher = BalancedMatcher()
+        elif key == 'url-token':
+            matcher = PredicateMatcher(lambda token: token[0] == URL, key)
+        else:
+            self.unresolved.add(key)
+            return UnresolvedMatcher(key)
+
+        if key in _NUMERIC_TYPES:
+            matcher = AlternativeMatcher([matcher, self._math_matcher()])
+        return matcher
+
+    def _math_matcher(self):
+        """A matcher for any math function defined in the dataset."""
+        if self._math is None:
+            names = sorted(n for n in self.syntaxes if n.endswith('()') and n[:-2] in MATH_FUNCTIONS)
+            self._math = AlternativeMatcher([self._reference(n) for n in names])
+        return self._math
+
+    def compile_node(self, node):
+        """
+        Compile an AST node into a matcher; references are shared per grammar.
+
+        Args:
+            node (Node): A parsed syntax node
+
+        Returns:
+            Matcher: The compiled matcher
+        """
+        if isinstance(node, Keyword):
+            try:
+                return NumberLiteralMatcher(float(node.name))
+            except ValueError:
+                return KeywordMatcher([node.name])
+        if isinstance(node, Literal):
+            if node.value == ',':
+                return CommaMatcher()
+            return DelimMatcher(node.value)
+        if isinstance(node, Function):
+            return FunctionMatcher(node.name)
+        if isinstance(node, TypeRef):
+            matcher = self._reference(node.name)
+            if node.range:
+                matcher = RangeMatcher(matcher, *node.range)
+            return matcher
+        if isinstance(node, PropertyRef):
+            return self._reference(f"'{node.name}'")
+        if isinstance(node, Multiplier):
+            return MultiplierMatcher(self.compile_node(node.term), node.min, node.max, node.comma)
+
+        if node.combinator == ' ':
+            matcher = SequenceMatcher([self.compile_node(t) for t in node.terms])
+        elif node.combinator == '|':
+            # Fold plain keyword alternatives into a single set lookup
+            keywords = [t.name for t in node.terms if isinstance(t, Keyword) and not _is_number(t.name)]
+            others = [self.compile_node(t) for t in node.terms
+                      if not (isinstance(t, Keyword) and not _is_number(t.name))]
+            if keywords:
+                others.insert(0, KeywordMatcher(keywords))
+            matcher = others[0] if len(others) == 1 else AlternativeMatcher(others)
+        else:
+            matcher = AnyOrderMatcher([self.compile_node(t) for t in node.terms], node.combinator == '&&')
+        if node.nonempty:
+            matcher = NonEmptyMatcher(matcher)
+        return matcher
+
+    # -- sample values -----------------------------------------------------
+
+    _SAMPLES = {
+        'length': '1px', 'angle': '45deg', 'time': '1s', 'frequency': '1hz', 'resolution': '1dppx',
+        'flex': '1fr', 'percentage': '50%', 'number': '1', 'integer': '1', 'dimension': '1px',
+        'zero': '0', 'x': '1', 'y': '1', 'string': '"a"', 'ident': 'a', 'custom-ident': 'a',
+        'dashed-ident': '--a', 'custom-property-name': '--a', 'attr-name': 'a',
+        'hex-color': '#fff', 'ident-token': 'a', 'function-token': 'a(', 'hash-token': '#a',
+        'string-token': '"a"', 'number-token': '1', 'dimension-token': '1px', 'url': 'url(a.png)',
+        'any-value': 'a', 'declaration-value': 'a',
+    }
+
+    def sample(self, node, depth=0):
+        """
+        Produce one example value for an AST, preferring the simplest alternative.
+
+        Args:
+            node (Node | str): A parsed syntax or definition syntax text
+            depth (int): Current reference depth
+
+        Returns:
+            str: A value accepted by the syntax, or None if none was found
+        """
+        if isinstance(node, str):
+            node = self.parse(node)
+        if depth > 12:
+            return None
+        if isinstance(node, Keyword):
+            return node.name
+        if isinstance(node, Literal):
+            return node.value
+        if isinstance(node, Function):
+            return f"{node.name}("
+        if isinstance(node, TypeRef):
+            if node.name in self.syntaxes:
+                return self.sample(self.parse(self.syntaxes[node.name]['syntax']), depth + 1)
+            if node.name in BUILTIN_SYNTAXES:
+                return self.sample(self.parse(BUILTIN_SYNTAXES[node.name]), depth + 1)
+            return self._SAMPLES.get(node.name)
+        if isinstance(node, PropertyRef):
+            if node.name not in self.properties:
+                return None
+            return self.sample(self.parse(self.properties[node.name]['syntax']), depth + 1)
+        if isinstance(node, Multiplier):
+            count = max(node.min, 1)
+            part = self.sample(node.term, depth)
+            if part is None:
+                return None if node.min else ''
+            return (', ' if node.comma else ' ').join([part] * count)
+        if node.combinator == '|':
+            for term in node.terms:
+                value = self.sample(term, depth)
+                if value is not None:
+                    return value
+            return None
+        terms = node.terms[:1] if node.combinator == '||' else node.terms
+        parts = []
+        for term in terms:
+            value = self.sample(term, depth)
+            if value is None:
+                return None
+            if value:
+                parts.append(value)
+        return ' '.join(parts)
+
+
+def _is_number(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def benchmark(grammar=None, rounds=5):
+    """
+    Measure validation throughput over every property in the dataset.
+
+    The workload holds, per property, its string initial value, a sample value
+    generated from its grammar, a CSS-wide keyword and an invalid value.
+
+    Args:
+        grammar (Grammar, optional): Grammar to benchmark
+        rounds (int): Number of passes over the workload
+
+    Returns:
+        dict: Timing and match statistics
+    """
+    start = time.perf_counter()
+    grammar = grammar or Grammar.load()
+    load_time = time.perf_counter() - start
+
+    declarations = []
+    for name, entry in grammar.properties.items():
+        if name.startswith('--'):
+            continue
+        if isinstance(entry.get('initial'), str):
+            declarations.append((name, entry['initial']))
+        example = grammar.sample(entry['syntax'])
+        if example is not None:
+            declarations.append((name, example))
+        declarations.append((name, 'inherit'))
+        declarations.append((name, '1px 2px 3px 4px 5px !important'))
+
+    start = time.perf_counter()
+    for name in grammar.properties:
+        grammar.property_matcher(name)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first = grammar.validate(declarations)
+    cold_time = time.perf_counter() - start
+
+    tokenize_value_spans.cache_clear()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        grammar.validate(declarations)
+    warm_time = time.perf_counter() - start
+
+    return {
+        "properties": len(grammar.properties),
+        "declarations": len(declarations),
+        "valid": sum(first),
+        "load_seconds": load_time,
+        "compile_seconds": compile_time,
+        "cold_seconds": cold_time,
+        "declarations_per_second": len(declarations) * rounds / warm_time,
+        "unresolved_references": sorted(grammar.unresolved),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == '--benchmark':
+        print(json.dumps(benchmark(), indent=2))
+    elif len(sys.argv) == 3:
+        grammar = Grammar.load()
+        valid = grammar.match_property(sys.argv[1], sys.argv[2])
+        print(f"{sys.argv[1]}: {sys.argv[2]} -> {'valid' if valid else 'invalid'}")
+        sys.exit(0 if valid else 1)
+    else:
+        print("Usage: csssyntax.py <property> <value> | --benchmark")
+        sys.exit(2)
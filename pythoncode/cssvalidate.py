@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""
+CSSDATA Schema Validator
+------------------------
+Validates the data files in data/individual_files/ against the JSON schemas in
+schema/individual_files/.
+
+Each schema is compiled once into nested checker closures, with `$ref`s
+resolved and enums turned into sets at compile time. The `property-reference`
+extension keyword (the value must be a key of the object its `$data` JSON
+pointer designates: "/" for the document root, "3" for three levels up) is
+checked against a key set computed once per referenced object. Category files
+are validated in parallel worker processes.
+
+Usage:
+    python cssvalidate.py [--jobs N] [category ...]
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT_DIR, 'data', 'individual_files')
+SCHEMA_DIR = os.path.join(ROOT_DIR, 'schema', 'individual_files')
+
+CATEGORIES = ('at-rules', 'functions', 'properties', 'selectors', 'syntaxes', 'types', 'units')
+
+# Keywords that carry no constraint
+ANNOTATIONS = frozenset(('comment', '$comment', 'description', 'title', 'definitions', 'default', 'examples'))
+
+Violation = namedtuple('Violation', ['path', 'message'])
+
+_TYPE_CHECKS = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'boolean': lambda value: isinstance(value, bool),
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'null': lambda value: value is None,
+}
+
+
+class SchemaError(ValueError):
+    """Raised when a schema cannot be compiled."""
+
+
+def _format_path(location):
+    """Turn a location chain into a JSON pointer."""
+    parts = []
+    while location is not None:
+        location, key, _ = location
+        if key is not None:
+            parts.append(str(key).replace('~', '~0').replace('/', '~1'))
+    return '/' + '/'.join(reversed(parts))
+
+
+class CompiledSchema:
+    """
+    A JSON schema compiled into checker functions.
+
+    Checkers are called as `check(value, location, errors)`, where `location`
+    is a `(parent location, key, value)` chain used both for error paths and
+    to resolve `property-reference` pointers, and `errors` is a list to
+    report into (or None when only the verdict matters, as inside `oneOf`).
+    They return True if the value is valid.
+    """
+
+    def __init__(self, schema, base_dir=None):
+        """
+        Compile a schema.
+
+        Args:
+            schema (dict): The schema document
+            base_dir (str, optional): Directory relative `$ref` documents are loaded from
+
+        Raises:
+            SchemaError: If the schema uses an unsupported construct
+        """
+        self.schema = schema
+        self.base_dir = base_dir
+        self.unresolved = set()
+        self._documents = {'': schema}
+        self._compiled = {}
+        self._key_sets = {}
+        start = time.perf_counter()
+        self._check = self.compile(schema, '')
+        self.compile_time = time.perf_counter() - start
+
+    @classmethod
+    def load(cls, path):
+        """
+        Compile a schema file; relative `$ref`s resolve next to it.
+
+        Args:
+            path (str): Path to the schema
+
+        Returns:
+            CompiledSchema: The compiled schema
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), os.path.dirname(path))
+
+    def validate(self, data):
+        """
+        Validate a document.
+
+        Args:
+            data: The parsed JSON document
+
+        Returns:
+            list: Violations, empty if the document is valid
+        """
+        errors = []
+        self._key_sets.clear()
+        self._check(data, (None, None, data), errors)
+        self._key_sets.clear()
+        return errors
+
+    # -- compilation ---------------------------------------------------------
+
+    def _document(self, name):
+        document = self._documents.get(name)
+        if document is None and name not in self._documents:
+            path = os.path.join(self.base_dir, name) if self.base_dir else None
+            if path and os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    document = json.load(f)
+            self._documents[name] = document
+        return document
+
+    def _ref(self, ref, document):
+        """Compile a `$ref`, memoized so recursive references compile once."""
+        name, _, pointer = ref.partition('#')
+        name = name or document
+        key = (name, pointer)
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            return compiled
+
+        target = self._document(name)
+        for part in filter(None, pointer.split('/')):
+            if not isinstance(target, dict):
+                target = None
+                break
+            target = target.get(part.replace('~1', '/').replace('~0', '~'))
+        if target is None:
+            # e.g. definitions.json, which is not part of this repository
+            self.unresolved.add(ref)
+            return _accept
+
+        # Placeholder first, so a schema referring to itself finds it
+        cell = []
+        self._compiled[key] = lambda value, location, errors: cell[0](value, location, errors)
+        cell.append(self.compile(target, name))
+        self._compiled[key] = cell[0]
+        return cell[0]
+
+    def compile(self, node, document=''):
+        """
+        Compile a schema node.
+
+        Args:
+            node (dict | bool): Schema node
+            document (str): Name of the document the node belongs to ('' for the main schema)
+
+        Returns:
+            callable: The checker function
+        """
+        if node is True or node == {}:
+            return _accept
+        if node is False:
+            return _reject
+        if not isinstance(node, dict):
+            raise SchemaError(f"Invalid schema node: {node!r}")
+        if '$ref' in node:
+            return self._ref(node['$ref'], document)
+
+        type_check = None
+        if 'type' in node:
+            types = node['type'] if isinstance(node['type'], list) else [node['type']]
+            try:
+                predicates = [_TYPE_CHECKS[name] for name in types]
+            except KeyError as e:
+                raise SchemaError(f"Unknown type {e.args[0]!r}") from None
+            expected = ' or '.join(types)
+            if len(predicates) == 1:
+                type_check = predicates[0]
+            else:
+                type_check = lambda value: any(predicate(value) for predicate in predicates)
+
+        checks = []
+        for keyword, argument in node.items():
+            if keyword in ('type', '$ref') or keyword in ANNOTATIONS:
+                continue
+            builder = getattr(self, '_compile_' + keyword.replace('-', '_'), None)
+            if builder is not None:
+                checks.append(builder(argument, node, document))
+            # Unknown keywords are ignored, as JSON Schema requires
+
+        def check(value, location, errors):
+            if type_check is not None and not type_check(value):
+                if errors is not None:
+                    errors.append(Violation(_format_path(location), f"expected {expected}, got {_type_name(value)}"))
+                return False
+            valid = True
+            for keyword_check in checks:
+                if not keyword_check(value, location, errors):
+                    if errors is None:
+                        return False
+                    valid = False
+            return valid
+
+        if type_check is None and len(checks) == 1:
+            return checks[0]
+        return check
+
+    def _compile_enum(self, values, node, document):
+        try:
+            allowed = frozenset(values)
+        except TypeError:
+            allowed = None
+
+        def check(value, location, errors):
+            try:
+                found = value in allowed if allowed is not None else value in values
+            except TypeError:
+                found = value in values
+            if not found and errors is not None:
+                errors.append(Violation(_format_path(location), f"{value!r} is not one of the allowed values"))
+            return found
+        return check
+
+    def _compile_pattern(self, pattern, node, document):
+        search = re.compile(pattern).search
+
+        def check(value, location, errors):
+            if not isinstance(value, str) or search(value):
+                return True
+            if errors is not None:
+                errors.append(Violation(_format_path(location), f"{value!r} does not match {pattern!r}"))
+            return False
+        return check
+
+    def _compile_properties(self, properties, node, document):
+        compiled = {name: self.compile(schema, document) for name, schema in properties.items()}
+
+        def check(value, location, errors):
+            if not isinstance(value, dict):
+                return True
+            valid = True
+            for name, property_check in compiled.items():
+                if name in value:
+                    item = value[name]
+                    if not property_check(item, (location, name, item), errors):
+                        if errors is None:
+                            return False
+                        valid = False
+            return valid
+        return check
+
+    def _compile_additionalProperties(self, additional, node, document):
+        known = frozenset(node.get('properties', ()))
+        patterns = [re.compile(pattern).search for pattern in node.get('patternProperties', ())]
+        if additional is False:
+            def check(value, location, errors):
+                if not isinstance(value, dict):
+                    return True
+                extra = [name for name in value
+                         if name not in known and not any(search(name) for search in patterns)]
+                if extra and errors is not None:
+                    errors.append(Violation(_format_path(location), f"unexpected properties: {', '.join(extra)}"))
+                return not extra
+            return check
+
+        additional_check = self.compile(additional, document)
+
+        def check(value, location, errors):
+            if not isinstance(value, dict):
+                return True
+            valid = True
+            for name, item in value.items():
+                if name in known or any(search(name) for search in patterns):
+                    continue
+                if not additional_check(item, (location, name, item), errors):
+                    if errors is None:
+                        return False
+                    valid = False
+            return valid
+        return check
+
+    def _compile_patternProperties(self, patterns, node, document):
+        compiled = [(re.compile(pattern).search, self.compile(schema, document))
+                    for pattern, schema in patterns.items()]
+
+        def check(value, location, errors):
+            if not isinstance(value, dict):
+                return True
+            valid = True
+            for name, item in value.items():
+                for search, pattern_check in compiled:
+                    if search(name) and not pattern_check(item, (location, name, item), errors):
+                        if errors is None:
+                            return False
+                        valid = False
+            return valid
+        return check
+
+    def _compile_required(self, required, node, document):
+        def check(value, location, errors):
+            if not isinstance(value, dict):
+                return True
+            missing = [name for name in required if name not in value]
+            if missing and errors is not None:
+                errors.append(Violation(_format_path(location), f"missing required properties: {', '.join(missing)}"))
+            return not missing
+        return check
+
+    def _compile_items(self, items, node, document):
+        if isinstance(items, list):
+            raise SchemaError("Tuple-form `items` is not supported")
+        item_check = self.compile(items, document)
+
+        def check(value, location, errors):
+            if not isinstance(value, list):
+                return True
+            valid = True
+            for i, item in enumerate(value):
+                if not item_check(item, (location, i, item), errors):
+                    if errors is None:
+                        return False
+                    valid = False
+            return valid
+        return check
+
+    def _compile_minItems(self, minimum, node, document):
+        def check(value, location, errors):
+            if not isinstance(value, list) or len(value) >= minimum:
+                return True
+            if errors is not None:
+                errors.append(Violation(_format_path(location), f"expected at least {minimum} items"))
+            return False
+        return check
+
+    def _compile_maxItems(self, maximum, node, document):
+        def check(value, location, errors):
+            if not isinstance(value, list) or len(value) <= maximum:
+                return True
+            if errors is not None:
+                errors.append(Violation(_format_path(location), f"expected at most {maximum} items"))
+            return False
+        return check
+
+    def _compile_uniqueItems(self, unique, node, document):
+        if not unique:
+            return _accept
+
+        def check(value, location, errors):
+            if not isinstance(value, list):
+                return True
+            try:
+                distinct = len(set(value)) == len(value)
+            except TypeError:
+                keys = [json.dumps(item, sort_keys=True) for item in value]
+                distinct = len(set(keys)) == len(keys)
+            if not distinct and errors is not None:
+                errors.append(Violation(_format_path(location), "items are not unique"))
+            return distinct
+        return check
+
+    def _compile_oneOf(self, schemas, node, document):
+        compiled = [self.compile(schema, document) for schema in schemas]
+
+        def check(value, location, errors):
+            matches = sum(1 for branch in compiled if branch(value, location, None))
+            if matches == 1:
+                return True
+            if errors is not None:
+                if matches:
+                    errors.append(Violation(_format_path(location), f"matches {matches} oneOf branches"))
+                else:
+                    # Report why the branch of the right type failed, if there is one
+                    detail = []
+                    for branch in compiled:
+                        branch(value, location, detail)
+                    errors.append(Violation(_format_path(location), "matches no oneOf branch"
+                                            + (f" ({detail[-1].message})" if detail else "")))
+            return False
+        return check
+
+    def _compile_anyOf(self, schemas, node, document):
+        compiled = [self.compile(schema, document) for schema in schemas]
+
+        def check(value, location, errors):
+            if any(branch(value, location, None) for branch in compiled):
+                return True
+            if errors is not None:
+                errors.append(Violation(_format_path(location), "matches no anyOf branch"))
+            return False
+        return check
+
+    def _compile_allOf(self, schemas, node, document):
+        compiled = [self.compile(schema, document) for schema in schemas]
+
+        def check(value, location, errors):
+            valid = True
+            for branch in compiled:
+                if not branch(value, location, errors):
+                    if errors is None:
+                        return False
+                    valid = False
+            return valid
+        return check
+
+    def _compile_property_reference(self, argument, node, document):
+        """
+        The `property-reference` extension: the value must be a key of the
+        object designated by `$data`, an absolute ("/...") or relative ("N")
+        JSON pointer. The key set of that object is built once per validation.
+        """
+        pointer = str(argument.get('$data', '/')) if isinstance(argument, dict) else '/'
+        if pointer.startswith('/'):
+            steps = [part for part in pointer.split('/') if part]
+
+            def target(location):
+                while location[0] is not None:
+                    location = location[0]
+                value = location[2]
+                for step in steps:
+                    value = value.get(step) if isinstance(value, dict) else None
+                return value
+        elif pointer.isdigit():
+            levels = int(pointer)
+
+            def target(location):
+                for _ in range(levels):
+                    location = location[0]
+                    if location is None:
+                        return None
+                return location[2]
+        else:
+            raise SchemaError(f"Unsupported property-reference pointer {pointer!r}")
+
+        key_sets = self._key_sets
+
+        def check(value, location, errors):
+            container = target(location)
+            keys = key_sets.get(id(container))
+            if keys is None:
+                keys = key_sets[id(container)] = frozenset(container) if isinstance(container, dict) else frozenset()
+            if value in keys:
+                return True
+            if errors is not None:
+                errors.append(Violation(_format_path(location), f"{value!r} does not refer to an existing key"))
+            return False
+        return check
+
+
+def _accept(value, location, errors):
+    return True
+
+
+def _reject(value, location, errors):
+    if errors is not None:
+        errors.append(Violation(_format_path(location), "no value is allowed here"))
+    return False
+
+
+def _type_name(value):
+    for name in ('boolean', 'integer', 'number', 'string', 'array', 'object', 'null'):
+        if _TYPE_CHECKS[name](value):
+            return name
+    return type(value).__name__
+
+
+# Compiled schemas of this worker process, by schema path
+_schemas = {}
+
+
+def validate_file(category, data_dir=None, schema_dir=None):
+    """
+    Validate one category file against its schema.
+
+    Args:
+        category (str): Category file stem, e.g. 'properties'
+        data_dir (str, optional): Directory of the data files
+        schema_dir (str, optional): Directory of the schemas
+
+    Returns:
+        dict: Category, violations, unresolved refs and compile/parse/validate timings
+    """
+    schema_path = os.path.join(schema_dir or SCHEMA_DIR, f"{category}.schema.json")
+    compiled = _schemas.get(schema_path)
+    if compiled is None:
+        compiled = _schemas[schema_path] = CompiledSchema.load(schema_path)
+
+    start = time.perf_counter()
+    with open(os.path.join(data_dir or DATA_DIR, f"{category}.json"), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    parsed = time.perf_counter()
+    violations = compiled.validate(data)
+    return {
+        "category": category,
+        "violations": violations,
+        "unresolved": sorted(compiled.unresolved),
+        "compile_time": compiled.compile_time,
+        "parse_time": parsed - start,
+        "validate_time": time.perf_counter() - parsed,
+    }
+
+
+def validate_all(categories=CATEGORIES, jobs=None, data_dir=None, schema_dir=None):
+    """
+    Validate category files, in parallel worker processes when `jobs` > 1.
+
+    Args:
+        categories (iterable): Category file stems
+        jobs (int, optional): Number of worker processes (default: CPU count, capped at the file count)
+        data_dir (str, optional): Directory of the data files
+        schema_dir (str, optional): Directory of the schemas
+
+    Returns:
+        list: One `validate_file` result per category, in the given order
+    """
+    categories = list(categories)
+    jobs = min(jobs or os.cpu_count() or 1, len(categories))
+    if jobs <= 1:
+        return [validate_file(category, data_dir, schema_dir) for category in categories]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(validate_file, categories, [data_dir] * len(categories),
+                             [schema_dir] * len(categories)))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    jobs = None
+    if '--jobs' in args:
+        position = args.index('--jobs')
+        jobs = int(args[position + 1])
+        del args[position:position + 2]
+    unknown = [category for category in args if category not in CATEGORIES]
+    if unknown:
+        print(f"Unknown categories: {', '.join(unknown)} (expected {', '.join(CATEGORIES)})")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    results = validate_all(args or CATEGORIES, jobs)
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    unresolved = set()
+    for result in results:
+        unresolved.update(result["unresolved"])
+        for violation in result["violations"]:
+            print(f"{result['category']}.json{violation.path}: {violation.message}")
+        failed += bool(result["violations"])
+        print(f"{result['category']}: {len(result['violations'])} violations "
+              f"(compile {result['compile_time'] * 1000:.2f} ms, parse {result['parse_time'] * 1000:.2f} ms, "
+              f"validate {result['validate_time'] * 1000:.2f} ms)", file=sys.stderr)
+    if unresolved:
+        print(f"Unresolved references (not checked): {', '.join(sorted(unresolved))}", file=sys.stderr)
+    print(f"Validated {len(results)} files in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    sys.exit(1 if failed else 0)
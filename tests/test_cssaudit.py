@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cssaudit
+
+SCRIPT = os.path.abspath(cssaudit.__file__)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def tables():
+    cssaudit._init_worker(cssaudit.load_tables())
+
+
+def findings(tmp_path, css):
+    path = tmp_path / 'test.css'
+    path.write_text(css, encoding='utf-8')
+    result = cssaudit.audit_file(str(path))
+    assert result["error"] is None
+    return [(f["line"], f["column"], f["kind"], f["name"], f["status"]) for f in result["findings"]]
+
+
+@pytest.mark.parametrize('css, expected', [
+    # Custom property values are arbitrary token streams
+    ('.a{--x: foo(1); --y: theme(colors.red)}', []),
+    ('.a { --x: foo(1); width: bar(2); }', [(1, 26, 'function', 'bar', 'unknown')]),
+    ('.a {\n  colr: red;\n  color: red;\n}', [(2, 3, 'property', 'colr', 'unknown')]),
+    # Nested rules versus declarations
+    ('.a { &:hover { colr: 1 } .b { margin: 0 } c: 1 }',
+     [(1, 16, 'property', 'colr', 'unknown'), (1, 43, 'property', 'c', 'unknown')]),
+    ('@media (min-width: 1px) { .e { clor: red } }', [(1, 32, 'property', 'clor', 'unknown')]),
+    ('.a { @media print { colr: 0 } }', [(1, 21, 'property', 'colr', 'unknown')]),
+    # @page margin boxes and descriptors
+    ('@page :first { margin: 1in; @top-left { content: "x" } size: A4 }', []),
+    ('@top-left { color: red }', [(1, 1, 'at-rule', 'top-left', 'unknown')]),
+    # Keyframe selectors are not declarations
+    ('@keyframes spin { from { top: 0 } 50% { opacity: .5 } to { colr: 1 } }',
+     [(1, 60, 'property', 'colr', 'unknown')]),
+    ('@-webkit-keyframes s { from { top: 0 } }', [(1, 1, 'at-rule', '-webkit-keyframes', 'nonstandard')]),
+    # url() bodies may contain ";"
+    ('.b { background: url(a;b.png) frob(2); }', [(1, 31, 'function', 'frob', 'unknown')]),
+    ('.b { background: url("a;b.png") no-repeat; }', []),
+    # Legacy single-colon pseudo-elements and vendor prefixes
+    ('a:before, a:first-line { color: red }', []),
+    ('a:-moz-nope { -webkit-box-reflect: below; -webkit-colr: x }',
+     [(1, 2, 'selector', ':-moz-nope', 'unknown'), (1, 15, 'property', '-webkit-box-reflect', 'nonstandard'),
+      (1, 43, 'property', '-webkit-colr', 'unknown')]),
+    ('/* colr: red; */ .a { width: calc(1px + nope(2)) }', [(1, 41, 'function', 'nope', 'unknown')]),
+])
+def test_findings(tmp_path, css, expected):
+    assert findings(tmp_path, css) == expected
+
+
+def test_vendor_prefix_note(tmp_path):
+    path = tmp_path / 'prefixed.css'
+    path.write_text('@-webkit-keyframes s { from { top: 0 } }', encoding='utf-8')
+    (finding,) = cssaudit.audit_file(str(path))["findings"]
+    assert finding["note"] == "vendor-prefixed form of keyframes"
+
+
+def test_sarif_round_trip(tmp_path):
+    stylesheet = tmp_path / 'site.css'
+    stylesheet.write_text('.a {\n  colr: red;\n  --x: foo(1);\n  width: bar(1px);\n}\n', encoding='utf-8')
+    report = tmp_path / 'report.sarif'
+    completed = subprocess.run([sys.executable, SCRIPT, str(stylesheet), '--format', 'sarif', '--output', str(report),
+                                '--jobs', '1'], capture_output=True, text=True)
+    assert completed.returncode == 1
+    sarif = json.loads(report.read_text(encoding='utf-8'))
+    (run,) = sarif["runs"]
+    found = [(result["ruleId"], result["level"], result["message"]["text"],
+              result["locations"][0]["physicalLocation"]["region"]) for result in run["results"]]
+    assert found == [
+        ("unknown-property", "error", "Unknown property 'colr'", {"startLine": 2, "startColumn": 3}),
+        ("unknown-function", "error", "Unknown function 'bar'", {"startLine": 4, "startColumn": 10}),
+    ]
+    uri = run["results"][0]["locations"][0]["physicalLocation"]["artifactLocation"]["uri"]
+    assert uri == str(stylesheet).replace(os.sep, '/')
+    assert {rule["id"] for rule in run["tool"]["driver"]["rules"]} >= {"unknown-property", "unknown-function"}
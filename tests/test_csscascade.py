@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from csscascade import ALL_EXCLUDED, CascadeEngine, random_tree
+from csssyntax import CSS_WIDE_KEYWORDS, DEFAULT_DATA_FILE
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return CascadeEngine.load()
+
+
+@pytest.fixture(scope='module')
+def properties():
+    with open(DEFAULT_DATA_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)['properties']
+
+
+def cascade(engine, *elements):
+    """Styles of a chain of elements, each the child of the one before."""
+    return engine.compute(range(-1, len(elements) - 1), elements)
+
+
+def naive_styles(engine, properties, parents, declarations):
+    """Resolve every element on its own, as full dicts, without any sharing or caching."""
+    def initial(name):
+        value = properties[name].get('initial')
+        return value if isinstance(value, str) else ''
+
+    def keyword_value(name, keyword, parent):
+        inherits = keyword == 'inherit' or (keyword not in ('initial', 'inherit')
+                                            and properties[name].get('inherited'))
+        return parent[name] if inherits and parent is not None else initial(name)
+
+    styles = []
+    for parent_index, element_declarations in zip(parents, declarations):
+        parent = styles[parent_index] if parent_index >= 0 else None
+        style = {}
+        for name in engine.location:
+            style[name] = parent[name] if parent is not None and properties[name].get('inherited') else initial(name)
+        if parent is not None:
+            style.update((name, value) for name, value in parent.items() if name.startswith('--'))
+
+        normal, important = [], []
+        for declaration in element_declarations or ():
+            name, value = declaration[0], declaration[1].strip()
+            flagged = len(declaration) > 2 and declaration[2]
+            if value.endswith('!important'):
+                value, flagged = value[:-len('!important')].strip(), True
+            (important if flagged else normal).append((name, value))
+
+        for name, value in normal + important:
+            if name.startswith('--'):
+                style[name] = value
+                continue
+            keyword = value.lower()
+            if keyword in CSS_WIDE_KEYWORDS:
+                if name == 'all':
+                    targets = [longhand for longhand in engine.location if longhand not in ALL_EXCLUDED]
+                else:
+                    targets = engine.shorthands.get(name, (name,))
+                for longhand in targets:
+                    style[longhand] = keyword_value(longhand, keyword, parent)
+                continue
+            expansion = (engine.expander.expand(name, value) or ()) if name in engine.shorthands else ((name, value),)
+            for longhand, longhand_value in expansion:
+                if longhand in engine.location:
+                    keyword = longhand_value.lower()
+                    style[longhand] = (keyword_value(longhand, keyword, parent) if keyword in CSS_WIDE_KEYWORDS
+                                       else longhand_value)
+        styles.append(style)
+    return styles
+
+
+def test_inherited_and_reset_properties(engine):
+    root, child = cascade(engine, (('color', 'red'), ('display', 'flex')), None)
+    assert child['color'] == 'red'
+    assert child['display'] == 'inline'
+    assert root['display'] == 'flex'
+
+
+@pytest.mark.parametrize('declarations, expected', [
+    ((('background-color', 'inherit'),), {'background-color': 'blue', 'color': 'red'}),
+    ((('color', 'initial'),), {'color': 'canvastext'}),
+    ((('color', 'unset'), ('display', 'unset'), ('margin', 'unset')),
+     {'color': 'red', 'display': 'inline', 'margin-top': '0'}),
+    ((('margin', 'inherit'),), {'margin-top': '3px', 'margin-left': '3px'}),
+    ((('color', 'blue'), ('display', 'grid'), ('all', 'unset')),
+     {'color': 'red', 'display': 'inline', 'background-color': 'transparent', 'direction': 'rtl'}),
+    ((('color', 'green !important'), ('color', 'blue')), {'color': 'green'}),
+    ((('color', 'green', True), ('color', 'blue')), {'color': 'green'}),
+    ((('color', 'green !important'), ('color', 'blue !important')), {'color': 'blue'}),
+    ((('--accent', 'tomato'),), {'--accent': 'tomato', '--base': '1px'}),
+])
+def test_css_wide_keywords_and_important(engine, declarations, expected):
+    parent = (('color', 'red'), ('background-color', 'blue'), ('display', 'flex'), ('margin', '3px'),
+              ('direction', 'rtl'), ('--base', '1px'))
+    _, child = cascade(engine, parent, declarations)
+    assert {name: child[name] for name in expected} == expected
+
+
+def test_siblings_share_styles_without_leaking(engine):
+    parents = [-1, 0, 0, 0, 1, 2]
+    declarations = [(('display', 'flex'),), (('color', 'red'),), (('color', 'red'),), None, None, None]
+    root, first, second, plain, nephew, niece = engine.compute(parents, declarations)
+    assert first is second
+    # A plain child of the root takes the initial display, and both share that style
+    assert plain['display'] == 'inline' and root['display'] == 'flex'
+    assert nephew is niece and nephew['color'] == 'red'
+    assert plain.diff(root) == {'display': ('inline', 'flex')}
+
+
+def test_compute_matches_naive_resolution(engine, properties):
+    parents, declarations = random_tree(2000, seed=11)
+    styles = engine.compute(parents, declarations)
+    expected = naive_styles(engine, properties, parents, declarations)
+    for index, (style, naive) in enumerate(zip(styles, expected)):
+        assert style.to_dict() == naive, index
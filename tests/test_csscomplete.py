@@ -0,0 +1,24 @@
+import pytest
+
+from csscomplete import CompletionIndex
+
+
+@pytest.fixture(scope='module')
+def index():
+    return CompletionIndex.load()
+
+
+@pytest.mark.parametrize('prefix', ['-webkit-', '-moz-', '-ms-'])
+def test_bare_vendor_prefix_lists_prefixed_names(index, prefix):
+    labels = [c.label for c in index.complete(prefix)]
+    assert labels
+    assert all(label.startswith(prefix) for label in labels)
+
+
+def test_literal_prefix_match_survives_truncation(index):
+    labels = [c.label for c in index.complete('-webkit-box')]
+    assert labels[0] == '-webkit-box-reflect'
+
+
+def test_vendor_stripped_lookup(index):
+    assert '-webkit-box-reflect' in [c.label for c in index.complete('box-ref')]
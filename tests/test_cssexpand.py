@@ -0,0 +1,19 @@
+import pytest
+
+from cssexpand import ShorthandExpander
+
+
+@pytest.fixture(scope='module')
+def expander():
+    return ShorthandExpander.load()
+
+
+@pytest.mark.parametrize('value', ['caption', 'icon', 'menu', 'message-box', 'small-caption', 'status-bar'])
+def test_system_font_is_not_expanded(expander, value):
+    assert expander.expand('font', value) is None
+
+
+def test_family_named_like_system_font(expander):
+    expansion = dict(expander.expand('font', 'bold 1em/1.2 caption'))
+    assert expansion['font-family'] == 'caption'
+    assert expansion['font-weight'] == 'bold'
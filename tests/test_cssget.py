@@ -0,0 +1,171 @@
+import hashlib
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from cssget import MDNCSScraper
+from cssmirror import CSS_ROOT, BenchmarkScraper, make_handler
+
+PROPERTIES = ['color', 'display', 'margin', 'padding', 'width']
+
+
+def page(title, links):
+    anchors = ''.join(f'<li><a href="{CSS_ROOT}/{link}">{link}</a></li>' for link in links)
+    body = (f'<!DOCTYPE html><html><body><main><article><h1>{title}</h1>'
+            f'<p>About {title}.</p><ul>{anchors}</ul></article></main></body></html>').encode('utf-8')
+    return body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+def make_site():
+    """A small mirror: the CSS root, its key sections and a few properties linking to each other."""
+    sections = [section[len(CSS_ROOT) + 1:] for section in MDNCSScraper.KEY_SECTIONS]
+    pages = {CSS_ROOT: page('CSS', PROPERTIES)}
+    for section in sections:
+        pages[f'{CSS_ROOT}/{section}'] = page(section, PROPERTIES[:2])
+    for i, name in enumerate(PROPERTIES):
+        pages[f'{CSS_ROOT}/{name}'] = page(name, [PROPERTIES[i - 1], sections[i % len(sections)]])
+    return pages
+
+
+@pytest.fixture
+def serve_mirror():
+    """Start stub servers for the duration of a test; returns a function (site, handler options) -> base URL."""
+    servers = []
+
+    def start(site=None, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(site or make_site(), **options))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_scraper(tmp_path, base_url, **options):
+    options.setdefault('rate', 1000.0)
+    options.setdefault('max_threads', 4)
+    options.setdefault('timeout', 5)
+    return MDNCSScraper(output_file=str(tmp_path / 'tree.json'), state_file=str(tmp_path / 'state.sqlite'),
+                        base_url=base_url, **options)
+
+
+def counter(scraper, name):
+    """Sum a counter over all of its labels."""
+    counters = scraper.metrics.snapshot()["counters"]
+    return sum(value for key, value in counters.items() if key == name or key.startswith(name + '{'))
+
+
+def test_finished_crawl_starts_over(tmp_path, serve_mirror):
+    base_url = serve_mirror()
+    first = make_scraper(tmp_path, base_url)
+    tree = first.crawl()
+    first.state.close()
+    assert counter(first, "pages_stored") == len(make_site())
+
+    second = make_scraper(tmp_path, base_url)
+    assert second.crawl() == tree
+    assert counter(second, "responses") >= len(make_site())
+
+
+def test_recrawl_revalidates_with_304(tmp_path, serve_mirror):
+    base_url = serve_mirror()
+    cache_file = str(tmp_path / 'cache.sqlite')
+    first = make_scraper(tmp_path, base_url, cache_file=cache_file)
+    tree = first.crawl()
+    first.state.close()
+    # Every page, the root included, is requested once
+    assert counter(first, "responses") == len(make_site())
+    assert first.cache_stats["fetched"] == len(make_site())
+
+    second = make_scraper(tmp_path, base_url, cache_file=cache_file)
+    assert second.crawl() == tree
+    assert second.cache_stats["not_modified"] == len(make_site())
+    assert second.cache_stats["fetched"] == 0
+    assert counter(second, "responses") == counter(second, 'responses{status="304"}') == len(make_site())
+
+
+def crawled_paths(scraper):
+    return sorted(url[len(scraper.BASE_URL):] for url, _ in scraper.state.pages())
+
+
+def test_transient_errors_and_stalls_are_retried(tmp_path, serve_mirror):
+    random.seed(3)
+    base_url = serve_mirror(error_rate=0.3, error_statuses=(500,), stall_rate=0.1, stall=1.0)
+    scraper = make_scraper(tmp_path, base_url, timeout=0.3, max_retries=10)
+    scraper.retries.base_delay = 0.01
+    scraper.crawl()
+    assert crawled_paths(scraper) == sorted(make_site())
+    assert scraper.retries.stats["retried"] == counter(scraper, "retries") > 0
+    assert counter(scraper, 'responses{status="500"}') > 0
+    # Stalled requests time out
+    assert counter(scraper, "request_errors") > 0
+    assert scraper.retries.stats["gave_up"] == counter(scraper, "pages_given_up") == 0
+    assert counter(scraper, "pages_failed") == 0
+
+
+def test_server_errors_are_given_up_and_counted(tmp_path, serve_mirror):
+    base_url = serve_mirror(error_rate=1.0, error_statuses=(500,))
+    scraper = make_scraper(tmp_path, base_url, max_retries=2)
+    scraper.retries.base_delay = 0.01
+    scraper.crawl()
+    # The root and its key sections, each tried three times
+    urls = 1 + len(MDNCSScraper.KEY_SECTIONS)
+    assert counter(scraper, 'responses{status="500"}') == 3 * urls
+    assert scraper.retries.stats == {"retried": 2 * urls, "gave_up": urls}
+    assert counter(scraper, "pages_given_up") == counter(scraper, "pages_failed") == urls
+    assert len(scraper.state.visited()) == urls and not scraper.state.pending()
+
+
+def test_throttling_lowers_rate_and_honors_retry_after(tmp_path, serve_mirror):
+    base_url = serve_mirror(error_rate=1.0, error_statuses=(429,), retry_after=1)
+    scraper = make_scraper(tmp_path, base_url, max_retries=1)
+    start = time.monotonic()
+    scraper.crawl(f"{base_url}{CSS_ROOT}/margin")
+    assert time.monotonic() - start >= 1.0
+    assert counter(scraper, 'responses{status="429"}') == scraper.limiter.stats["throttled"] == 2
+    assert scraper.limiter.current_rate(base_url) <= scraper.limiter.rate / 4
+    assert scraper.retries.stats == {"retried": 1, "gave_up": 1}
+
+
+def test_delay_range_is_converted_to_a_rate(tmp_path):
+    with pytest.deprecated_call():
+        scraper = MDNCSScraper(str(tmp_path / 'tree.json'), 5, (1, 3), state_file=':memory:')
+    assert scraper.limiter.rate == 2.5
+
+
+def test_benchmark_fetch_times_exclude_rate_limiter_wait(tmp_path, serve_mirror):
+    base_url = serve_mirror()
+    scraper = BenchmarkScraper(state_file=str(tmp_path / 'state.sqlite'), base_url=base_url, rate=10.0, max_threads=4)
+    scraper.crawl()
+    assert len(scraper.fetch_times) == len(scraper.wait_times) == len(make_site())
+    assert sum(scraper.wait_times) > 1.0
+    assert sum(scraper.fetch_times) < sum(scraper.wait_times) / 4
+
+
+def test_redirect_to_visited_page_is_skipped_not_failed(tmp_path, serve_mirror):
+    site = make_site()
+    site[CSS_ROOT] = page('CSS', PROPERTIES + ['margin-alias'])
+    scraper = make_scraper(tmp_path, serve_mirror(site, redirects={f'{CSS_ROOT}/margin-alias': f'{CSS_ROOT}/margin'}))
+    scraper.crawl()
+    assert counter(scraper, "pages_stored") == len(make_site())
+    assert counter(scraper, "pages_skipped") == 1
+    assert counter(scraper, "pages_failed") == 0
+    assert not scraper.state.pending()
+
+
+def test_async_crawl_matches_threaded_crawl(tmp_path, serve_mirror):
+    base_url = serve_mirror()
+    (tmp_path / 'threaded').mkdir()
+    (tmp_path / 'async').mkdir()
+    threaded = make_scraper(tmp_path / 'threaded', base_url)
+    asynchronous = make_scraper(tmp_path / 'async', base_url)
+    assert asynchronous.crawl(use_async=True) == threaded.crawl()
+    assert counter(asynchronous, "responses") == counter(threaded, "responses") == len(make_site())
+    assert counter(asynchronous, "pages_failed") == counter(threaded, "pages_failed") == 0
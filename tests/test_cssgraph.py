@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+
+import cssgraph
+
+SCRIPT = os.path.abspath(cssgraph.__file__)
+
+
+def test_deps_excludes_cycle_member_itself():
+    result = subprocess.run([sys.executable, SCRIPT, '--deps', '<color>'],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(SCRIPT))
+    deps = result.stdout.split()
+    assert '<color>' not in deps
+    assert '<light-dark()>' in deps
+    assert '<named-color>' in deps
+
+
+def test_open_rebuilds_graph_of_an_older_dataset(tmp_path, monkeypatch):
+    graph = cssgraph.SyntaxGraph.load()
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({"contentHash": graph.content_hash}), encoding='utf-8')
+    monkeypatch.setattr(cssgraph, 'DEFAULT_MANIFEST_FILE', str(manifest))
+
+    path = str(tmp_path / 'graph.json')
+    stale = graph.to_dict()
+    stale["meta"]["contentHash"] = "older"
+    stale["nodes"]["<'margin'>"]["refs"] = []
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(stale, f)
+
+    reopened = cssgraph.SyntaxGraph.open(path)
+    assert reopened.content_hash == graph.content_hash
+    assert reopened.edges["<'margin'>"] == graph.edges["<'margin'>"]
+    assert cssgraph.SyntaxGraph.read(path).content_hash == graph.content_hash
@@ -0,0 +1,64 @@
+import pytest
+
+from cssselector import SelectorEngine, SelectorError
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return SelectorEngine.load()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('*', [(0, 0, 0)]),
+    ('#a.b.c d e', [(1, 2, 2)]),
+    ('a:hover::before', [(0, 1, 2)]),
+    ('a:before', [(0, 0, 2)]),
+    ('[href]:nth-last-child(2)', [(0, 2, 0)]),
+    ('a, .b, #c', [(0, 0, 1), (0, 1, 0), (1, 0, 0)]),
+    # :is(), :not() and :has() count their most specific argument, :where() nothing
+    ('a:is(#x,.y) b', [(1, 0, 2)]),
+    (':not(#a, .b.c) p', [(1, 0, 1)]),
+    ('a:has(> img.x)', [(0, 1, 2)]),
+    ('a:where(#x) .b', [(0, 1, 1)]),
+    # :nth-child(An+B of S) adds its selector list to the pseudo-class
+    ('li:nth-child(odd)', [(0, 1, 1)]),
+    ('li:nth-child(2n+1 of .a,#b)', [(1, 1, 1)]),
+    # :host() and ::slotted() add their argument to their own
+    (':host', [(0, 1, 0)]),
+    (':host(.a)', [(0, 2, 0)]),
+    ('::slotted(span.a)', [(0, 1, 2)]),
+])
+def test_specificity(engine, text, expected):
+    assert engine.specificity(text) == expected
+
+
+@pytest.mark.parametrize('text', ['a,,b', ':is()', 'a >', 'a[', '.', ''])
+def test_parse_errors(engine, text):
+    with pytest.raises(SelectorError):
+        engine.parse(text)
+
+
+def test_parse_is_interned(engine):
+    assert engine.parse('.nav > a:hover') is engine.parse('.nav > a:hover')
+
+
+@pytest.mark.parametrize('css, expected', [
+    ('#p .q { > c { color: red } }', [('#p .q', ((1, 1, 0),)), ('> c', ((1, 1, 1),))]),
+    # The parent counts once per `&`, and once for a selector without one
+    ('#p .q { & & d {} .x, &:hover {} }',
+     [('#p .q', ((1, 1, 0),)), ('& & d', ((2, 2, 1),)), ('.x, &:hover', ((1, 2, 0), (1, 2, 0)))]),
+    # The most specific selector of the parent list is used
+    ('a, #b { c {} }', [('a, #b', ((0, 0, 1), (1, 0, 0))), ('c', ((1, 0, 1),))]),
+    ('@media print { a { b {} } }', [('a', ((0, 0, 1),)), ('b', ((0, 0, 2),))]),
+    ('@keyframes k { from {} to {} } p {}', [('p', ((0, 0, 1),))]),
+])
+def test_stylesheet_nesting(engine, css, expected):
+    rules = engine.stylesheet(css)
+    assert [(rule.prelude, rule.specificities) for rule in rules] == expected
+    assert all(rule.error is None for rule in rules)
+
+
+def test_stylesheet_reports_invalid_prelude(engine):
+    (bad, good) = engine.stylesheet('a,,b { color: red } p { }')
+    assert bad.prelude == 'a,,b' and bad.error and bad.selectors == ()
+    assert good.prelude == 'p' and good.error is None
@@ -0,0 +1,29 @@
+import pytest
+
+from csssyntax import Grammar
+
+
+@pytest.fixture(scope='module')
+def grammar():
+    return Grammar.load()
+
+
+@pytest.mark.parametrize('name, value', [
+    ('z-index', '1.5'),
+    ('z-index', '1e3'),
+    ('order', '2.0'),
+    ('grid-row', 'span 1.5'),
+])
+def test_integer_rejects_non_integer_numbers(grammar, name, value):
+    assert not grammar.match_property(name, value)
+
+
+@pytest.mark.parametrize('name, value', [
+    ('z-index', '1'),
+    ('order', '-2'),
+    ('z-index', 'calc(1 + 2)'),
+    ('grid-row', 'span 2'),
+    ('line-height', '1.5'),
+])
+def test_integer_accepts_integers(grammar, name, value):
+    assert grammar.match_property(name, value)